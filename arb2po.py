@@ -1,247 +1,1032 @@
 #!/usr/bin/env python3
+import batch
+import cache
+import codec
+import functools
+import gc
+import icu
+import io
+import itertools
 import json
-import re
+import jsonbackend
+import lazy
+import messages
+import ordinals
+import os
+import sys
+import time
 
-# Read and transform an .arb file to something easier to work with
-def _parse_arb(path):
-	product = {}
-	with open(path, "r") as f:
-		raw = json.load(f)
-		for key, value in raw.items():
-			if key.startswith("@"):
-				# attributes
+# Number of messages _iter_arb may hold back while waiting for their
+# attributes
+_ARB_WINDOW = 1024
+
+# Default number of prepared messages _Arb2Po keeps for the strings repeated
+# across keys and locales
+DEFAULT_MEMO_SIZE = 65536
+
+# Incrementally tokenize the top level JSON object of a file and yield its
+# (key, value) pairs. Only the members in the buffer are kept in memory. Past
+# the first member, the complete members of the buffer are decoded together in
+# one call, and a member that spans more than the buffer on its own
+class _JsonObjectReader:
+	_SPACE_REGEX = lazy.Regex(r"[ \t\n\r]*")
+	_DECODER = json.JSONDecoder()
+	# Size of the reads, about as many members are decoded at a time
+	CHUNK_SIZE = 65536
+	# Number of commas _decode_run tries to end a run at
+	_RUN_TRIES = 3
+
+	def __init__(self, f, chunk_size=CHUNK_SIZE):
+		self._f = f
+		self._chunk_size = chunk_size
+		self._buf = ""
+		self._i = 0
+		self._is_eof = False
+		# the comma, whitespaces and quote between the first two members, e.g.
+		# ',\n\t"', and the index runs are decoded past, see _decode_run
+		self._separator = None
+		self._run_begin = 0
+
+	def __iter__(self):
+		if self._next_char() != "{":
+			raise ValueError("Expecting a JSON object")
+		self._i += 1
+		if self._next_char() == "}":
+			self._i += 1
+			return
+		while True:
+			self._next_char()
+			items = self._decode_run()
+			if items is not None:
+				yield from items
+				# at the separator after the run
+				self._i += 1
 				continue
-			product[key] = {
-				"value": value,
-			}
-			if f"@{key}" in raw:
-				# attributes available
-				product[key]["attributes"] = raw[f"@{key}"]
-	return product
+			key = self._decode()
+			if not isinstance(key, str):
+				raise ValueError(f"Expecting a property name: {key!r}")
+			if self._next_char() != ":":
+				raise ValueError(f"Expecting ':' after {key!r}")
+			self._i += 1
+			self._next_char()
+			yield key, self._decode()
+			c = self._next_char()
+			self._i += 1
+			if c == "}":
+				return
+			elif c != ",":
+				raise ValueError(f"Expecting ',' or '}}' after {key!r}")
+			if self._separator is None:
+				end = self._SPACE_REGEX.match(self._buf, self._i).end()
+				if self._buf.startswith("\"", end):
+					self._separator = self._buf[self._i - 1:end + 1]
 
-class _Arb2Po:
-	_PLURAL_REGEX = re.compile(r"^\{.+, *plural, .+\}$")
-	_ICU_ESCAPE_APOSTROPHES_REGEX = re.compile(r"([^']|^)'")
+	# Decode the members from the current position up to the last separator
+	# of the buffer and return their (key, value) pairs, or None if there's
+	# none. The values are complete once the object is closed there only if
+	# it's between two members, a separator in a string or in a nested value
+	# leaves it invalid, in which case the ones before are tried. If they all
+	# fail, the members up to the last one are decoded one by one instead
+	def _decode_run(self):
+		if self._separator is None:
+			return None
+		buf = self._buf
+		begin = max(self._i, self._run_begin)
+		end = len(buf)
+		failed = None
+		for _ in range(self._RUN_TRIES):
+			end = buf.rfind(self._separator, begin, end)
+			if end == -1:
+				break
+			try:
+				product = json.loads(f"{{{buf[self._i:end]}}}")
+			except json.JSONDecodeError:
+				if failed is None:
+					failed = end
+				continue
+			self._i = end
+			return product.items()
+		if failed is not None:
+			self._run_begin = failed + 1
+		return None
 
-	def __call__(self, original, translated):
-		# headers
-		yield "msgid \"\""
-		yield "msgstr \"\""
-		# Map:
-		# 	=0/zero => msgstr[0]
-		# 	=1/one => msgstr[1]
-		# 	=2/two => msgstr[2]
-		#	other => msgstr[3]
-		yield "\"Plural-Forms: nplurals=4; plural=n == 0 ? 0 : n == 1 ? 1 : n == 2 ? 2 : 3;\""
-
-		for o_key, o_value in original.items():
-			yield ""
-			t_value = translated[o_key] if o_key in translated else {}
-			o_placeholders = {}
+	# Read more data, drop the consumed part of the buffer. A value that
+	# spans many reads doubles the read size to keep retries linear
+	def _fill(self):
+		data = self._f.read(max(self._chunk_size, len(self._buf) - self._i))
+		if not data:
+			self._is_eof = True
+			return False
+		self._run_begin = max(self._run_begin - self._i, 0)
+		self._buf = self._buf[self._i:] + data
+		self._i = 0
+		return True
+
+	# Skip whitespaces and return the next character, or "" at the end
+	def _next_char(self):
+		while True:
+			self._i = self._SPACE_REGEX.match(self._buf, self._i).end()
+			if self._i < len(self._buf):
+				return self._buf[self._i]
+			if not self._fill():
+				return ""
+
+	# Decode the value at the current position, reading more data until it's
+	# complete. A value is only accepted if something follows it, otherwise
+	# e.g. a number may be cut in half
+	def _decode(self):
+		while True:
 			try:
-				t_placeholders = t_value["attributes"]["placeholders"]
-			except KeyError:
-				t_placeholders = {}
-			# yield f"#: {o_key}"
-			if "attributes" in o_value:
-				try:
-					o_placeholders = o_value["attributes"]["placeholders"]
-				except:
-					None
-				if "description" in o_value["attributes"]:
-					yield f"#. {o_value['attributes']['description']}"
-				if o_placeholders:
-					for i, (op_key, op_value) in enumerate(o_placeholders.items()):
-						string = f"#. Parameter {i + 1}: {op_key}"
-						if "example" in op_value:
-							string += f" (example: {op_value['example']})"
-						yield string
-					yield "#, c-format"
-
-			if not o_placeholders:
-				yield "#, no-c-format"
-
-			if o_placeholders and self._is_plural_string(o_value["value"]):
-				o_plural = self._extract_plural_patterns(o_value["value"])
-				_, o_patterns = o_plural["var"], o_plural["patterns"]
-				try:
-					t_plural = self._extract_plural_patterns(t_value["value"])
-					_, t_patterns = t_plural["var"], t_plural["patterns"]
-				except KeyError:
-					t_patterns = {}
+				value, end = self._DECODER.raw_decode(self._buf, self._i)
+				if end < len(self._buf) or self._is_eof:
+					self._i = end
+					return value
+			except json.JSONDecodeError:
+				if self._is_eof:
+					raise
+			self._fill()
 
-				try:
-					o_zero = (o_patterns["=0"] if "=0" in o_patterns
-						else o_patterns["zero"])
-					# rule for zero exists
-					yield f"#. If zero: \"{o_zero}\""
-				except KeyError:
-					t_str0 = ""
-				yield f"msgctxt \"{o_key}\""
+# Yield the (key, value) pairs of the top level JSON object of a file object,
+# with backend (a jsonbackend.Backend, by default jsonbackend.get_reader()).
+# The standard library reads the file incrementally, the others parse it whole
+def _iter_json_object(f, backend=None):
+	loads = (backend or jsonbackend.get_reader()).loads
+	if loads is None:
+		return iter(_JsonObjectReader(f))
+	product = loads(f.read())
+	if not isinstance(product, dict):
+		raise ValueError("Expecting a JSON object")
+	return iter(product.items())
 
-				try:
-					o_one = (o_patterns["=1"] if "=1" in o_patterns
-						else o_patterns["one"])
-					o_id = self._prep_value(o_one, o_placeholders,
-						is_plural_string=True)
-				except KeyError:
-					# use other{} then
-					o_id = ""
-				o_other = o_patterns["other"]
-				o_id_plural = self._prep_value(o_other, o_placeholders,
-					is_plural_string=True)
-
-				if o_id:
-					yield f"msgid \"{o_id}\""
-				else:
-					yield f"msgid \"{o_id_plural}\""
-				yield f"msgid_plural \"{o_id_plural}\""
+# Incrementally read an .arb file and yield (key, value, attributes) for each
+# message, where attributes is the matching @key entry or None. The @key is
+# found when it's within window messages of its message, either side
+def _iter_arb(path, window=_ARB_WINDOW):
+	backend = jsonbackend.get_reader()
+	with open(path, "r" if backend.loads is None else "rb") as f:
+		yield from _iter_arb_file(f, window, backend)
 
-				try:
-					t_zero = (t_patterns["=0"] if "=0" in t_patterns
-						else t_patterns["zero"])
-					t_str0 = self._prep_value(t_zero, t_placeholders,
-						is_plural_string=True)
-				except KeyError:
-					t_str0 = ""
-				yield f"msgstr[0] \"{t_str0}\""
+# Same as _iter_arb but read from a file object. The messages are held back and
+# yielded window at a time, once twice as many are waiting, so that each
+# member only costs a few dict operations. The @key of messages not read yet
+# are kept the same way, those dropped or left at the end are reported on
+# stderr
+def _iter_arb_file(f, window=_ARB_WINDOW, backend=None):
+	window = max(window, 1)
+	# key => value, and key => attributes of those found
+	pending = {}
+	found = {}
+	orphans = {}
+	for key, value in _iter_json_object(f, backend):
+		if not key.startswith("@"):
+			pending[key] = value
+			if orphans and key in orphans:
+				found[key] = orphans.pop(key)
+			if len(pending) > 2 * window:
+				for key in list(itertools.islice(pending, window)):
+					yield key, pending.pop(key), found.pop(key, None)
+		elif key.startswith("@@"):
+			# global attributes, e.g. @@locale
+			pass
+		elif key[1:] in pending:
+			found[key[1:]] = value
+		else:
+			orphans[key[1:]] = value
+			if len(orphans) > 2 * window:
+				dropped = list(itertools.islice(orphans, window))
+				for key in dropped:
+					del orphans[key]
+				_warn_orphans(f, dropped, window)
+	for key, value in pending.items():
+		yield key, value, found.pop(key, None)
+	if orphans:
+		_warn_orphans(f, orphans, window)
 
-				try:
-					t_one = (t_patterns["=1"] if "=1" in t_patterns
-						else t_patterns["one"])
-					t_str1 = self._prep_value(t_one, t_placeholders,
-						is_plural_string=True)
-				except KeyError:
-					t_str1 = ""
-				yield f"msgstr[1] \"{t_str1}\""
+# Report the @key attributes _iter_arb_file found no message for
+def _warn_orphans(f, names, window):
+	path = getattr(f, "name", "ARB")
+	for name in names:
+		print(f"{path}: @{name} has no message within {window} members, "
+			"ignored", file=sys.stderr)
 
-				try:
-					t_two = (t_patterns["=2"] if "=2" in t_patterns
-						else t_patterns["two"])
-					t_str2 = self._prep_value(t_two, t_placeholders,
-						is_plural_string=True)
-				except KeyError:
-					t_str2 = ""
-				yield f"msgstr[2] \"{t_str2}\""
+# Turn the records from _iter_arb to messages.ArbMessage
+def _arb_entries(records):
+	for key, value, attributes in records:
+		yield messages.ArbMessage.from_arb(key, value, attributes)
+
+# Read an .arb file and return its messages by key. The whole file is held
+# anyway, so attributes are paired however far they are from their message
+def _parse_arb(path):
+	backend = jsonbackend.get_reader()
+	with open(path, "r" if backend.loads is None else "rb") as f:
+		return _parse_arb_file(f, backend)
+
+# Same as _parse_arb but read from a file object. The messages hold no
+# reference cycles, so the garbage collector is paused while they're built
+# rather than walking them again and again as they grow
+def _parse_arb_file(f, backend=None):
+	entries = ((backend or jsonbackend.get_reader()).loads or json.loads)(
+		f.read())
+	if not isinstance(entries, dict):
+		raise ValueError("Expecting a JSON object")
+	attributes = entries.get
+	from_arb = messages.ArbMessage.from_arb
+	is_enabled = gc.isenabled()
+	gc.disable()
+	try:
+		return {key: from_arb(key, value, attributes("@" + key))
+			for key, value in entries.items() if not key.startswith("@")}
+	finally:
+		if is_enabled:
+			gc.enable()
+
+# A placeholder or a # in a simple plural branch, see icu.get_simple_plural
+_SIMPLE_TOKEN_REGEX = lazy.Regex(r"\{\s*([^\s{},']+)\s*\}|#")
+
+# Replace the placeholders of a parsed message with printf style tokens, i.e.
+# the n-th placeholder => %n$s. Compiled once per placeholder set, table is
+# its ordinals.Table
+class _Substitution:
+	def __init__(self, table):
+		self.table = table
+		self._tokens = table.tokens
+		# a # without placeholders is left alone
+		self._pound = "%1$s" if table else "#"
+
+	# Replace the declared placeholders of a message value. Everything else is
+	# copied from the source as written, quoting and spacing included
+	def substitute(self, value):
+		tokens = self._tokens
+		product = []
+		i = 0
+		for name, (begin, end) in icu.find_placeholders(value):
+			try:
+				token = tokens[name]
+			except KeyError:
+				continue
+			product.append(value[i:begin])
+			product.append(token)
+			i = end
+		if not product:
+			return value
+		product.append(value[i:])
+		return "".join(product)
+
+	# Same as calling it on the nodes of a branch from icu.get_simple_plural,
+	# from its raw text
+	def render_simple(self, raw):
+		if "'" in raw:
+			raw = raw.replace("''", "'")
+		if "{" in raw:
+			return _SIMPLE_TOKEN_REGEX.sub(self._replace_token, raw)
+		if "#" in raw:
+			return raw.replace("#", self._pound)
+		return raw
+
+	def _replace_token(self, m):
+		name = m.group(1)
+		if name is None:
+			return self._pound
+		try:
+			return self._tokens[name]
+		except KeyError:
+			return f"{{{name}}}"
 
+	# Turn the nodes of a plural branch back into a string in one pass, with
+	# ICU quoting removed and # replaced as well
+	def __call__(self, nodes):
+		product = []
+		self._render(nodes, product)
+		return "".join(product)
+
+	def _render(self, nodes, product):
+		tokens = self._tokens
+		for node in nodes:
+			t = type(node)
+			if t is icu.Literal or t is icu.Quoted:
+				product.append(node.text)
+			elif t is icu.Placeholder:
 				try:
-					t_other = t_patterns["other"]
-					t_str3 = self._prep_value(t_other, t_placeholders,
-						is_plural_string=True)
+					product.append(tokens[node.name])
 				except KeyError:
-					t_str3 = ""
-				yield f"msgstr[3] \"{t_str3}\""
+					product.append(f"{{{node.name}}}")
+			elif t is icu.Pound:
+				product.append(self._pound)
 			else:
-				yield f"msgctxt \"{o_key}\""
-				yield f"msgid \"{self._prep_value(o_value['value'], o_placeholders)}\""
-				try:
-					yield f"msgstr \"{self._prep_value(t_value['value'], t_placeholders)}\""
-				except KeyError:
-					yield f"msgstr \"\""
+				product.append(f"{{{node.var}, {node.kind},")
+				for k, v in node.options.items():
+					product.append(f" {k}{{")
+					self._render(v.nodes, product)
+					product.append("}")
+				product.append("}")
 
-	@staticmethod
-	def _is_plural_string(s):
-		return _Arb2Po._PLURAL_REGEX.match(s)
+# A source message. The msgid side, which doesn't depend on the locale, is
+# prepared by _Arb2Po on first use and kept for the other locales
+class _Source:
+	__slots__ = ("message", "lines", "is_plural")
 
-	# Search the matching closing bracket and return the closing index and the
-	# string in-between
-	@staticmethod
-	def _extract_bracket(s):
-		if not s.startswith("{"):
-			raise ValueError(f"string not beginning with {{: {s}")
-		nest = 0
-		for i, c in enumerate(s):
-			if c == "{":
-				nest += 1
-			elif c == "}":
-				nest -= 1
-				if nest == 0:
-					return i, s[0 + 1:i]
-		raise ValueError(f"Unbalanced bracket: {s}")
-
-	# Search the first plural pattern and return the ending index and the
-	# pattern
-	#
-	# Example: given "=0{zero}=1{one}..." return 7, ["=0", "zero"]
-	@staticmethod
-	def _extract_first_plural_pattern(s):
-		begin = s.find("{")
-		if begin == -1:
-			raise ValueError(f"Missing open bracket: {s}")
-		key = s[0:begin].strip()
-		i, value = _Arb2Po._extract_bracket(s[begin:])
-		return i + begin, [key, value]
-
-	# Extract the plural patterns
-	#
-	# Example: given "{count, plural, =0{zero}=1{one}other{#}}" return
-	# {"var": "count", "patterns": {"=0": "zero", "=1": "one", "other": "#"}}
+	def __init__(self, message):
+		self.message = message
+		# everything up to msgid/msgid_plural
+		self.lines = None
+		self.is_plural = False
+
+class _Arb2Po:
+	# The numeric and textual selectors of msgstr[0..3]
+	_PLURAL_CATEGORIES = (("=0", "zero"), ("=1", "one"), ("=2", "two"),
+		("other", "other"))
+	# Map:
+	# 	=0/zero => msgstr[0]
+	# 	=1/one => msgstr[1]
+	# 	=2/two => msgstr[2]
+	#	other => msgstr[3]
+	_PLURAL_FORMS = "nplurals=4; plural=n == 0 ? 0 : n == 1 ? 1 : n == 2 ? 2 : 3;"
+	_HEADER = (
+		"msgid \"\"",
+		"msgstr \"\"",
+		f"\"Plural-Forms: {_PLURAL_FORMS}\"",
+	)
+
+	# cache is an optional cache.EntryCache of the lines of each entry.
+	# memo_size is the number of prepared messages kept in memory, see
+	# _prep_message
+	def __init__(self, cache=None, memo_size=DEFAULT_MEMO_SIZE):
+		# placeholder names => _Substitution
+		self._substitutions = {}
+		self._cache = cache
+		self._prep_message = functools.lru_cache(memo_size)(
+			self._prep_message_uncached)
+
+	def __call__(self, original, translated):
+		return self._convert(self._prep_sources(original), translated)
+
+	# Wrap the source messages (messages.ArbMessage) in _Source
 	@staticmethod
-	def _extract_plural_patterns(s):
-		_, s = _Arb2Po._extract_bracket(s.strip())
-		sections = s.split(",")
-		var = sections[0].strip()
-		if sections[1].strip() != "plural":
-			raise ValueError("Not a plural string")
-		product = {
-			"var": var,
-			"patterns": {}
-		}
-		plural_s = "".join(sections[2:]).strip()
-		while plural_s:
-			i, pattern = _Arb2Po._extract_first_plural_pattern(plural_s)
-			product["patterns"][pattern[0]] = pattern[1]
-			plural_s = plural_s[i + 1:]
-		return product
-
-	# Prepare a string value to be written
+	def _prep_sources(original):
+		if isinstance(original, dict):
+			original = original.values()
+		for o_message in original:
+			yield _Source(o_message)
+
+	def _prep_source(self, o_message):
+		lines = []
+		o_key = o_message.key
+		o_placeholders = o_message.placeholders
+		# lines.append(f"#: {o_key}")
+		if o_message.description is not None:
+			lines.append(f"#. {o_message.description}")
+		o_subst = self._get_substitution(o_placeholders)
+		if o_placeholders:
+			o_examples = o_message.examples
+			for i, (n, op_key) in enumerate(o_subst.table.pairs):
+				string = f"#. Parameter {n}: {op_key}"
+				if o_examples is not None and o_examples[i] is not None:
+					string += f" (example: {o_examples[i]})"
+				lines.append(string)
+			lines.append("#, c-format")
+		else:
+			lines.append("#, no-c-format")
+
+		o_patterns, o_id, o_id_plural = self._prep_ids(o_message)
+		if o_patterns is not None:
+			try:
+				o_zero = (o_patterns["=0"] if "=0" in o_patterns
+					else o_patterns["zero"])
+				# rule for zero exists
+				lines.append(f"#. If zero: \"{self._escape_str(o_zero[0])}\"")
+			except KeyError:
+				pass
+			lines.append(f"msgctxt \"{o_key}\"")
+			lines.append(f"msgid \"{o_id}\"")
+			lines.append(f"msgid_plural \"{o_id_plural}\"")
+		else:
+			lines.append(f"msgctxt \"{o_key}\"")
+			lines.append(f"msgid \"{o_id}\"")
+		return lines, o_patterns is not None
+
+	# Return the options of the plural block of a source message (see
+	# _prep_message) or None if it isn't plural, its msgid and its
+	# msgid_plural (None if it isn't plural), escaped
+	def _prep_ids(self, o_message):
+		o_placeholders = o_message.placeholders
+		o_patterns = (self._prep_message(o_message.value, o_placeholders, True)
+			if o_placeholders else None)
+		if o_patterns is None:
+			return None, self._prep_message(o_message.value, o_placeholders,
+				False), None
+		try:
+			o_id = (o_patterns["=1"] if "=1" in o_patterns
+				else o_patterns["one"])[1]
+		except KeyError:
+			# use other{} then
+			o_id = ""
+		try:
+			o_id_plural = o_patterns["other"][1]
+		except KeyError:
+			raise ValueError(f"{o_message.key}: plural without other: "
+				f"{o_message.value}") from None
+		return o_patterns, o_id or o_id_plural, o_id_plural
+
+	# Combine the prepared sources with the translated messages of one locale
+	# and yield the lines of the PO file. With a cache, an entry may come as
+	# one line of several lines joined by newlines
+	def _convert(self, sources, translated):
+		yield from self._HEADER
+		for source in sources:
+			yield ""
+			o_message = source.message
+			t_message = translated.get(o_message.key)
+			if self._cache is None:
+				yield from self._prep_entry(source, t_message)
+				continue
+			digest = self._cache.digest(o_message.key, o_message.value,
+				o_message.description, o_message.placeholders,
+				o_message.examples,
+				t_message.value if t_message else None,
+				t_message.placeholders if t_message else None)
+			# cached as the text of its lines, which is yielded as one line
+			text = self._cache.get(digest)
+			if text is None:
+				text = "\n".join(self._prep_entry(source, t_message))
+				self._cache.put(digest, text)
+			yield text
+
+	# Return all the lines of an entry. t_message is None if untranslated
+	def _prep_entry(self, source, t_message):
+		if source.lines is None:
+			source.lines, source.is_plural = self._prep_source(source.message)
+		return source.lines + self._prep_translation(t_message,
+			source.is_plural)
+
+	# Return the msgstr lines of a translated message
+	def _prep_translation(self, t_message, is_plural):
+		t_strs = self._prep_msgstrs(t_message, is_plural)
+		if is_plural:
+			return [f"msgstr[{i}] \"{t_str}\"" for i, t_str in enumerate(t_strs)]
+		else:
+			return [f"msgstr \"{t_strs[0]}\""]
+
+	# Return the msgstrs of a translated message, escaped: msgstr[0..3] if
+	# is_plural, otherwise the single msgstr
+	def _prep_msgstrs(self, t_message, is_plural):
+		if t_message is None:
+			return [""] * (len(self._PLURAL_CATEGORIES) if is_plural else 1)
+		t_str = self._prep_message(t_message.value, t_message.placeholders,
+			is_plural)
+		if not is_plural:
+			return [t_str]
+		t_patterns = t_str or {}
+		t_strs = []
+		for numeric, textual in self._PLURAL_CATEGORIES:
+			try:
+				t_str = (t_patterns[numeric] if numeric in t_patterns
+					else t_patterns[textual])[1]
+			except KeyError:
+				t_str = ""
+			t_strs.append(t_str)
+		return t_strs
+
+	# Return the entries of a MO file (see mo.write) of the prepared sources
+	# and the translated messages of one locale, header first. Untranslated
+	# entries are left out, as msgfmt does
+	def mo_entries(self, sources, translated):
+		unescape = codec.unescape_po
+		entries = []
+		placeholders = {}
+		for source in sources:
+			o_message = source.message
+			t_message = translated.get(o_message.key)
+			if t_message is None:
+				continue
+			o_patterns, o_id, o_id_plural = self._prep_ids(o_message)
+			t_strs = self._prep_msgstrs(t_message, o_patterns is not None)
+			if not any(t_strs):
+				continue
+			entries.append((o_message.key, unescape(o_id),
+				None if o_id_plural is None else unescape(o_id_plural),
+				tuple(unescape(s) for s in t_strs)))
+			if o_message.placeholders:
+				placeholders[o_message.key] = o_message.placeholders
+		import mo
+		header = (f"Content-Type: text/plain; charset=UTF-8\n"
+			f"Plural-Forms: {self._PLURAL_FORMS}\n"
+			f"{mo.PLACEHOLDERS_FIELD}: "
+			f"{json.dumps(placeholders, ensure_ascii=False)}\n")
+		entries.insert(0, (None, "", None, (header,)))
+		return entries
+
+	# Prepare a message value to be written, with its placeholder names. If
+	# is_plural, return the options of its plural block as {selector: (raw,
+	# prepared)}, or None if it isn't one, otherwise the prepared string.
+	# Memoized by _prep_message, the same strings are repeated across keys and
+	# locales
+	def _prep_message_uncached(self, value, names, is_plural):
+		if not is_plural:
+			if not names or "{" not in value:
+				# nothing to substitute
+				return self._escape_str(value)
+			return self._prep_value(value, self._get_substitution(names))
+		if not value.startswith("{") or not value.endswith("}"):
+			# can't be a single block
+			return None
+		substitution = self._get_substitution(names)
+		branches = icu.get_simple_plural(value)
+		if branches is not None:
+			return {selector: (raw, self._escape_str(
+				substitution.render_simple(raw)))
+				for selector, raw in branches.items()}
+		plural = icu.get_plural(icu.parse(value))
+		if plural is None:
+			return None
+		return {selector: (branch.raw, self._prep_nodes(branch.nodes,
+			substitution)) for selector, branch in plural.options.items()}
+
+	# Return the hits and misses of the prepared messages memo, as
+	# functools.lru_cache's cache_info()
+	def memo_info(self):
+		return self._prep_message.cache_info()
+
+	# Return the compiled substitution of a tuple of placeholder names. Keys
+	# sharing the same names share one substitution
+	def _get_substitution(self, names):
+		try:
+			return self._substitutions[names]
+		except KeyError:
+			product = _Substitution(ordinals.Table.from_names(names))
+			self._substitutions[names] = product
+			return product
+
+	# Prepare a string value to be written. Only the placeholders are
+	# replaced, the rest is kept as written
 	@staticmethod
-	def _prep_value(value, placeholders, is_plural_string=False):
-		value_ = value
-		if placeholders:
-			value_ = _Arb2Po._transform_placeholders(value_, placeholders,
-				allow_sharp=is_plural_string)
-		value_ = _Arb2Po._escape_str(value_, is_icu=is_plural_string)
-		return value_
+	def _prep_value(value, substitution):
+		return _Arb2Po._escape_str(substitution.substitute(value))
 
+	# Prepare a parsed plural branch to be written
 	@staticmethod
-	def _transform_placeholders(s, placeholders, allow_sharp=False):
-		product = s
-		for i, key in enumerate(placeholders.keys()):
-			product = product.replace(f"{{{key}}}", f"%{i + 1}$s")
-		if allow_sharp:
-			find_i = -1
-			while True:
-				find_i = product.find("#", find_i + 1)
-				if find_i == -1:
-					break
-				if product[:find_i].count("'") % 2 == 0:
-					# even = not escaped
-					product = product[:find_i] + "%1$s" + product[find_i + 1:]
-					find_i += 4
-		return product
+	def _prep_nodes(nodes, substitution):
+		return _Arb2Po._escape_str(substitution(nodes))
 
 	# Escape invalid characters in string, like [", \n]
-	@staticmethod
-	def _escape_str(s, is_icu=False):
-		s = s.replace("\\", "\\\\")
-		s = s.replace("\"", "\\\"")
-		s = s.replace("\n", "\\n")
-		if is_icu:
-			s = _Arb2Po._ICU_ESCAPE_APOSTROPHES_REGEX.sub(r"\1", s)
-		return s
+	_escape_str = staticmethod(codec.escape_po)
 
-def arb2po(untranslated_file, translated_file):
-	original = _parse_arb(untranslated_file)
+# Write the lines to a file object, each followed by a newline. Lines are
+# collected and written about buffer_size characters at a time
+def _write_lines(lines, out, buffer_size=io.DEFAULT_BUFFER_SIZE):
+	buffer = []
+	size = 0
+	for l in lines:
+		buffer.append(l)
+		size += len(l) + 1
+		if size >= buffer_size:
+			buffer.append("")
+			out.write("\n".join(buffer))
+			buffer = []
+			size = 0
+	if buffer:
+		buffer.append("")
+		out.write("\n".join(buffer))
+
+# Return the source messages as a stream and the translated ones by key
+def _read_arbs(untranslated_file, translated_file):
+	original = _arb_entries(_iter_arb(untranslated_file))
 	if translated_file:
 		translated = _parse_arb(translated_file)
 	else:
 		translated = {}
+	return original, translated
+
+# Open the entry cache of a conversion in cache_dir. Each pair of input files
+# gets its own cache file, so concurrent conversions never share one
+def _open_cache(cache_dir, untranslated_file, translated_file,
+		cache_size=cache.DEFAULT_SIZE):
+	name = cache.EntryCache.digest(os.path.abspath(untranslated_file),
+		os.path.abspath(translated_file) if translated_file else None)
+	return cache.EntryCache(os.path.join(cache_dir, f"{name}.json"),
+		salt=cache.fingerprint([__file__, codec.__file__, icu.__file__,
+		messages.__file__, ordinals.__file__]), max_size=cache_size)
+
+def arb2po(untranslated_file, translated_file):
+	original, translated = _read_arbs(untranslated_file, translated_file)
 	return "\n".join(_Arb2Po()(original, translated))
 
-if __name__ == "__main__":
+# The converter of a _transform_chunk worker, set up by _init_transform
+_transform_state = None
+
+def _init_transform():
+	global _transform_state
+	_transform_state = _Arb2Po()
+
+# Convert a chunk of (source message, translated message or None), as their
+# ArbMessage.fields(), and return its lines as one string, each entry preceded
+# by an empty line as in _Arb2Po._convert
+def _transform_chunk(pairs):
+	arb2po_ = _transform_state
+	ArbMessage = messages.ArbMessage
+	lines = []
+	for o_fields, t_fields in pairs:
+		lines.append("")
+		lines += arb2po_._prep_entry(_Source(ArbMessage(*o_fields)),
+			ArbMessage(*t_fields) if t_fields else None)
+	return "\n".join(lines)
+
+# Same as _Arb2Po()(original, translated), but the entries are converted in
+# chunks by a pool of jobs processes, see batch.map_chunks. Each item is one
+# chunk of lines
+def _convert_parallel(original, translated, jobs):
+	yield from _Arb2Po._HEADER
+	pairs = ((m.fields(), t.fields() if t else None)
+		for m, t in ((m, translated.get(m.key)) for m in original))
+	yield from batch.map_chunks(_transform_chunk, pairs, jobs,
+		initializer=_init_transform)
+
+# Same as arb2po but stream the PO file to out instead of returning it. Unlike
+# arb2po, the output ends with a newline. If cache_dir is set, the lines of
+# unchanged entries are replayed from the cache there instead of converted
+# again. With jobs > 1, the entries are converted in that many processes
+# instead, without the cache, and written in the same order
+def arb2po_write(untranslated_file, translated_file, out,
+		buffer_size=io.DEFAULT_BUFFER_SIZE, cache_dir=None,
+		cache_size=cache.DEFAULT_SIZE, jobs=1):
+	original, translated = _read_arbs(untranslated_file, translated_file)
+	if jobs > 1:
+		_write_lines(_convert_parallel(original, translated, jobs), out,
+			buffer_size)
+		return
+	entry_cache = (_open_cache(cache_dir, untranslated_file, translated_file,
+		cache_size) if cache_dir else None)
+	_write_lines(_Arb2Po(entry_cache)(original, translated), out, buffer_size)
+	if entry_cache:
+		entry_cache.save()
+
+# Same as arb2po_write, but write a compiled gettext catalog (MO file) with
+# the translated entries to out, a binary file object. The placeholder names
+# are kept in the header for po2arb, see mo.PLACEHOLDERS_FIELD
+def arb2po_write_mo(untranslated_file, translated_file, out):
+	import mo
+	original, translated = _read_arbs(untranslated_file, translated_file)
+	mo.write(_Arb2Po().mo_entries(_Arb2Po._prep_sources(original), translated),
+		out)
+
+# Same as arb2po_write, but time each phase of the conversion separately in
+# phases (a timings.Timings). The phases run one after another instead of
+# being streamed, escape is part of transform. Return the hits and misses of
+# the prepared messages memo, see _Arb2Po.memo_info
+def arb2po_timed(untranslated_file, translated_file, out, phases):
+	with phases.phase("read"):
+		with open(untranslated_file, "r") as f:
+			src_text = f.read()
+		if translated_file:
+			with open(translated_file, "r") as f:
+				translated_text = f.read()
+	with phases.phase("parse"):
+		original = list(_arb_entries(_iter_arb_file(io.StringIO(src_text),
+			backend=jsonbackend.get_reader())))
+		if translated_file:
+			translated = _parse_arb_file(io.StringIO(translated_text),
+				jsonbackend.get_reader())
+		else:
+			translated = {}
+	with phases.phase("transform"), \
+			phases.patch(_Arb2Po, "_escape_str", "transform/escape"):
+		arb2po_ = _Arb2Po()
+		lines = list(arb2po_(original, translated))
+	with phases.phase("serialize"):
+		lines.append("")
+		text = "\n".join(lines)
+	with phases.phase("write"):
+		out.write(text)
+		out.flush()
+	return arb2po_.memo_info()
+
+# The start of each field line of a PO entry, e.g. msgstr[0]
+_PO_FIELD_REGEX = lazy.Regex(r"(msgctxt|msgid_plural|msgid|msgstr(?:\[[0-9]+\])?) ")
+_PARAMETER_NAME_REGEX = lazy.Regex(r"#\. Parameter [0-9]+: ([^ ]+)")
+
+# Comments added by translators, kept as is by arb2po_update
+def _is_translator_comment(l):
+	return l == "#" or l.startswith("# ")
+
+# Return the fields of some PO lines, e.g. {"msgid": ...}, with their strings
+# still escaped
+def _get_po_fields(lines):
+	product = {}
+	key = None
+	for l in lines:
+		m = _PO_FIELD_REGEX.match(l)
+		if m:
+			key = m.group(1)
+			product[key] = l[m.end():].strip()[1:-1]
+		elif l.startswith("\"") and key is not None:
+			product[key] += l.strip()[1:-1]
+	return product
+
+def _get_parameter_names(lines):
+	return [m.group(1) for m in map(_PARAMETER_NAME_REGEX.match, lines) if m]
+
+# Remove the fuzzy flag from the lines. Return the lines and whether it was
+# there
+def _remove_fuzzy(lines):
+	product = []
+	is_fuzzy = False
+	for l in lines:
+		if l.startswith("#,"):
+			flags = [f.strip() for f in l[2:].split(",")]
+			if "fuzzy" in flags:
+				is_fuzzy = True
+				flags = [f for f in flags if f != "fuzzy"]
+				if not flags:
+					continue
+				l = f"#, {', '.join(flags)}"
+		product.append(l)
+	return product, is_fuzzy
+
+def _add_fuzzy(lines):
+	for i, l in enumerate(lines):
+		if l.startswith("#,"):
+			return lines[:i] + [f"#, fuzzy,{l[2:]}"] + lines[i + 1:]
+		elif not l.startswith("#"):
+			return lines[:i] + ["#, fuzzy"] + lines[i:]
+	return lines + ["#, fuzzy"]
+
+# The lines of an entry of an existing PO file, followed by the blank lines
+# after it. raw and tail keep their line endings. An obsolete entry (#~) is
+# parsed as if it wasn't
+class _PoBlock:
+	__slots__ = ("raw", "tail", "key", "is_obsolete", "comments", "source",
+		"msgstr")
+
+	def __init__(self, raw, tail):
+		self.raw = raw
+		self.tail = tail
+		lines = [l.rstrip("\r\n") for l in raw]
+		self.is_obsolete = any(l.startswith("#~") for l in lines) \
+			and not any(l.startswith("\"") or _PO_FIELD_REGEX.match(l)
+				for l in lines)
+		if self.is_obsolete:
+			lines = [l[3:] if l.startswith("#~ ") else l[2:]
+				if l.startswith("#~") else l for l in lines]
+		# translator comments
+		self.comments = [l for l in lines if _is_translator_comment(l)]
+		i = next((i for i, l in enumerate(lines) if l.startswith("msgstr")),
+			len(lines))
+		# the other comments, msgctxt, msgid and msgid_plural
+		self.source = [l for l in lines[:i] if not _is_translator_comment(l)]
+		self.msgstr = lines[i:]
+		self.key = _get_po_fields(self.source).get("msgctxt")
+
+	def __str__(self):
+		return "".join(self.raw) + "".join(self.tail)
+
+	# Return this entry with its lines replaced by lines, keeping its line
+	# endings and the blank lines after it
+	def replace(self, lines):
+		last = self.raw[-1]
+		newline = last[len(last.rstrip("\r\n")):]
+		return (newline or "\n").join(lines) + newline + "".join(self.tail)
+
+# Split a PO file into _PoBlock
+def _iter_po_blocks(f):
+	raw = []
+	tail = []
+	for l in f:
+		if l.strip():
+			if tail:
+				yield _PoBlock(raw, tail)
+				raw = []
+				tail = []
+			raw.append(l)
+		else:
+			tail.append(l)
+	if raw or tail:
+		yield _PoBlock(raw, tail)
+
+# Merge the sources and their translations into the blocks of an existing PO
+# file, the way msgmerge does. Entries are matched by msgctxt: the comments
+# and msgid side come from the sources, existing translations are kept and
+# marked fuzzy if the msgid or the placeholders changed, untranslated ones
+# are taken from translated. New entries are appended and removed ones marked
+# obsolete. Return the text of the file as chunks, the index of the first
+# chunk that changed (len(chunks) if none did) and the number of updated,
+# added and obsoleted entries
+def _merge_po(arb2po_, sources, translated, blocks):
+	by_key = {}
+	for i, b in enumerate(blocks):
+		if b.key is not None:
+			by_key.setdefault(b.key, i)
+	chunks = [str(b) for b in blocks]
+	first = len(chunks)
+	updated = 0
+	added = []
+	if not blocks:
+		chunks.append("\n".join(_Arb2Po._HEADER) + "\n")
+		first = 0
+	for source in sources:
+		o_message = source.message
+		if source.lines is None:
+			source.lines, source.is_plural = arb2po_._prep_source(o_message)
+		i = by_key.pop(o_message.key, None)
+		if i is None:
+			added.append(source.lines + arb2po_._prep_translation(
+				translated.get(o_message.key), source.is_plural))
+			continue
+		block = blocks[i]
+		o_lines, is_fuzzy = _remove_fuzzy(block.source)
+		msgstr = block.msgstr
+		msgstr_fields = _get_po_fields(msgstr)
+		if any(msgstr_fields.values()) \
+				and ("msgstr" not in msgstr_fields) == source.is_plural:
+			o_fields = _get_po_fields(o_lines)
+			n_fields = _get_po_fields(source.lines)
+			for k in ("msgid", "msgid_plural"):
+				is_fuzzy |= o_fields.get(k) != n_fields.get(k)
+			is_fuzzy |= _get_parameter_names(o_lines) \
+				!= _get_parameter_names(source.lines)
+		else:
+			msgstr = arb2po_._prep_translation(translated.get(o_message.key),
+				source.is_plural)
+			is_fuzzy = False
+		lines = block.comments \
+			+ (_add_fuzzy(source.lines) if is_fuzzy else source.lines) + msgstr
+		if block.is_obsolete \
+				or lines != [l.rstrip("\r\n") for l in block.raw]:
+			chunks[i] = block.replace(lines)
+			first = min(first, i)
+			updated += 1
+	obsoleted = 0
+	for i in by_key.values():
+		block = blocks[i]
+		if block.is_obsolete:
+			continue
+		chunks[i] = block.replace(block.comments
+			+ [f"#~ {l}" for l in block.source + block.msgstr
+				if not l.startswith("#")])
+		first = min(first, i)
+		obsoleted += 1
+	if added:
+		# follow the line endings of the file
+		newline = "\r\n" if blocks and blocks[0].raw \
+			and blocks[0].raw[0].endswith("\r\n") else "\n"
+		first = min(first, len(chunks))
+		last = chunks[-1] if chunks else ""
+		if not last or last.endswith(newline * 2):
+			separator = ""
+		elif last.endswith(newline):
+			separator = newline
+		else:
+			separator = newline * 2
+		chunks.append(separator + (newline * 2).join(newline.join(lines)
+			for lines in added) + newline)
+	return chunks, first, (updated, len(added), obsoleted)
+
+# Update an existing PO file (or create it) from the ARB files, see _merge_po.
+# Only the file from the first changed entry on is written, so the I/O of a
+# small change near the end (e.g. new keys) is small too, unchanged entries
+# are left byte for byte. Return the number of updated, added and obsoleted
+# entries
+def arb2po_update(untranslated_file, translated_file, po_file):
+	try:
+		with open(po_file, "r", encoding="utf-8", newline="") as f:
+			blocks = list(_iter_po_blocks(f))
+	except FileNotFoundError:
+		blocks = []
+	original, translated = _read_arbs(untranslated_file, translated_file)
+	chunks, first, counts = _merge_po(_Arb2Po(),
+		_Arb2Po._prep_sources(original), translated, blocks)
+	if first < len(chunks):
+		offset = sum(len(c.encode()) for c in chunks[:first])
+		with open(po_file, "r+b" if blocks else "wb") as f:
+			f.seek(offset)
+			f.write("".join(chunks[first:]).encode())
+			f.truncate()
+	return counts
+
+# Keep the converted entries of a pair of ARB files in memory. update()
+# rereads the changed files and only reconverts the entries that differ
+class _Arb2PoSession:
+	def __init__(self, untranslated_file, translated_file):
+		self._untranslated_file = untranslated_file
+		self._translated_file = translated_file
+		self._arb2po = _Arb2Po()
+		self._original = {}
+		self._translated = {}
+		# key => lines of the entry
+		self._entries = {}
+		self.update([untranslated_file, translated_file])
+
+	# Reread the changed files and return the number of entries reconverted
+	def update(self, changed_files):
+		original = (_parse_arb(self._untranslated_file)
+			if self._untranslated_file in changed_files else self._original)
+		if self._translated_file and self._translated_file in changed_files:
+			translated = _parse_arb(self._translated_file)
+		else:
+			translated = self._translated
+		entries = {}
+		count = 0
+		for key, o_message in original.items():
+			t_message = translated.get(key)
+			if key in self._entries and o_message == self._original.get(key) \
+					and t_message == self._translated.get(key):
+				entries[key] = self._entries[key]
+			else:
+				entries[key] = self._arb2po._prep_entry(_Source(o_message),
+					t_message)
+				count += 1
+		self._original = original
+		self._translated = translated
+		self._entries = entries
+		return count
+
+	def __len__(self):
+		return len(self._entries)
+
+	def lines(self):
+		yield from _Arb2Po._HEADER
+		for lines in self._entries.values():
+			yield ""
+			yield from lines
+
+# Convert the ARB files to output, then keep watching them and update output
+# whenever they change, until interrupted
+def arb2po_watch(untranslated_file, translated_file, output, interval=0.5):
+	import watch
+	begin = time.perf_counter()
+	session = _Arb2PoSession(untranslated_file, translated_file)
+	watch.write_file(output, "\n".join(session.lines()) + "\n")
+	watch.log(output, len(session), begin)
+
+	def on_change(paths):
+		begin = time.perf_counter()
+		try:
+			count = session.update(paths)
+		except ValueError as e:
+			# probably saved halfway, wait for the next change
+			print(e, file=sys.stderr)
+			return
+		if count:
+			watch.write_file(output, "\n".join(session.lines()) + "\n")
+		watch.log(output, count, begin)
+
+	watch.watch([p for p in [untranslated_file, translated_file] if p],
+		on_change, interval)
+
+# Return the locale of a localized ARB file from its name, e.g. app_es.arb =>
+# es
+def _get_locale(path):
+	stem = os.path.splitext(os.path.basename(path))[0]
+	return stem.split("_", 1)[1] if "_" in stem else stem
+
+# State of a batch worker, set up once per process by _init_batch
+_batch_state = None
+
+def _init_batch(untranslated_file, buffer_size, cache_dir, cache_size):
+	global _batch_state
+	sources = list(_Arb2Po._prep_sources(
+		_arb_entries(_iter_arb(untranslated_file))))
+	_batch_state = (untranslated_file, _Arb2Po(), sources, buffer_size,
+		cache_dir, cache_size)
+
+def _run_batch(translated_file, output):
+	(untranslated_file, arb2po_, sources, buffer_size, cache_dir,
+		cache_size) = _batch_state
+	translated = _parse_arb(translated_file)
+	if output.endswith(".mo"):
+		import mo
+		with open(output, "wb") as f:
+			mo.write(arb2po_.mo_entries(sources, translated), f)
+		return
+	arb2po_._cache = (_open_cache(cache_dir, untranslated_file,
+		translated_file, cache_size) if cache_dir else None)
+	with open(output, "w", buffering=buffer_size) as f:
+		_write_lines(arb2po_._convert(sources, translated), f, buffer_size)
+	if arb2po_._cache:
+		arb2po_._cache.save()
+
+# Convert one source ARB file to a PO file per localized ARB file, written to
+# out_dir as LOCALE.po. The source is only read and its msgid side prepared
+# once for all locales (once per worker with jobs > 1). cache_dir is the same
+# as arb2po_write. With mo, write LOCALE.mo files instead, as
+# arb2po_write_mo. Return the paths of the PO files. Raise batch.BatchError if
+# any of the files failed, the others are still converted
+def arb2po_batch(untranslated_file, translated_files, out_dir,
+		buffer_size=io.DEFAULT_BUFFER_SIZE, jobs=1, cache_dir=None,
+		cache_size=cache.DEFAULT_SIZE, mo=False):
+	extension = "mo" if mo else "po"
+	outputs = [os.path.join(out_dir, f"{_get_locale(p)}.{extension}")
+		for p in translated_files]
+	if len(set(outputs)) != len(outputs):
+		raise ValueError(f"Localized ARB files sharing the same locale: {translated_files}")
+	batch.run(_run_batch, list(zip(translated_files, outputs)), jobs=jobs,
+		initializer=_init_batch, initargs=(untranslated_file, buffer_size,
+			cache_dir, cache_size))
+	return outputs
+
+# Return the parser of the command line
+def _get_parser():
 	import argparse
 	parser = argparse.ArgumentParser(
+		formatter_class=batch.help_formatter,
 		description="Convert ARB file to something compatible with the gettext PO format",
 	)
 	parser.add_argument(
@@ -249,8 +1034,187 @@ if __name__ == "__main__":
 	)
 	parser.add_argument(
 		"localized_arb",
-		nargs="?",
-		help="Translated strings will be taken form this file if available"
+		nargs="*",
+		help="Translated strings will be taken form this file if available. Multiple files, glob patterns or directories (of app_*.arb) require --output-dir"
 	)
-	_args = parser.parse_args()
-	print(arb2po(_args.src_arb, _args.localized_arb))
+	parser.add_argument(
+		"-o", "--output",
+		help="Write the PO file here instead of stdout"
+	)
+	parser.add_argument(
+		"-d", "--output-dir",
+		help="Batch mode, write one LOCALE.po per localized ARB file to this directory"
+	)
+	parser.add_argument(
+		"-w", "--watch",
+		action="store_true",
+		help="Keep watching the ARB files and update OUTPUT whenever they change, requires --output"
+	)
+	parser.add_argument(
+		"-u", "--update",
+		action="store_true",
+		help="Update OUTPUT in place, msgmerge style: existing translations are kept, new keys appended and removed ones marked obsolete. Requires --output"
+	)
+	parser.add_argument(
+		"--mo",
+		action="store_true",
+		help="Write a compiled gettext MO file with the translated entries instead, LOCALE.mo in batch mode. Implied by an OUTPUT ending in .mo"
+	)
+	parser.add_argument(
+		"-j", "--jobs",
+		type=int,
+		default=1,
+		help="Number of locales to convert concurrently in batch mode, or of processes to split the entries of a single file between (default: %(default)s)"
+	)
+	parser.add_argument(
+		"--cache",
+		action="store_true",
+		help="Cache the output of each entry, unchanged entries are not converted again"
+	)
+	parser.add_argument(
+		"--cache-dir",
+		help=f"Cache here, implies --cache (default: {cache.get_default_dir()})"
+	)
+	parser.add_argument(
+		"--cache-size",
+		type=int,
+		default=cache.DEFAULT_SIZE,
+		help="Maximum number of entries cached per pair of input files (default: %(default)s)"
+	)
+	parser.add_argument(
+		"--no-cache",
+		action="store_true",
+		help="Don't read or write the cache, the default"
+	)
+	parser.add_argument(
+		"--buffer-size",
+		type=int,
+		default=io.DEFAULT_BUFFER_SIZE,
+		help="Number of characters to buffer before each write (default: %(default)s)"
+	)
+	parser.add_argument(
+		"--json-backend",
+		choices=jsonbackend.NAMES,
+		help=f"JSON library to read and write ARB files with, auto reads with json and picks the fastest installed for the rest (default: ${jsonbackend.ENV_VAR} or auto)"
+	)
+	parser.add_argument(
+		"--timings",
+		action="store_true",
+		help="Report the wall and CPU time of each phase on stderr. Not supported in batch or watch mode, and the cache is not used"
+	)
+	parser.add_argument(
+		"--profile",
+		metavar="FILE",
+		help="Run under cProfile and dump the stats to FILE"
+	)
+	return parser
+
+# Send the conversion of the command line to the daemon set in ARB2PO_DAEMON,
+# if any and it's a single file conversion the daemon does, and exit. Return
+# if it should be done locally instead. Options the daemon can't honor are
+# rejected, --no-cache is as the daemon has no cache on disk
+def _run_daemon(parser, args, localized_arbs, is_mo):
+	if not os.environ.get("ARB2PO_DAEMON") or args.update or args.watch \
+			or args.output_dir or is_mo or args.timings or args.profile \
+			or len(localized_arbs) > 1:
+		return
+	if args.jobs != 1 or args.json_backend \
+			or args.cache or args.cache_dir \
+			or args.cache_size != cache.DEFAULT_SIZE:
+		parser.error("--jobs, --json-backend, --cache, --cache-dir and --cache-size are not supported with ARB2PO_DAEMON")
+	import daemon
+	if daemon.run_cli({"op": "arb2po", "src": args.src_arb,
+			"translated": next(iter(localized_arbs), None),
+			"output": args.output, "buffer_size": args.buffer_size}):
+		sys.exit(0)
+
+# Run the command line, through the daemon if it does the conversion
+def main():
+	parser = _get_parser()
+	args = parser.parse_args()
+	localized_arbs = batch.expand_paths(args.localized_arb, "app_*.arb",
+		exclude=[args.src_arb])
+	is_mo = args.mo or bool(args.output and args.output.endswith(".mo"))
+	_run_daemon(parser, args, localized_arbs, is_mo)
+	if args.json_backend:
+		# inherited by the processes of batch mode
+		os.environ[jsonbackend.ENV_VAR] = args.json_backend
+	try:
+		jsonbackend.use(os.environ.get(jsonbackend.ENV_VAR) or "auto")
+	except (ImportError, ValueError) as e:
+		parser.error(str(e))
+	cache_dir = (args.cache_dir or cache.get_default_dir()) \
+		if (args.cache or args.cache_dir) and not args.no_cache else None
+	if is_mo and (args.watch or args.update or args.timings):
+		parser.error("--mo is not supported in watch, update or timings mode")
+	if args.timings and (args.watch or args.update or args.output_dir
+			or len(localized_arbs) > 1):
+		parser.error("--timings is only supported when converting a single file")
+
+	def run():
+		if args.timings:
+			import timings
+			phases = timings.Timings()
+			if args.output:
+				with open(args.output, "w", buffering=args.buffer_size) as f:
+					memo = arb2po_timed(args.src_arb,
+						next(iter(localized_arbs), None), f, phases)
+			else:
+				memo = arb2po_timed(args.src_arb,
+					next(iter(localized_arbs), None), sys.stdout, phases)
+			phases.report()
+			print(f"memo: {memo.hits} hits, {memo.misses} misses, "
+				f"{memo.currsize} kept", file=sys.stderr)
+		else:
+			run_cli()
+
+	def run_cli():
+		if args.update:
+			if not args.output or len(localized_arbs) > 1 or args.watch \
+					or args.output_dir:
+				parser.error("--update requires --output and at most one localized ARB file")
+			counts = arb2po_update(args.src_arb,
+				next(iter(localized_arbs), None), args.output)
+			print(f"{args.output}: {counts[0]} updated, {counts[1]} added, "
+				f"{counts[2]} obsolete", file=sys.stderr)
+		elif args.watch:
+			if not args.output or len(localized_arbs) > 1:
+				parser.error("--watch requires --output and at most one localized ARB file")
+			arb2po_watch(args.src_arb, next(iter(localized_arbs), None),
+				args.output)
+		elif args.output_dir:
+			try:
+				arb2po_batch(args.src_arb, localized_arbs, args.output_dir,
+					buffer_size=args.buffer_size, jobs=args.jobs,
+					cache_dir=cache_dir, cache_size=args.cache_size, mo=is_mo)
+			except batch.BatchError as e:
+				print(e, file=sys.stderr)
+				sys.exit(1)
+		elif len(localized_arbs) > 1:
+			parser.error("multiple localized ARB files require --output-dir")
+		elif is_mo:
+			if args.output:
+				with open(args.output, "wb") as f:
+					arb2po_write_mo(args.src_arb,
+						next(iter(localized_arbs), None), f)
+			else:
+				arb2po_write_mo(args.src_arb, next(iter(localized_arbs), None),
+					sys.stdout.buffer)
+		elif args.output:
+			with open(args.output, "w", buffering=args.buffer_size) as f:
+				arb2po_write(args.src_arb, next(iter(localized_arbs), None), f,
+					buffer_size=args.buffer_size, cache_dir=cache_dir,
+					cache_size=args.cache_size, jobs=args.jobs)
+		else:
+			arb2po_write(args.src_arb, next(iter(localized_arbs), None),
+				sys.stdout, buffer_size=args.buffer_size, cache_dir=cache_dir,
+				cache_size=args.cache_size, jobs=args.jobs)
+
+	if args.profile:
+		import timings
+		timings.profile(args.profile, run)
+	else:
+		run()
+
+if __name__ == "__main__":
+	main()
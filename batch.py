@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+
+# The run time map_chunks aims for per chunk: long enough to make up for
+# sending the chunk to a worker and its result back, short enough to keep the
+# workers evenly busy
+CHUNK_TIME = 0.05
+
+# Raised once a batch has finished with some of its files failed
+class BatchError(Exception):
+	def __init__(self, errors):
+		# [(path, exception)], in the order of the input files
+		self.errors = errors
+		super().__init__("\n".join(f"{path}: {e}" for path, e in errors))
+
+# Return the paths matching a glob pattern, sorted. glob is only imported
+# here, it takes longer than converting a small file
+def _glob(pattern):
+	import glob
+	return sorted(glob.glob(pattern))
+
+# Expand the paths: directories are replaced by the files inside matching
+# dir_pattern, and glob patterns are expanded for shells that don't. Paths in
+# exclude are dropped from the expanded directories
+def expand_paths(paths, dir_pattern, exclude=()):
+	exclude = {os.path.abspath(p) for p in exclude}
+	product = []
+	for p in paths:
+		if os.path.isdir(p):
+			product += [f for f in _glob(os.path.join(p, dir_pattern))
+				if os.path.abspath(f) not in exclude]
+		# the same as glob.has_magic
+		elif any(c in p for c in "*?["):
+			product += _glob(p)
+		else:
+			product.append(p)
+	return product
+
+# Return an argparse formatter, the same as argparse.HelpFormatter(prog) but
+# without importing shutil for the width of the terminal, which takes longer
+# than converting a small file along with the compression modules it imports.
+# argparse makes one for each argument added, not only to print the help
+def help_formatter(prog):
+	import argparse
+	return argparse.HelpFormatter(prog, width=_get_terminal_width() - 2)
+
+# Return the number of columns of the terminal, as shutil.get_terminal_size
+def _get_terminal_width():
+	try:
+		columns = int(os.environ["COLUMNS"])
+	except (KeyError, ValueError):
+		columns = 0
+	if columns <= 0:
+		try:
+			columns = os.get_terminal_size(sys.__stdout__.fileno()).columns
+		except (AttributeError, ValueError, OSError):
+			columns = 0
+	return columns or 80
+
+# Call func(path, *args) for each (path, *args) in tasks. With jobs > 1, the
+# tasks run concurrently in a pool of that many processes, in which case func
+# and initializer must be picklable. initializer(*initargs) is run once per
+# worker (or once in this process) before any task. A failed task doesn't
+# stop the others, BatchError is raised at the end if any of them failed
+def run(func, tasks, jobs=1, initializer=None, initargs=()):
+	errors = []
+	if jobs > 1 and len(tasks) > 1:
+		import concurrent.futures
+		with concurrent.futures.ProcessPoolExecutor(
+				max_workers=min(jobs, len(tasks)), initializer=initializer,
+				initargs=initargs) as pool:
+			futures = [pool.submit(func, *t) for t in tasks]
+			for t, future in zip(tasks, futures):
+				e = future.exception()
+				if e is not None:
+					errors.append((t[0], e))
+	else:
+		if initializer:
+			initializer(*initargs)
+		for t in tasks:
+			try:
+				func(*t)
+			except Exception as e:
+				errors.append((t[0], e))
+	if errors:
+		raise BatchError(errors)
+
+# Run func in a worker and return its result with the CPU time it took, which
+# unlike the wall time doesn't depend on how busy the other workers keep the
+# machine
+def _timed_call(func, chunk):
+	begin = time.process_time()
+	product = func(chunk)
+	return product, time.process_time() - begin
+
+# Yield func(chunk) for consecutive chunks (lists) of items, in order, run in a
+# pool of jobs processes. func and initializer must be picklable, see run().
+# The first chunks have first_size items, the next ones are sized to take
+# about chunk_time each from the CPU time per item measured so far, up to
+# max_size. Items are read as chunks are submitted, and at most 2 chunks per
+# worker are pending at a time. The first exception raised by func is raised
+# here
+def map_chunks(func, items, jobs, initializer=None, initargs=(),
+		chunk_time=CHUNK_TIME, first_size=64, max_size=65536):
+	import collections
+	import concurrent.futures
+	import itertools
+	items = iter(items)
+	# (future, number of items)
+	pending = collections.deque()
+	# seconds per item, a moving average of the chunks done
+	cost = None
+	size = first_size
+	with concurrent.futures.ProcessPoolExecutor(max_workers=jobs,
+			initializer=initializer, initargs=initargs) as pool:
+		while True:
+			while len(pending) < 2 * jobs:
+				chunk = list(itertools.islice(items, size))
+				if not chunk:
+					break
+				pending.append((pool.submit(_timed_call, func, chunk),
+					len(chunk)))
+			if not pending:
+				return
+			future, count = pending.popleft()
+			product, elapsed = future.result()
+			item_cost = elapsed / count
+			cost = item_cost if cost is None else (cost + item_cost) / 2
+			# a chunk slowed down by e.g. a garbage collection shouldn't
+			# throw the size off, change it by 4 times at most
+			target = int(chunk_time / cost) if cost > 0 else max_size
+			size = max(1, size // 4, min(max_size, size * 4, target))
+			yield product
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# Time arb2po without the entry cache, with an empty one (cold) and with one
+# filled by the previous run (warm), and check they all write the same output
+#
+# Usage: python -m bench.cache [ENTRIES]
+import io
+import os
+import sys
+import tempfile
+import time
+import arb2po
+from bench import corpus
+
+# Return the time of converting the corpus once, and the output
+def _time(src, es, cache_dir):
+	out = io.StringIO()
+	begin = time.perf_counter()
+	arb2po.arb2po_write(src, es, out, cache_dir=cache_dir)
+	return time.perf_counter() - begin, out.getvalue()
+
+# Return the best times of repeat runs without cache, cold and warm, and
+# whether the outputs are all the same
+def run(count, repeat=3):
+	no_cache = cold = warm = None
+	is_same = True
+	with tempfile.TemporaryDirectory() as d:
+		src, es, _ = corpus.write_corpus(d, count)
+		for i in range(repeat):
+			t, expect = _time(src, es, None)
+			no_cache = t if no_cache is None else min(no_cache, t)
+			cache_dir = os.path.join(d, f"cache{i}")
+			t, text = _time(src, es, cache_dir)
+			cold = t if cold is None else min(cold, t)
+			is_same = is_same and text == expect
+			t, text = _time(src, es, cache_dir)
+			warm = t if warm is None else min(warm, t)
+			is_same = is_same and text == expect
+	return no_cache, cold, warm, is_same
+
+def main(count):
+	no_cache, cold, warm, is_same = run(count)
+	print(f"entries: {count}")
+	print(f"no cache: {no_cache:.3f}s")
+	print(f"cold: {cold:.3f}s (x{no_cache / cold:.2f})")
+	print(f"warm: {warm:.3f}s (x{no_cache / warm:.2f})"
+		f"{'' if is_same else ', OUTPUT DIFFERS'}")
+
+if __name__ == "__main__":
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# Time the codec functions against the alternatives they were picked over, on
+# the strings of a synthetic corpus
+#
+# Usage: python -m bench.codec [ENTRIES]
+import ast
+import re
+import sys
+import tempfile
+import time
+import arb2po
+import codec
+import po2arb
+from bench import corpus
+
+_PO_TABLE = str.maketrans({"\\": "\\\\", "\"": "\\\"", "\n": "\\n"})
+_PO_REGEX = re.compile(r"[\\\"\n]")
+_PO_MAP = {"\\": "\\\\", "\"": "\\\"", "\n": "\\n"}
+
+# The alternatives, by codec function
+_CANDIDATES = {
+	"escape_po": [
+		("codec.escape_po", codec.escape_po),
+		("str.translate", lambda s: s.translate(_PO_TABLE)),
+		("re.sub", lambda s: _PO_REGEX.sub(lambda m: _PO_MAP[m.group()], s)),
+	],
+	"quote_icu": [
+		("codec.quote_icu", codec.quote_icu),
+		("str.replace x2 (not correct for #')",
+			lambda s: s.replace("'", "''").replace("#", "'#'")),
+	],
+	"unescape_po": [
+		("codec.unescape_po", codec.unescape_po),
+		("ast.literal_eval", lambda s: ast.literal_eval(f"\"{s}\"")),
+	],
+}
+
+# Return the best time of calling func on every string, out of repeat runs
+def _time(func, strings, repeat=5):
+	best = None
+	for _ in range(repeat):
+		begin = time.perf_counter()
+		for s in strings:
+			func(s)
+		elapsed = time.perf_counter() - begin
+		if best is None or elapsed < best:
+			best = elapsed
+	return best
+
+def main(count):
+	with tempfile.TemporaryDirectory() as d:
+		src, es, po = corpus.write_corpus(d, count)
+		# the strings as they are escaped, quoted and unescaped by the tools
+		values = [m.value for m in arb2po._parse_arb(es).values()]
+		strings = {
+			"escape_po": values,
+			"quote_icu": [s for e in po2arb._parse_po(po)
+				for s in (e.msgstr_plural or ())],
+			"unescape_po": [codec.escape_po(s) for s in values],
+		}
+	print(f"entries: {count}")
+	for name, candidates in _CANDIDATES.items():
+		print(f"{name} ({len(strings[name])} strings):")
+		baseline = None
+		for label, func in candidates:
+			elapsed = _time(func, strings[name])
+			if baseline is None:
+				baseline = elapsed
+			print(f"  {label}: {elapsed * 1e9 / len(strings[name]):.0f}ns/string"
+				f" (x{elapsed / baseline:.2f})")
+
+if __name__ == "__main__":
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
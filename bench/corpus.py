@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# Generate synthetic ARB corpora for benchmarking
+#
+# Usage: python -m bench.corpus OUT_DIR SIZE [--mix plain=5,plural=1...]
+import json
+import os
+import random
+
+# Named corpus sizes, in number of messages
+SIZES = {
+	"1k": 1000,
+	"10k": 10000,
+	"100k": 100000,
+	"1m": 1000000,
+}
+
+# Relative weight of each kind of message
+DEFAULT_MIX = {
+	"plain": 50,
+	"placeholder": 25,
+	"plural": 15,
+	"multiline": 10,
+}
+
+_WORDS = ["lorem", "ipsum", "dolor", "sit", "amet", "consectetur",
+	"adipiscing", "elit", "sed", "do", "eiusmod", "tempor", "incididunt", "ut",
+	"labore", "et", "dolore", "magna", "aliqua", "it's", "\"quoted\"", "#1"]
+_TRANSLATED_WORDS = ["texto", "traducido", "más", "niño", "canción", "señal",
+	"über", "größe", "日本語", "★", "l'été", "#2"]
+
+# Parse a mix like "plain=5,plural=1", kinds not mentioned get a weight of 0
+def parse_mix(s):
+	product = {kind: 0 for kind in DEFAULT_MIX}
+	for item in s.split(","):
+		kind, weight = item.split("=")
+		if kind not in product:
+			raise ValueError(f"Unknown message kind: {kind}")
+		product[kind] = float(weight)
+	return product
+
+def _text(rand, words, count):
+	return " ".join(rand.choice(words) for _ in range(count))
+
+# Return the (value, attributes) of a message of this kind. struct_rand decides
+# what must match between the source and translated messages
+def _message(struct_rand, rand, kind, words):
+	if kind == "plain":
+		return _text(rand, words, rand.randint(1, 8)), None
+	elif kind == "placeholder":
+		names = [f"param{i}" for i in range(struct_rand.randint(1, 6))]
+		value = " ".join(f"{_text(rand, words, rand.randint(1, 3))} {{{n}}}"
+			for n in names)
+		return value, {"placeholders": {n: {"example": n} for n in names}}
+	elif kind == "plural":
+		text = _text(rand, words, rand.randint(2, 12)).replace("'", "''") \
+			.replace("#", "'#'")
+		value = (f"{{count, plural, =0{{none {text}}} =1{{one {text}}} "
+			f"=2{{two {{count}} {text}}} other{{# {text} {{name}}}}}}")
+		return value, {"placeholders": {"count": {}, "name": {}}}
+	else:
+		value = "\n".join(_text(rand, words, rand.randint(3, 10))
+			for _ in range(rand.randint(2, 5)))
+		return value, None
+
+# Write an ARB file of count messages, one JSON entry at a time. The same seed
+# gives the same keys and kinds, translated gives the localized counterpart
+def write_arb(path, count, mix=DEFAULT_MIX, translated=False, seed=0):
+	kinds = list(mix)
+	weights = [mix[k] for k in kinds]
+	struct_rand = random.Random(seed)
+	text_rand = random.Random(seed + 1 if translated else seed)
+	words = _TRANSLATED_WORDS if translated else _WORDS
+	with open(path, "w", encoding="utf-8") as f:
+		f.write("{")
+		if translated:
+			f.write("\n  \"@@locale\": \"es\",")
+		for i in range(count):
+			kind = struct_rand.choices(kinds, weights)[0]
+			value, attributes = _message(struct_rand, text_rand, kind, words)
+			key = f"{kind}{i}"
+			f.write(f"{',' if i else ''}\n  \"{key}\": "
+				f"{json.dumps(value, ensure_ascii=False)}")
+			if attributes is not None:
+				if not translated:
+					attributes["description"] = f"Description of {key}"
+				f.write(f",\n  \"@{key}\": "
+					f"{json.dumps(attributes, ensure_ascii=False)}")
+		f.write("\n}\n")
+
+# Write app_en.arb, app_es.arb and es.po of count messages to out_dir. Return
+# their paths
+def write_corpus(out_dir, count, mix=DEFAULT_MIX, seed=0):
+	import arb2po
+	os.makedirs(out_dir, exist_ok=True)
+	src = os.path.join(out_dir, "app_en.arb")
+	es = os.path.join(out_dir, "app_es.arb")
+	po = os.path.join(out_dir, "es.po")
+	write_arb(src, count, mix, seed=seed)
+	write_arb(es, count, mix, translated=True, seed=seed)
+	with open(po, "w", encoding="utf-8") as f:
+		arb2po.arb2po_write(src, es, f)
+	return src, es, po
+
+if __name__ == "__main__":
+	import argparse
+	parser = argparse.ArgumentParser(
+		description="Generate a synthetic corpus: app_en.arb, app_es.arb and es.po",
+	)
+	parser.add_argument(
+		"out_dir",
+	)
+	parser.add_argument(
+		"size",
+		help=f"Number of messages, or one of {', '.join(SIZES)}"
+	)
+	parser.add_argument(
+		"--mix",
+		help="Relative weight of each kind of message, e.g. plain=5,plural=1 (kinds: "
+			+ ", ".join(DEFAULT_MIX) + ")"
+	)
+	parser.add_argument(
+		"--seed",
+		type=int,
+		default=0,
+	)
+	_args = parser.parse_args()
+	write_corpus(_args.out_dir, SIZES.get(_args.size) or int(_args.size),
+		parse_mix(_args.mix) if _args.mix else DEFAULT_MIX, _args.seed)
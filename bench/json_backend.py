@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# Compare the installed JSON backends reading ARB files (arb2po) and writing
+# them (po2arb), and check they all write the same bytes
+#
+# Usage: python -m bench.json_backend [ENTRIES]
+import io
+import sys
+import tempfile
+import time
+import arb2po
+import jsonbackend
+import po2arb
+from bench import corpus
+
+# Return the best time of repeat calls to func, and what it returned
+def _time(func, repeat=3):
+	best = None
+	for _ in range(repeat):
+		begin = time.perf_counter()
+		product = func()
+		elapsed = time.perf_counter() - begin
+		if best is None or elapsed < best:
+			best = elapsed
+	return best, product
+
+def _read(path):
+	for _ in arb2po._iter_arb(path):
+		pass
+
+def _write(path):
+	out = io.StringIO()
+	po2arb.po2arb_write(path, out)
+	return out.getvalue()
+
+def main(count):
+	results = []
+	with tempfile.TemporaryDirectory() as d:
+		src, es, po = corpus.write_corpus(d, count)
+		for name in jsonbackend.available():
+			jsonbackend.use(name)
+			read, _ = _time(lambda: _read(src))
+			write, text = _time(lambda: _write(po))
+			results.append((name, read, write, text))
+	print(f"entries: {count}")
+	baseline = results[0]
+	for name, read, write, text in results:
+		print(f"{name}: read {read:.3f}s (x{baseline[1] / read:.2f}), "
+			f"write {write:.3f}s (x{baseline[2] / write:.2f})"
+			f"{'' if text == baseline[3] else ', OUTPUT DIFFERS'}")
+
+if __name__ == "__main__":
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# Compare the memory held by the parsed entries of a corpus as
+# messages.ArbMessage/PoEntry against the plain dicts they replaced
+#
+# Usage: python -m bench.model [ENTRIES]
+import gc
+import sys
+import tempfile
+import tracemalloc
+import arb2po
+import po2arb
+from bench import corpus
+
+# The ARB messages as {key: {"value": ..., "attributes": ...}}
+def _arb_dicts(path):
+	product = {}
+	for key, value, attributes in arb2po._iter_arb(path):
+		entry = {"value": value}
+		if attributes is not None:
+			entry["attributes"] = attributes
+		product[key] = entry
+	return product
+
+# The PO entries as {"msgctxt": ..., "msgstr[0]": ..., "parameters": ...}
+def _po_dicts(path):
+	product = []
+	for e in po2arb._parse_po(path):
+		entry = {"msgid": e.msgid}
+		if e.msgctxt is not None:
+			entry["msgctxt"] = e.msgctxt
+		if e.msgid_plural is not None:
+			entry["msgid_plural"] = e.msgid_plural
+		if e.msgstr_plural is None:
+			entry["msgstr"] = e.msgstr
+		else:
+			for i, s in enumerate(e.msgstr_plural):
+				entry[f"msgstr[{i}]"] = s
+		if e.parameters:
+			entry["parameters"] = {str(n): name for n, name in e.parameters}
+		product.append(entry)
+	return product
+
+# Return the bytes still allocated by what func(path) returns
+def _measure(func, path):
+	gc.collect()
+	tracemalloc.start()
+	try:
+		product = func(path)
+		size = tracemalloc.get_traced_memory()[0]
+	finally:
+		tracemalloc.stop()
+	del product
+	return size
+
+def main(count):
+	with tempfile.TemporaryDirectory() as d:
+		src, es, po = corpus.write_corpus(d, count)
+		results = [
+			("arb", _measure(_arb_dicts, src), _measure(arb2po._parse_arb, src)),
+			("po", _measure(_po_dicts, po), _measure(po2arb._parse_po, po)),
+		]
+	print(f"entries: {count}")
+	for name, baseline, current in results:
+		print(f"{name}: dicts {baseline / 2 ** 20:.1f}MB "
+			f"({baseline / count:.0f}B/entry), "
+			f"model {current / 2 ** 20:.1f}MB ({current / count:.0f}B/entry), "
+			f"x{baseline / current:.2f}")
+
+if __name__ == "__main__":
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
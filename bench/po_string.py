@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# Compare _parse_po with the PO string decoder against ast.literal_eval
+#
+# Usage: python -m bench.po_string [ENTRIES]
+import ast
+import os
+import sys
+import tempfile
+import time
+import po2arb
+
+def _write_po(f, count):
+	f.write("msgid \"\"\nmsgstr \"\"\n")
+	for i in range(count):
+		f.write("\n")
+		if i % 4 == 0:
+			f.write("#. Parameter 1: count\n#, c-format\n")
+			f.write(f"msgctxt \"plural{i}\"\n")
+			f.write("msgid \"One \\\"item\\\"\"\n")
+			f.write("msgid_plural \"%1$s items\"\n")
+			for j in range(4):
+				f.write(f"msgstr[{j}] \"%1$s translated ★ {j}\"\n")
+		else:
+			f.write("#, no-c-format\n")
+			f.write(f"msgctxt \"key{i}\"\n")
+			f.write("msgid \"Some text\\nthat spans\"\n\"two lines\"\n")
+			f.write("msgstr \"Translated \\\\ text ★\"\n")
+
+def _time(path):
+	begin = time.perf_counter()
+	po2arb._parse_po(path)
+	return time.perf_counter() - begin
+
+def main(count):
+	fd, path = tempfile.mkstemp(suffix=".po")
+	try:
+		with os.fdopen(fd, "w") as f:
+			_write_po(f, count)
+		decoder = po2arb._unescape_payload
+		po2arb._unescape_payload = lambda s: ast.literal_eval(
+			"\"" + s.decode() + "\"")
+		try:
+			baseline = _time(path)
+		finally:
+			po2arb._unescape_payload = decoder
+		current = _time(path)
+	finally:
+		os.remove(path)
+	print(f"entries: {count}")
+	print(f"ast.literal_eval: {baseline:.3f}s")
+	print(f"_unescape_payload: {current:.3f}s")
+	print(f"speedup: {baseline / current:.1f}x")
+
+if __name__ == "__main__":
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# Time arb2po and po2arb end to end on synthetic corpora
+#
+# Usage: python -m bench.run [--sizes 1k,10k] [--save FILE] [--compare FILE]
+# [--tree DIR]
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from bench import corpus
+
+TOOLS = ("arb2po", "po2arb")
+
+# Run one conversion in this process with the tools of tree and return its
+# measurements. Meant to be run in a fresh child process, so that the peak RSS
+# is its own
+def _measure(tree, tool, src, es, po, out):
+	import resource
+	sys.path.insert(0, tree)
+	begin = time.perf_counter()
+	begin_cpu = time.process_time()
+	if tool == "arb2po":
+		import arb2po
+		with open(out, "w", encoding="utf-8") as f:
+			if hasattr(arb2po, "arb2po_write"):
+				arb2po.arb2po_write(src, es, f)
+			else:
+				# older trees, e.g. the first commit
+				f.write(arb2po.arb2po(src, es))
+				f.write("\n")
+	else:
+		import po2arb
+		with open(out, "w", encoding="utf-8") as f:
+			f.write(po2arb.po2arb(po))
+			f.write("\n")
+	wall = time.perf_counter() - begin
+	cpu = time.process_time() - begin_cpu
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	if sys.platform == "darwin":
+		# bytes instead of KB
+		rss //= 1024
+	return {"wall": wall, "cpu": cpu, "peak_rss_kb": rss}
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _run_child(tree, tool, paths, out):
+	result = subprocess.run([sys.executable, "-m", "bench.run", "--child",
+		os.path.abspath(tree), tool, *paths, out], cwd=_ROOT, check=True,
+		stdout=subprocess.PIPE)
+	return json.loads(result.stdout)
+
+# Run every tool of tree (a checkout of this repository, this one by default)
+# on a corpus of each size, keeping the best of repeat runs. Return the
+# results keyed by "tool/size"
+def run(sizes, mix=corpus.DEFAULT_MIX, repeat=1, corpus_dir=None, log=None,
+		tree=_ROOT):
+	results = {}
+	with tempfile.TemporaryDirectory() as tmp:
+		for size in sizes:
+			count = corpus.SIZES.get(size) or int(size)
+			d = os.path.join(corpus_dir or tmp, f"corpus-{size}")
+			paths = (os.path.join(d, "app_en.arb"),
+				os.path.join(d, "app_es.arb"), os.path.join(d, "es.po"))
+			if not all(os.path.exists(p) for p in paths):
+				corpus.write_corpus(d, count, mix)
+			for tool in TOOLS:
+				best = None
+				for _ in range(repeat):
+					m = _run_child(tree, tool, paths, os.path.join(tmp, "out"))
+					if best is None or m["wall"] < best["wall"]:
+						best = m
+				best["entries"] = count
+				best["entries_per_sec"] = count / best["wall"]
+				results[f"{tool}/{size}"] = best
+				if log:
+					log(f"{tool}/{size}", best)
+	return results
+
+def _format(name, m):
+	return (f"{name:<14} {m['wall']:9.3f}s {m['cpu']:9.3f}s cpu "
+		f"{m['entries_per_sec']:12.0f} entries/s {m['peak_rss_kb'] / 1024:9.1f}MB")
+
+# Print how each result compares with the baseline. Return the names of those
+# slower than the baseline by more than tolerance
+def compare(results, baseline, tolerance=0.1):
+	regressions = []
+	for name, m in results.items():
+		try:
+			b = baseline["results"][name]
+		except KeyError:
+			continue
+		ratio = m["wall"] / b["wall"]
+		rss_ratio = m["peak_rss_kb"] / b["peak_rss_kb"]
+		flag = ""
+		if ratio > 1 + tolerance:
+			regressions.append(name)
+			flag = " REGRESSION"
+		print(f"{name:<14} time x{ratio:.2f} rss x{rss_ratio:.2f}{flag}")
+	return regressions
+
+def _get_commit(tree):
+	try:
+		return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+			cwd=tree, check=True,
+			stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+			text=True).stdout.strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+if __name__ == "__main__":
+	if len(sys.argv) > 1 and sys.argv[1] == "--child":
+		print(json.dumps(_measure(*sys.argv[2:8])))
+		sys.exit(0)
+
+	import argparse
+	parser = argparse.ArgumentParser(
+		description="Benchmark arb2po and po2arb end to end on synthetic corpora",
+	)
+	parser.add_argument(
+		"--sizes",
+		default="1k,10k",
+		help=f"Comma separated corpus sizes, numbers or {', '.join(corpus.SIZES)} (default: %(default)s)"
+	)
+	parser.add_argument(
+		"--mix",
+		help="Relative weight of each kind of message, e.g. plain=5,plural=1"
+	)
+	parser.add_argument(
+		"--repeat",
+		type=int,
+		default=3,
+		help="Keep the fastest of this many runs (default: %(default)s)"
+	)
+	parser.add_argument(
+		"--corpus-dir",
+		help="Keep the generated corpora here and reuse them in later runs"
+	)
+	parser.add_argument(
+		"--save",
+		help="Save the results as a JSON baseline"
+	)
+	parser.add_argument(
+		"--compare",
+		help="Compare with a JSON baseline, exit with 1 on regressions"
+	)
+	parser.add_argument(
+		"--tree",
+		default=_ROOT,
+		help="Time the arb2po.py and po2arb.py of another checkout, e.g. a git worktree of an older commit to save a baseline from"
+	)
+	parser.add_argument(
+		"--tolerance",
+		type=float,
+		default=0.1,
+		help="Slowdown allowed before reporting a regression (default: %(default)s)"
+	)
+	_args = parser.parse_args()
+	_results = run(_args.sizes.split(","),
+		corpus.parse_mix(_args.mix) if _args.mix else corpus.DEFAULT_MIX,
+		_args.repeat, _args.corpus_dir,
+		log=lambda name, m: print(_format(name, m)), tree=_args.tree)
+	if _args.save:
+		with open(_args.save, "w") as f:
+			json.dump({
+				"commit": _get_commit(_args.tree),
+				"python": platform.python_version(),
+				"machine": platform.machine(),
+				"mix": _args.mix,
+				"results": _results,
+			}, f, indent=2)
+			f.write("\n")
+	if _args.compare:
+		with open(_args.compare, "r") as f:
+			_baseline = json.load(f)
+		if compare(_results, _baseline, _args.tolerance):
+			sys.exit(1)
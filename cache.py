@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+import json
+import jsonbackend
+import os
+
+# Default number of entries kept in one cache file
+DEFAULT_SIZE = 500000
+# Default total size in bytes of the cache files kept in one directory, one
+# file per pair of input files: enough for a source of 100k entries and 64
+# locales, about 32MB each
+DEFAULT_DIR_SIZE = 2 * 1024 * 1024 * 1024
+
+# Return the default cache directory
+def get_default_dir():
+	base = os.environ.get("XDG_CACHE_HOME") \
+		or os.path.join(os.path.expanduser("~"), ".cache")
+	return os.path.join(base, "arb2po")
+
+# Return a stable fingerprint of some files' content, e.g. the modules doing the
+# conversion, so that a cache written by another version is never replayed
+def fingerprint(paths):
+	import hashlib
+	h = hashlib.blake2b(digest_size=16)
+	for p in paths:
+		with open(p, "rb") as f:
+			h.update(f.read())
+	return h.hexdigest()
+
+# Remove the least recently used (by mtime) cache files in a directory until
+# they take at most max_size bytes, except the one at keep. Only the files
+# named like the ones EntryCache is given by arb2po, a digest, are looked at
+def _prune(dir, max_size, keep):
+	files = []
+	total = 0
+	for e in os.scandir(dir):
+		name, ext = os.path.splitext(e.name)
+		if ext != ".json" or len(name) != 32 or e.path == keep:
+			continue
+		try:
+			stat = e.stat()
+		except FileNotFoundError:
+			continue
+		files.append((stat.st_mtime_ns, stat.st_size, e.path))
+		total += stat.st_size
+	try:
+		total += os.path.getsize(keep)
+	except FileNotFoundError:
+		pass
+	files.sort()
+	for _, size, path in files:
+		if total <= max_size:
+			break
+		try:
+			os.remove(path)
+		except FileNotFoundError:
+			pass
+		total -= size
+
+# An on-disk LRU cache mapping a content hash to the output text it produced.
+# The whole file is loaded on creation and written back by save() if anything
+# was added, keeping the max_size most recently used entries. A missing,
+# corrupt or mismatching (see salt) file is treated as empty. Its directory is
+# shared with other cache files, the least recently used of which are removed
+# by save() while they take more than max_dir_size bytes
+class EntryCache:
+	def __init__(self, path, salt="", max_size=DEFAULT_SIZE,
+			max_dir_size=DEFAULT_DIR_SIZE):
+		self.path = path
+		self.hits = 0
+		self.misses = 0
+		self._salt = salt
+		self._max_size = max_size
+		self._max_dir_size = max_dir_size
+		# digest => text, least recently used first as of the last save
+		self._entries = {}
+		# the digests used since, in the order they were last used
+		self._used = {}
+		self._is_dirty = False
+		try:
+			with open(path, "rb") as f:
+				data = f.read()
+			raw = (jsonbackend.get(len(data)).loads or json.loads)(data)
+			if raw["salt"] == salt and type(raw["entries"]) is dict:
+				self._entries = raw["entries"]
+				# used, for _prune
+				os.utime(path)
+		except (OSError, ValueError, KeyError, TypeError):
+			pass
+
+	def __len__(self):
+		return len(self._entries)
+
+	# Return the content hash of some values: strings, numbers, None and
+	# tuples, lists or dicts of them. Order matters, including the order of
+	# keys in dicts
+	@staticmethod
+	def digest(*values):
+		import hashlib
+		return hashlib.blake2b(repr(values).encode(),
+			digest_size=16).hexdigest()
+
+	# Return the text cached for this digest, or None
+	def get(self, digest):
+		product = self._entries.get(digest)
+		if product is None:
+			self.misses += 1
+			return None
+		used = self._used
+		used.pop(digest, None)
+		used[digest] = None
+		self.hits += 1
+		return product
+
+	def put(self, digest, text):
+		self._entries[digest] = text
+		self._used.pop(digest, None)
+		self._used[digest] = None
+		self._is_dirty = True
+
+	# Evict the least recently used entries and write the cache, if anything
+	# was added, then the least recently used files of its directory
+	def save(self):
+		if not self._is_dirty:
+			return
+		entries = self._entries
+		used = self._used
+		order = [d for d in entries if d not in used]
+		order += used
+		if len(order) > self._max_size:
+			del order[:len(order) - self._max_size]
+		self._entries = {d: entries[d] for d in order}
+		self._used = {}
+		import tempfile
+		os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+		fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+			suffix=".tmp")
+		try:
+			with os.fdopen(fd, "w", encoding="utf-8") as f:
+				# dumps encodes in one C call, dump by chunks
+				f.write(json.dumps({
+					"salt": self._salt,
+					"entries": self._entries,
+				}, ensure_ascii=False, separators=(",", ":")))
+			os.replace(tmp, self.path)
+		except:
+			os.remove(tmp)
+			raise
+		self._is_dirty = False
+		_prune(os.path.dirname(os.path.abspath(self.path)), self._max_dir_size,
+			os.path.abspath(self.path))
@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+import arb2po
+import batch
+import codec
+import json
+import jsonbackend
+import lazy
+import messages
+import mmap
+import os
+import po2arb
+import re
+import sys
+import time
+
+# Point lookups of single entries in large PO and ARB files. The byte offset
+# and length of every entry is indexed by key in a sidecar file next to the
+# catalog, FILE.idx, along with the size and mtime of the catalog it was
+# built from. A lookup seeks to the entry and decodes it alone instead of
+# parsing the whole file. An index that no longer matches its catalog is
+# rebuilt on first use
+#
+# query() looks a key up in many catalogs, e.g. every locale, through their
+# index if they have one, otherwise by scanning them only as far as needed
+
+INDEX_SUFFIX = ".idx"
+# Bumped whenever the format of the index changes
+_INDEX_VERSION = 1
+
+# A PO entry: a run of non-blank lines
+_PO_BLOCK_REGEX = lazy.Regex(rb"(?:^[ \t\r]*[^ \t\r\n].*(?:\n|\Z))+",
+	re.MULTILINE)
+_PO_MSGCTXT_REGEX = lazy.Regex(rb"^msgctxt[ \t]+\"(.*)\"[ \t\r]*$",
+	re.MULTILINE)
+_JSON_SPACE_REGEX = lazy.Regex(r"[ \t\n\r]*")
+_JSON_OBJECT_REGEX = lazy.Regex(rb"[ \t\n\r]*\{")
+
+def _stat(path):
+	s = os.stat(path)
+	return [s.st_mtime_ns, s.st_size]
+
+# Return whether the content of a catalog (bytes or a buffer) is an ARB file
+# rather than a PO file
+def _is_arb(data):
+	return _JSON_OBJECT_REGEX.match(data) is not None
+
+# Return the entries of a PO file as {msgctxt: [offset, length]}. The header
+# and obsolete entries have no msgctxt and are left out
+def _index_po(data):
+	product = {}
+	for block in _PO_BLOCK_REGEX.finditer(data):
+		m = _PO_MSGCTXT_REGEX.search(data, block.start(), block.end())
+		if m is None:
+			continue
+		if data[m.end() + 1:m.end() + 2] == b"\"":
+			# continued on the next lines, leave it to the PO parser
+			key = po2arb._parse_po_bytes(block.group())[0].msgctxt
+		else:
+			key = po2arb._unescape_payload(m.group(1))
+		product[key] = [block.start(), block.end() - block.start()]
+	return product
+
+# Return the members of the top level JSON object of an ARB file, @key
+# attributes included, as {key: [offset, length]}. Each covers "key": value
+def _index_arb(data):
+	text = data.decode()
+	decoder = json.JSONDecoder()
+	space = _JSON_SPACE_REGEX
+	is_ascii = len(text) == len(data)
+	# the byte offset of text[char_offset], converted as the scan goes
+	char_offset = byte_offset = 0
+
+	def to_bytes(i):
+		nonlocal char_offset, byte_offset
+		if is_ascii:
+			return i
+		byte_offset += len(text[char_offset:i].encode())
+		char_offset = i
+		return byte_offset
+
+	product = {}
+	i = space.match(text).end()
+	if text[i:i + 1] != "{":
+		raise ValueError("Expecting a JSON object")
+	i = space.match(text, i + 1).end()
+	if text[i:i + 1] == "}":
+		return product
+	while True:
+		begin = i
+		key, i = decoder.raw_decode(text, i)
+		if not isinstance(key, str):
+			raise ValueError(f"Expecting a property name: {key!r}")
+		i = space.match(text, i).end()
+		if text[i:i + 1] != ":":
+			raise ValueError(f"Expecting ':' after {key!r}")
+		_, i = decoder.raw_decode(text, space.match(text, i + 1).end())
+		offset = to_bytes(begin)
+		product[key] = [offset, to_bytes(i) - offset]
+		i = space.match(text, i).end()
+		c = text[i:i + 1]
+		if c == "}":
+			return product
+		elif c != ",":
+			raise ValueError(f"Expecting ',' or '}}' after {key!r}")
+		i = space.match(text, i + 1).end()
+
+# Decode a member of a JSON object, "key": value, and return its value
+def _decode_member(key, raw):
+	return json.loads(b"{" + raw + b"}")[key]
+
+# The sidecar index of a catalog
+class Index:
+	def __init__(self, path, is_arb, entries, stat):
+		# the catalog
+		self.path = path
+		self.is_arb = is_arb
+		# key => [offset, length], as saved
+		self.entries = entries
+		# [mtime_ns, size] of the catalog it was built from
+		self._stat = stat
+
+	def __len__(self):
+		return len(self.entries)
+
+	# Index a catalog
+	@classmethod
+	def build(cls, path):
+		# taken before reading, a change while reading leaves it stale
+		stat = _stat(path)
+		with open(path, "rb") as f:
+			data = f.read()
+		is_arb = _is_arb(data)
+		return cls(path, is_arb, _index_arb(data) if is_arb
+			else _index_po(data), stat)
+
+	# Load the index of a catalog, or return None if it's missing, corrupt or
+	# stale. Parsed with the JSON backend in use, see jsonbackend
+	@classmethod
+	def load(cls, path):
+		try:
+			with open(path + INDEX_SUFFIX, "rb") as f:
+				data = f.read()
+			raw = (jsonbackend.get(len(data)).loads or json.loads)(data)
+			if raw["version"] != _INDEX_VERSION or raw["stat"] != _stat(path):
+				return None
+			return cls(path, raw["is_arb"], raw["entries"], raw["stat"])
+		except (OSError, ValueError, KeyError, TypeError):
+			return None
+
+	# Return whether the catalog is unchanged since the index was built
+	def is_fresh(self):
+		try:
+			return _stat(self.path) == self._stat
+		except OSError:
+			return False
+
+	# Write the index next to its catalog, through a temporary file so that
+	# readers never see a half written one
+	def save(self):
+		index_path = self.path + INDEX_SUFFIX
+		tmp = f"{index_path}.tmp"
+		with open(tmp, "w", encoding="utf-8") as f:
+			json.dump({
+				"version": _INDEX_VERSION,
+				"stat": self._stat,
+				"is_arb": self.is_arb,
+				"entries": self.entries,
+			}, f, ensure_ascii=False, separators=(",", ":"))
+		os.replace(tmp, index_path)
+
+# Return the index of a catalog, loaded from its sidecar file or built. With
+# save, a built index is written next to the catalog when possible
+def open_index(path, save=True):
+	index = Index.load(path)
+	if index is None:
+		index = Index.build(path)
+		if save:
+			try:
+				index.save()
+			except OSError:
+				# e.g. a read-only directory, the index is only kept in memory
+				pass
+	return index
+
+# A catalog open for point lookups. get() returns the entry of a key as
+# messages.PoEntry for a PO file, or messages.ArbMessage for an ARB file. The
+# index is rebuilt whenever the catalog changes
+class Catalog:
+	# index is the Index of the catalog, if already loaded
+	def __init__(self, path, save_index=True, index=None):
+		self.path = path
+		self._save_index = save_index
+		self.index = index if index is not None else open_index(path,
+			save_index)
+		self._f = open(path, "rb")
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def close(self):
+		self._f.close()
+
+	# Return the entry of a key, or None if the catalog doesn't have it
+	def get(self, key):
+		self._reindex()
+		try:
+			return self._get(key)
+		except (ValueError, KeyError):
+			# not the entry indexed, the catalog changed within the same mtime
+			# and size
+			self._reindex(force=True)
+			return self._get(key)
+
+	# Return an entry as it is in the catalog, as bytes, or None if the
+	# catalog doesn't have it. For an ARB file, the "@key" attributes follow
+	# the "key" member on the next line
+	def get_raw(self, key):
+		self._reindex()
+		raw = self._read(key)
+		if raw is None or not self.index.is_arb:
+			return raw
+		attributes = self._read("@" + key)
+		return raw if attributes is None else raw + b"\n" + attributes
+
+	def _read(self, key):
+		try:
+			offset, length = self.index.entries[key]
+		except KeyError:
+			return None
+		self._f.seek(offset)
+		return self._f.read(length)
+
+	# Read and decode the entry of a key. Raise ValueError or KeyError if what
+	# is read isn't that entry
+	def _get(self, key):
+		raw = self._read(key)
+		if raw is None:
+			return None
+		if self.index.is_arb:
+			attributes = self._read("@" + key)
+			return messages.ArbMessage.from_arb(key, _decode_member(key, raw),
+				None if attributes is None
+					else _decode_member("@" + key, attributes))
+		entries = po2arb._parse_po_bytes(raw)
+		if len(entries) != 1 or entries[0].msgctxt != key:
+			raise KeyError(key)
+		return entries[0]
+
+	def _reindex(self, force=False):
+		if not force and self.index.is_fresh():
+			return
+		self._f.close()
+		self.index = Index.build(self.path)
+		if self._save_index:
+			try:
+				self.index.save()
+			except OSError:
+				pass
+		self._f = open(self.path, "rb")
+
+# Return whether a key matches the key queried, or starts with it with prefix
+def _is_match(k, key, prefix):
+	return k.startswith(key) if prefix else k == key
+
+# Return the offset of the PO entry with a line starting at offset i, after
+# the blank line before it
+def _po_entry_start(data, i):
+	while i > 0:
+		j = data.rfind(b"\n", 0, i - 1) + 1
+		if not data[j:i].strip():
+			break
+		i = j
+	return i
+
+# Return the entries of a PO file (its content, bytes or a buffer) matching
+# key as {msgctxt: messages.PoEntry}. The msgctxt lines are searched for with
+# a regex, only the entries around the matches are decoded. Without prefix,
+# the search stops at the first match. A msgctxt continued on the next lines,
+# which arb2po never writes, isn't matched
+def _query_po(data, key, prefix=False):
+	regex = re.compile(rb"^msgctxt[ \t]+\"" + re.escape(
+		codec.escape_po(key).encode()) + (b"" if prefix else rb"\"[ \t\r]*$"),
+		re.MULTILINE)
+	product = {}
+	for m in regex.finditer(data):
+		start = _po_entry_start(data, m.start())
+		end = _PO_BLOCK_REGEX.match(data, start).end()
+		for entry in po2arb._parse_po_bytes(data[start:end]):
+			if entry.msgctxt is not None \
+					and _is_match(entry.msgctxt, key, prefix):
+				product[entry.msgctxt] = entry
+		if product and not prefix:
+			break
+	return product
+
+# Return the messages of an ARB file object matching key as {key:
+# messages.ArbMessage}. The file is read incrementally. Without prefix, the
+# reading stops once the message and its @key attributes are found, or, like
+# arb2po._iter_arb, window members after the message if it has none
+def _query_arb(f, key, prefix=False, window=arb2po._ARB_WINDOW):
+	values = {}
+	attributes = {}
+	# members left to read for the attributes of the message
+	remaining = window
+	for k, value in arb2po._JsonObjectReader(f):
+		if k.startswith("@@"):
+			# global attributes, e.g. @@locale
+			pass
+		elif k.startswith("@"):
+			if _is_match(k[1:], key, prefix):
+				attributes[k[1:]] = value
+		elif _is_match(k, key, prefix):
+			values[k] = value
+		if not prefix and key in values:
+			if key in attributes or remaining == 0:
+				break
+			remaining -= 1
+	return {k: messages.ArbMessage.from_arb(k, v, attributes.get(k))
+		for k, v in values.items()}
+
+# Return the entries of one catalog matching key, see query()
+def _query_file(path, key, prefix=False):
+	index = Index.load(path)
+	if index is not None:
+		if not prefix:
+			keys = [key] if key in index.entries else []
+		else:
+			keys = [k for k in index.entries if k.startswith(key)]
+		with Catalog(path, index=index) as c:
+			return {k: c.get(k) for k in keys
+				if not (index.is_arb and k.startswith("@"))}
+	with open(path, "rb") as f:
+		try:
+			data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			# empty file
+			return {}
+		with data:
+			if not _is_arb(data):
+				return _query_po(data, key, prefix)
+	with open(path, "r") as f:
+		return _query_arb(f, key, prefix)
+
+# Look a key up in many PO and ARB files, e.g. one per locale, or with prefix
+# every key starting with it. Return {path: {key: entry}}, with each entry as
+# in Catalog.get(). A file with an up to date index (see Index) is read
+# through it, the others are scanned without being parsed whole
+def query(paths, key, prefix=False):
+	return {p: _query_file(p, key, prefix) for p in paths}
+
+# Return the value of an entry returned by query() as in an ARB file, e.g. the
+# ICU message of a plural PO entry, or None if it's untranslated
+def _get_arb_value(entry):
+	if isinstance(entry, messages.ArbMessage):
+		return entry.value
+	pairs = po2arb._Po2Arb()._convert_entry(entry)
+	return pairs[0][1] if pairs else None
+
+if __name__ == "__main__":
+	import argparse
+	parser = argparse.ArgumentParser(
+		description="Look up single entries of large PO and ARB files through a sidecar index (FILE.idx), built or refreshed as needed",
+	)
+	_subparsers = parser.add_subparsers(dest="command", required=True)
+	_index_parser = _subparsers.add_parser(
+		"index",
+		help="Build or refresh the index of each file"
+	)
+	_index_parser.add_argument(
+		"file",
+		nargs="+",
+	)
+	_get_parser = _subparsers.add_parser(
+		"get",
+		help="Print the entry of each key as it is in the file"
+	)
+	_get_parser.add_argument(
+		"file",
+	)
+	_get_parser.add_argument(
+		"key",
+		nargs="+",
+	)
+	_get_parser.add_argument(
+		"--no-save",
+		action="store_true",
+		help="Don't write the index if it has to be built"
+	)
+	_query_parser = _subparsers.add_parser(
+		"query",
+		help="Print the value of a key in each file, as in an ARB file, as a JSON object by file"
+	)
+	_query_parser.add_argument(
+		"key",
+	)
+	_query_parser.add_argument(
+		"file",
+		nargs="+",
+		help="Multiple files, glob patterns or directories (of *.po and *.arb)"
+	)
+	_query_parser.add_argument(
+		"-p", "--prefix",
+		action="store_true",
+		help="Match every key starting with KEY"
+	)
+	_args = parser.parse_args()
+
+	if _args.command == "index":
+		for _file in _args.file:
+			_begin = time.perf_counter()
+			_index = Index.load(_file)
+			if _index is None:
+				_index = Index.build(_file)
+				_index.save()
+			print(f"{_file}: {len(_index)} entries indexed in "
+				f"{(time.perf_counter() - _begin) * 1000:.1f}ms", file=sys.stderr)
+	elif _args.command == "query":
+		_paths = [p for p in batch.expand_paths(_args.file, "*")
+			if p in _args.file or p.endswith((".po", ".arb"))]
+		_product = {p: {k: _get_arb_value(e) for k, e in entries.items()}
+			for p, entries in query(_paths, _args.key, _args.prefix).items()}
+		print(json.dumps(_product, indent=2, ensure_ascii=False))
+	else:
+		_missing = []
+		with Catalog(_args.file, save_index=not _args.no_save) as _catalog:
+			for _key in _args.key:
+				_raw = _catalog.get_raw(_key)
+				if _raw is None:
+					_missing.append(_key)
+				else:
+					print(_raw.decode().rstrip("\r\n"))
+		if _missing:
+			print(f"Not found: {', '.join(_missing)}", file=sys.stderr)
+			sys.exit(1)
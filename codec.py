@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+import lazy
+import re
+
+# The string escaping of the two formats, shared by arb2po and po2arb:
+# - PO strings, C style backslash escapes between double quotes
+# - ICU MessageFormat quoting of the text of a plural branch, where ' and #
+# are special
+#
+# Decoding is table driven, one regex scan with a lookup per escape. Encoding
+# only has a few characters to escape, and chained str.replace, each one a
+# memchr speed scan that returns the string itself when there's nothing to
+# replace, is faster than a single scan in Python or with str.translate (see
+# python -m bench.codec)
+
+_PO_ESCAPES = {
+	"\\": "\\",
+	"\"": "\"",
+	"'": "'",
+	"?": "?",
+	"a": "\a",
+	"b": "\b",
+	"f": "\f",
+	"n": "\n",
+	"r": "\r",
+	"t": "\t",
+	"v": "\v",
+}
+_PO_ESCAPES_B = {k.encode(): v.encode() for k, v in _PO_ESCAPES.items()}
+_PO_ESCAPE_PATTERN = r"\\(?:([0-7]{1,3})|x([0-9A-Fa-f]{1,2})|(.))"
+_PO_ESCAPE_REGEX = lazy.Regex(_PO_ESCAPE_PATTERN, re.DOTALL)
+_PO_ESCAPE_REGEX_B = lazy.Regex(_PO_ESCAPE_PATTERN.encode(), re.DOTALL)
+
+# '' is an escaped apostrophe, and an apostrophe followed by a special
+# character quotes everything up to the next lone one. Any other apostrophe is
+# literal
+_ICU_QUOTE_REGEX = lazy.Regex(r"''|'([{}#](?:[^']|'')*)(?:'|$)")
+_ICU_SPECIAL_REGEX = lazy.Regex(r"#[#']*|'")
+
+# Escape a string to be written between the double quotes of a PO string
+def escape_po(s):
+	return s.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _unescape_po_match(m):
+	if m.group(3) is not None:
+		try:
+			return _PO_ESCAPES[m.group(3)]
+		except KeyError:
+			# unknown escape, keep it as is
+			return m.group()
+	return chr(int(m.group(1), 8) if m.group(1) else int(m.group(2), 16))
+
+def _unescape_po_match_b(m):
+	if m.group(3) is not None:
+		try:
+			return _PO_ESCAPES_B[m.group(3)]
+		except KeyError:
+			return m.group()
+	return bytes((int(m.group(1), 8) & 0xFF if m.group(1)
+		else int(m.group(2), 16),))
+
+# Decode the content of a PO string, without its quotes, the reverse of
+# escape_po. Accept either str or UTF-8 bytes and return str
+def unescape_po(s):
+	is_bytes = type(s) is bytes
+	if (b"\\" if is_bytes else "\\") not in s:
+		return s.decode() if is_bytes else s
+	if (len(s) - len(s.rstrip(b"\\" if is_bytes else "\\"))) % 2:
+		# the closing quote is escaped
+		raise ValueError(f"Invalid PO string: {s!r}")
+	if is_bytes:
+		return _PO_ESCAPE_REGEX_B.sub(_unescape_po_match_b, s).decode()
+	return _PO_ESCAPE_REGEX.sub(_unescape_po_match, s)
+
+# Same as unescape_po, on a quoted PO string, e.g. "bar\nbar"
+def unescape_po_string(s):
+	s = s.strip()
+	if len(s) < 2 or s[:1] not in ("\"", b"\"") or s[-1:] != s[:1]:
+		raise ValueError(f"Invalid PO string: {s!r}")
+	return unescape_po(s[1:-1])
+
+# Quote the text of a plural branch, so that ' and # are literal. Brackets
+# are left alone, they are the placeholders of the branch
+def quote_icu(s):
+	if "#'" not in s and "##" not in s:
+		return s.replace("'", "''").replace("#", "'#'")
+	return _ICU_SPECIAL_REGEX.sub(_quote_icu_match, s)
+
+# A # starts a quoted span taking in the # and ' after it: quoting them
+# separately, e.g. #' as '#''', would close the span with an apostrophe
+# followed by another one, which ICU reads as an escaped apostrophe instead
+def _quote_icu_match(m):
+	if m.group() == "'":
+		return "''"
+	return "'" + m.group().replace("'", "''") + "'"
+
+def _unquote_icu_match(m):
+	if m.group(1) is None:
+		return "'"
+	return m.group(1).replace("''", "'")
+
+# Remove the quoting of the text of a plural branch, the reverse of quote_icu
+# and the way icu.parse reads it
+def unquote_icu(s):
+	if "'" not in s:
+		return s
+	return _ICU_QUOTE_REGEX.sub(_unquote_icu_match, s)
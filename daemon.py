@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# A long running conversion server, so that repeated conversions don't pay for
+# the interpreter startup, the imports and parsing the same catalogs again
+#
+# Usage: python daemon.py [--socket PATH] (stdin/stdout without --socket)
+#
+# The protocol is one JSON object per line, each way. Requests:
+# 	{"id": ID, "op": "arb2po", "src": PATH, "translated": PATH or null,
+# 		"output": PATH or null, "buffer_size": SIZE (optional, see arb2po
+# 		--buffer-size)}
+# 	{"id": ID, "op": "po2arb", "po": PATH, "output": PATH or null}
+# 	{"id": ID, "op": "ping"}
+# Responses echo the id:
+# 	{"id": ID, "ok": true, "text": TEXT}, text only if output is null
+# 	{"id": ID, "ok": false, "error": MESSAGE}
+# Paths should be absolute, relative ones are resolved from the daemon's
+# working directory
+#
+# Set ARB2PO_DAEMON to the socket path to have arb2po.py and po2arb.py send
+# their conversions to the daemon, see call()
+import collections
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+
+# The environment variable holding the socket path of the daemon for the CLIs
+ENV_VAR = "ARB2PO_DAEMON"
+
+# Default number of entries kept in memory, across all catalogs
+DEFAULT_MAX_ENTRIES = 2000000
+
+def _stat(path):
+	s = os.stat(path)
+	return s.st_mtime_ns, s.st_size
+
+# An LRU cache of parsed files, bounded by their total number of entries. A
+# file that changed (mtime or size) since it was parsed is parsed again
+class CatalogCache:
+	def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+		self.hits = 0
+		self.misses = 0
+		self._max_entries = max_entries
+		# (kind, path) => (stat, catalog)
+		self._catalogs = collections.OrderedDict()
+		self._size = 0
+
+	def __len__(self):
+		return len(self._catalogs)
+
+	# Return load(path), parsed now or earlier. kind tells apart the ways of
+	# loading the same file
+	def get(self, kind, path, load):
+		key = (kind, path)
+		stat = _stat(path)
+		try:
+			cached_stat, catalog = self._catalogs[key]
+		except KeyError:
+			pass
+		else:
+			if cached_stat == stat:
+				self._catalogs.move_to_end(key)
+				self.hits += 1
+				return catalog
+			self._remove(key)
+		self.misses += 1
+		catalog = load(path)
+		self._catalogs[key] = (stat, catalog)
+		self._size += len(catalog)
+		while self._size > self._max_entries and len(self._catalogs) > 1:
+			self._remove(next(iter(self._catalogs)))
+		return catalog
+
+	def _remove(self, key):
+		self._size -= len(self._catalogs.pop(key)[1])
+
+# Serve the requests of the protocol. The parsed catalogs, and the prepared
+# msgid side of the source messages, are kept between requests
+class Server:
+	def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+		import arb2po
+		import po2arb
+		self._arb2po = arb2po
+		self._po2arb = po2arb
+		self._converter = arb2po._Arb2Po()
+		self.catalogs = CatalogCache(max_entries)
+
+	# Return the response to a request
+	def handle(self, request):
+		response = {"id": request.get("id")}
+		try:
+			text = self._handle(request)
+		except Exception as e:
+			response["ok"] = False
+			response["error"] = f"{type(e).__name__}: {e}"
+			return response
+		response["ok"] = True
+		if text is not None:
+			response["text"] = text
+		return response
+
+	# Serve the requests of a pair of binary file objects until the end
+	def serve(self, rfile, wfile):
+		for l in rfile:
+			if not l.strip():
+				continue
+			try:
+				request = json.loads(l)
+				if not isinstance(request, dict):
+					raise ValueError("Expecting a JSON object")
+			except ValueError as e:
+				response = {"id": None, "ok": False, "error": f"Invalid request: {e}"}
+			else:
+				response = self.handle(request)
+			wfile.write(json.dumps(response, ensure_ascii=False).encode()
+				+ b"\n")
+			wfile.flush()
+
+	def _handle(self, request):
+		op = request.get("op")
+		if op == "ping":
+			return None
+		elif op == "arb2po":
+			return self._write(request.get("output"), self._arb2po_lines(
+				request["src"], request.get("translated")), None,
+				request.get("buffer_size") or io.DEFAULT_BUFFER_SIZE)
+		elif op == "po2arb":
+			return self._write(request.get("output"), None,
+				self.catalogs.get("po2arb/po", request["po"],
+				self._po2arb._parse_po))
+		raise ValueError(f"Unknown op: {op}")
+
+	def _arb2po_lines(self, untranslated_file, translated_file):
+		arb2po = self._arb2po
+		sources = self.catalogs.get("arb2po/src", untranslated_file,
+			lambda p: list(arb2po._Arb2Po._prep_sources(
+				arb2po._arb_entries(arb2po._iter_arb(p)))))
+		if translated_file:
+			translated = self.catalogs.get("arb2po/translated",
+				translated_file, arb2po._parse_arb)
+		else:
+			translated = {}
+		return self._converter._convert(sources, translated)
+
+	# Write the output of arb2po (lines) or po2arb (po, the parsed entries) to
+	# output, or return it if output is None
+	def _write(self, output, lines, po, buffer_size=io.DEFAULT_BUFFER_SIZE):
+		if output:
+			f = open(output, "w", buffering=buffer_size)
+		else:
+			f = io.StringIO()
+		with f:
+			if lines is not None:
+				self._arb2po._write_lines(lines, f, buffer_size)
+			else:
+				self._po2arb._write_arb(lambda: po, f)
+			return None if output else f.getvalue()
+
+class _Handler(socketserver.StreamRequestHandler):
+	def handle(self):
+		self.server.daemon.serve(self.rfile, self.wfile)
+
+class _UnixServer(socketserver.UnixStreamServer):
+	def __init__(self, path, daemon):
+		self.daemon = daemon
+		super().__init__(path, _Handler)
+
+# Serve on a Unix socket at path until interrupted. Connections are served
+# one at a time, each may send any number of requests
+def serve_socket(path, server):
+	if os.path.exists(path):
+		try:
+			call(path, {"op": "ping"})
+		except OSError:
+			# left behind by a daemon that didn't exit cleanly
+			os.remove(path)
+		else:
+			raise ValueError(f"A daemon is already listening on {path}")
+	with _UnixServer(path, server) as unix_server:
+		try:
+			unix_server.serve_forever()
+		except KeyboardInterrupt:
+			pass
+		finally:
+			os.remove(path)
+
+# Send a request to the daemon listening on path and return its response.
+# Raise OSError if the daemon can't be reached
+def call(path, request, timeout=None):
+	with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+		s.settimeout(timeout)
+		s.connect(path)
+		s.sendall(json.dumps(request, ensure_ascii=False).encode() + b"\n")
+		s.shutdown(socket.SHUT_WR)
+		with s.makefile("rb") as f:
+			l = f.readline()
+	if not l:
+		raise ConnectionError(f"No response from {path}")
+	return json.loads(l)
+
+# Run a conversion of a CLI through the daemon set in ENV_VAR, if any. Print
+# the output, or the error and exit. Return False if there's no daemon to
+# use, in which case the CLI should do the conversion itself
+def run_cli(request):
+	path = os.environ.get(ENV_VAR)
+	if not path:
+		return False
+	for k in ("src", "translated", "po", "output"):
+		if request.get(k):
+			request[k] = os.path.abspath(request[k])
+	try:
+		response = call(path, request)
+	except OSError as e:
+		print(f"{ENV_VAR}: {e}, converting locally", file=sys.stderr)
+		return False
+	if not response.get("ok"):
+		print(response.get("error"), file=sys.stderr)
+		sys.exit(1)
+	if "text" in response:
+		sys.stdout.write(response["text"])
+	return True
+
+if __name__ == "__main__":
+	import argparse
+	parser = argparse.ArgumentParser(
+		description="Serve arb2po and po2arb conversions, keeping the parsed catalogs in memory",
+	)
+	parser.add_argument(
+		"-s", "--socket",
+		help=f"Listen on this Unix socket instead of stdin/stdout. Set {ENV_VAR} to it to have the CLIs use the daemon"
+	)
+	parser.add_argument(
+		"--max-entries",
+		type=int,
+		default=DEFAULT_MAX_ENTRIES,
+		help="Number of catalog entries kept in memory (default: %(default)s)"
+	)
+	_args = parser.parse_args()
+	_server = Server(_args.max_entries)
+	if _args.socket:
+		try:
+			serve_socket(_args.socket, _server)
+		except ValueError as e:
+			print(e, file=sys.stderr)
+			sys.exit(1)
+	else:
+		try:
+			_server.serve(sys.stdin.buffer, sys.stdout.buffer)
+		except KeyboardInterrupt:
+			pass
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+import lazy
+
+# A minimal ICU MessageFormat parser. The message is scanned once, left to
+# right, with an index into the original string (no re-slicing of the
+# remainder), and turned into a small tree of the nodes below
+#
+# Example: given "{n, plural, =1{one} other{# '#' {n}}}" return
+# [Block("n", "plural", {
+# 	"=1": Branch([Literal("one")]),
+# 	"other": Branch([Pound(), Literal(" "), Quoted("#"), Literal(" "),
+# 		Placeholder("n")]),
+# })]
+
+# Plain text
+class Literal:
+	__slots__ = ("text",)
+
+	def __init__(self, text):
+		self.text = text
+
+	def __eq__(self, other):
+		return type(self) is type(other) and self.text == other.text
+
+	def __repr__(self):
+		return f"{type(self).__name__}({self.text!r})"
+
+# Text that was quoted with apostrophes in the source, e.g. '{' or '#'
+class Quoted(Literal):
+	__slots__ = ()
+
+# A simple argument, e.g. {name}. span is its (begin, end) in the source,
+# brackets included
+class Placeholder:
+	__slots__ = ("name", "span")
+
+	def __init__(self, name, span=None):
+		self.name = name
+		self.span = span
+
+	# span is informational, like Branch.raw
+	def __eq__(self, other):
+		return type(self) is type(other) and self.name == other.name
+
+	def __repr__(self):
+		return f"Placeholder({self.name!r})"
+
+# The # sign inside a plural block
+class Pound:
+	__slots__ = ()
+
+	def __eq__(self, other):
+		return type(self) is type(other)
+
+	def __repr__(self):
+		return "Pound()"
+
+# A plural/select/selectordinal block. options maps the selector (e.g. "=0",
+# "other") to a Branch
+class Block:
+	__slots__ = ("var", "kind", "options")
+
+	def __init__(self, var, kind, options):
+		self.var = var
+		self.kind = kind
+		self.options = options
+
+	def __eq__(self, other):
+		return (type(self) is type(other) and self.var == other.var
+			and self.kind == other.kind and self.options == other.options)
+
+	def __repr__(self):
+		return f"Block({self.var!r}, {self.kind!r}, {self.options!r})"
+
+# The sub-message of one selector. raw is the source text between the brackets
+class Branch:
+	__slots__ = ("nodes", "raw")
+
+	def __init__(self, nodes, raw=None):
+		self.nodes = nodes
+		self.raw = raw
+
+	# raw is informational, two branches parsed from differently spaced
+	# sources are still equal
+	def __eq__(self, other):
+		return type(self) is type(other) and self.nodes == other.nodes
+
+	def __repr__(self):
+		return f"Branch({self.nodes!r})"
+
+_BLOCK_KINDS = ("plural", "select", "selectordinal")
+# Runs of characters that are never special, at the top level and inside a
+# sub-message respectively
+_TOP_LITERAL_REGEX = lazy.Regex(r"[^{]+")
+_SUB_LITERAL_REGEX = lazy.Regex(r"[^{}'#]+")
+_ARG_NAME_REGEX = lazy.Regex(r"\s*([^\s{},']+)\s*")
+_ARG_TYPE_REGEX = lazy.Regex(r"\s*([A-Za-z]+)\s*")
+_OFFSET_REGEX = lazy.Regex(r"\s*offset:\s*[0-9]+")
+_SELECTOR_REGEX = lazy.Regex(r"\s*([^\s{}]+)\s*")
+_SPACE_REGEX = lazy.Regex(r"\s*")
+# An argument as _Parser._parse_argument reads it: a placeholder, and the
+# start of any other one, e.g. {n, plural,
+_PLACEHOLDER_REGEX = lazy.Regex(r"\{\s*([^\s{},']+)\s*\}")
+_TYPED_ARGUMENT_REGEX = lazy.Regex(r"\{\s*[^\s{},']+\s*,")
+# A plural branch holding nothing but text, # and placeholders. Its
+# apostrophes quote nothing, i.e. they're either '' or before a character
+# that isn't special
+_SIMPLE_BRANCH = r"\s*([^\s{}]+)\s*\{([^{}']*(?:(?:'(?![{}#])|\{\s*[^\s{},']+\s*\})[^{}']*)*)\}"
+_SIMPLE_BRANCH_REGEX = lazy.Regex(_SIMPLE_BRANCH)
+_SIMPLE_PLURAL_REGEX = lazy.Regex(
+	rf"\{{\s*[^\s{{}},']+\s*,\s*plural\s*,(?:{_SIMPLE_BRANCH})+\s*\}}")
+
+class _Parser:
+	def __init__(self, s):
+		self._s = s
+		self._i = 0
+		# whether an apostrophe before a closing bracket is literal, see
+		# _parse_block_options
+		self._is_close_quote_literal = False
+
+	# Parse the top level message. Apostrophes and # are not special here, and
+	# a bracket that doesn't start a valid argument is kept as text
+	def parse(self):
+		s = self._s
+		n = len(s)
+		nodes = []
+		text = []
+		while self._i < n:
+			m = _TOP_LITERAL_REGEX.match(s, self._i)
+			if m:
+				text.append(m.group())
+				self._i = m.end()
+				continue
+			# s[self._i] == "{"
+			begin = self._i
+			try:
+				node = self._parse_argument(False)
+			except ValueError:
+				self._i = begin + 1
+				text.append("{")
+				continue
+			if text:
+				nodes.append(Literal("".join(text)))
+				text = []
+			nodes.append(node)
+		if text:
+			nodes.append(Literal("".join(text)))
+		return nodes
+
+	# Parse a sub-message up to (but not including) its closing bracket. The
+	# index is kept in a local while scanning text, which most of a message is
+	def _parse_sub(self, is_plural):
+		s = self._s
+		n = len(s)
+		match = _SUB_LITERAL_REGEX.match
+		nodes = []
+		text = []
+		i = self._i
+		while True:
+			if i >= n:
+				raise ValueError(f"Unbalanced bracket: {s}")
+			m = match(s, i)
+			if m:
+				text.append(m.group())
+				i = m.end()
+				continue
+			c = s[i]
+			if c == "}":
+				break
+			elif c == "#":
+				i += 1
+				if not is_plural:
+					text.append("#")
+					continue
+				node = Pound()
+			else:
+				self._i = i
+				if c == "'":
+					node = self._parse_apostrophe(is_plural)
+				else:
+					node = self._parse_argument(is_plural)
+				i = self._i
+				if node is None:
+					text.append("'")
+					continue
+			if text:
+				nodes.append(Literal("".join(text)))
+				text = []
+			nodes.append(node)
+		self._i = i
+		if text:
+			nodes.append(Literal("".join(text)))
+		return nodes
+
+	# An apostrophe only starts a quoted span when followed by a special
+	# character, '' is an escaped apostrophe and any other one is literal.
+	# Return a Quoted node, or None for a literal apostrophe
+	def _parse_apostrophe(self, is_plural):
+		s = self._s
+		i = self._i + 1
+		c = s[i] if i < len(s) else ""
+		if c == "'" or not c or (c not in "{}" and (c != "#" or not is_plural)) \
+				or (c == "}" and self._is_close_quote_literal):
+			self._i = i + 1 if c == "'" else i
+			return None
+		text = []
+		while True:
+			end = s.find("'", i)
+			if end == -1:
+				# unterminated, quote till the end
+				text.append(s[i:])
+				self._i = len(s)
+				break
+			if s.startswith("'", end + 1):
+				text.append(s[i:end + 1])
+				i = end + 2
+				continue
+			text.append(s[i:end])
+			self._i = end + 1
+			break
+		return Quoted("".join(text))
+
+	# Parse an argument starting at the current open bracket
+	def _parse_argument(self, is_plural):
+		s = self._s
+		begin = self._i
+		m = _ARG_NAME_REGEX.match(s, begin + 1)
+		if not m:
+			raise ValueError(f"Missing argument name: {s[begin:]}")
+		name = m.group(1)
+		i = m.end()
+		if s.startswith("}", i):
+			self._i = i + 1
+			return Placeholder(name, (begin, self._i))
+		if not s.startswith(",", i):
+			raise ValueError(f"Invalid argument: {s[begin:]}")
+		m = _ARG_TYPE_REGEX.match(s, i + 1)
+		if not m:
+			raise ValueError(f"Missing argument type: {s[begin:]}")
+		kind = m.group(1)
+		i = m.end()
+		if kind not in _BLOCK_KINDS or not s.startswith(",", i):
+			# other formatted arguments, e.g. {n, number}, are kept as is
+			self._i = self._skip_bracket(begin)
+			return Literal(s[begin:self._i])
+		self._i = i + 1
+		return Block(name, kind, self._parse_block_options(kind, is_plural))
+
+	# Parse the options of a block. An apostrophe before the closing bracket of
+	# a branch, e.g. {n, plural, one{the user'} other{the users'}}, quotes the
+	# rest of the block, so is taken as literal instead when the options don't
+	# parse or lack "other", which every block has
+	def _parse_block_options(self, kind, is_plural):
+		if self._is_close_quote_literal:
+			return self._parse_options(kind, is_plural)
+		begin = self._i
+		try:
+			options = self._parse_options(kind, is_plural)
+			if "other" in options:
+				return options
+		except ValueError:
+			pass
+		self._i = begin
+		self._is_close_quote_literal = True
+		try:
+			return self._parse_options(kind, is_plural)
+		finally:
+			self._is_close_quote_literal = False
+
+	def _parse_options(self, kind, is_plural):
+		s = self._s
+		options = {}
+		if kind != "select":
+			is_plural = True
+			m = _OFFSET_REGEX.match(s, self._i)
+			if m:
+				self._i = m.end()
+		while True:
+			self._i = _SPACE_REGEX.match(s, self._i).end()
+			if s.startswith("}", self._i):
+				self._i += 1
+				return options
+			m = _SELECTOR_REGEX.match(s, self._i)
+			if not m or not s.startswith("{", m.end()):
+				raise ValueError(f"Missing open bracket: {s[self._i:]}")
+			begin = m.end() + 1
+			self._i = begin
+			nodes = self._parse_sub(is_plural)
+			options[m.group(1)] = Branch(nodes, s[begin:self._i])
+			self._i += 1
+
+	# Return the index after the bracket matching the one at begin
+	def _skip_bracket(self, begin):
+		s = self._s
+		nest = 0
+		for i in range(begin, len(s)):
+			c = s[i]
+			if c == "{":
+				nest += 1
+			elif c == "}":
+				nest -= 1
+				if nest == 0:
+					return i + 1
+		raise ValueError(f"Unbalanced bracket: {s[begin:]}")
+
+# Parse a message and return the list of nodes
+def parse(s):
+	return _Parser(s).parse()
+
+# Yield the Placeholder nodes of a message in source order, including the
+# ones inside blocks
+def iter_placeholders(nodes):
+	for node in nodes:
+		t = type(node)
+		if t is Placeholder:
+			yield node
+		elif t is Block:
+			for branch in node.options.values():
+				yield from iter_placeholders(branch.nodes)
+
+# Yield the name and the (begin, end) span of each placeholder of a message in
+# source order, the same as iter_placeholders(parse(s)). A message without
+# blocks is all top level, where nothing is quoted, so its placeholders are
+# found with a regex instead of parsing it
+def find_placeholders(s):
+	if _TYPED_ARGUMENT_REGEX.search(s) is None:
+		for m in _PLACEHOLDER_REGEX.finditer(s):
+			yield m.group(1), m.span()
+		return
+	for node in iter_placeholders(parse(s)):
+		yield node.name, node.span
+
+# Return the {selector: raw} branches of a message that is a single plural
+# block with simple branches only (see _SIMPLE_BRANCH), otherwise None. Those
+# are most plural messages, and are split with a regex instead of parsing
+# them. A branch renders as its raw text with '' replaced by ', # and the
+# placeholders substituted
+def get_simple_plural(s):
+	if _SIMPLE_PLURAL_REGEX.fullmatch(s) is None:
+		return None
+	# after "plural,", the name has no comma
+	begin = s.index(",", s.index(",") + 1) + 1
+	return {m.group(1): m.group(2)
+		for m in _SIMPLE_BRANCH_REGEX.finditer(s, begin, len(s) - 1)}
+
+# Return the Block if the whole message is a single plural block, otherwise
+# None
+def get_plural(nodes):
+	if len(nodes) == 1 and type(nodes[0]) is Block \
+			and nodes[0].kind == "plural":
+		return nodes[0]
+	return None
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# The JSON library used to read and write ARB files. The standard library is
+# always available, faster ones are used when installed:
+# - orjson parses whole files, and writes the strings and objects po2arb
+# writes, with the same formatting as the standard library
+# - ujson and simdjson parse whole files, writing uses the standard library
+# The standard library parses files incrementally instead (see
+# arb2po._JsonObjectReader), so the faster backends trade memory for speed
+#
+# The backend is picked from the environment variable ENV_VAR, or use(), when
+# it's first needed. "auto" (the default) keeps reading ARB files with the
+# standard library, see get_reader(), and picks the first of AUTO_ORDER
+# installed for the rest, e.g. writing, except for small files, see get()
+import json
+import os
+
+# The environment variable holding the name of the backend to use
+ENV_VAR = "ARB2PO_JSON"
+
+# Backends in the order "auto" tries them, the standard library comes last
+AUTO_ORDER = ("orjson", "simdjson", "ujson")
+
+NAMES = ("auto", "json") + AUTO_ORDER
+
+# Files smaller than this (in bytes) use the standard library with "auto":
+# importing orjson takes about as long as it saves on a 400KB file
+AUTO_MIN_SIZE = 512 * 1024
+
+# Return a function encoding a value the same as json.dumps(value,
+# indent=indent, ensure_ascii=False)
+def _json_encoder(indent):
+	return json.JSONEncoder(indent=indent, ensure_ascii=False).encode
+
+class Backend:
+	# loads parses a whole document from str or bytes, None if the file
+	# should be parsed incrementally with the standard library instead
+	def __init__(self, name, loads=None):
+		self.name = name
+		self.loads = loads
+
+	def __repr__(self):
+		return f"Backend({self.name!r})"
+
+	# Return a function encoding a value as JSON, formatted the same as
+	# json.dumps(value, indent=indent, ensure_ascii=False)
+	def encoder(self, indent=2):
+		return _json_encoder(indent)
+
+class _OrjsonBackend(Backend):
+	def __init__(self, orjson):
+		super().__init__("orjson", orjson.loads)
+		self._orjson = orjson
+
+	def encoder(self, indent=2):
+		fallback = _json_encoder(indent)
+		if indent != 2 and indent != "  ":
+			# orjson only indents by 2 spaces, and doesn't pad its compact
+			# separators like the standard library
+			return fallback
+		dumps = self._orjson.dumps
+		option = self._orjson.OPT_INDENT_2
+
+		# Meant for what po2arb writes: strings, and objects of strings and
+		# objects. orjson formats numbers differently (e.g. 1e16 for 1e+16),
+		# so anything else at the top level goes to the standard library, as
+		# do the lone surrogates, big integers and non-string keys orjson
+		# refuses
+		def encode(value):
+			if type(value) is not str and type(value) is not dict:
+				return fallback(value)
+			try:
+				return dumps(value, option=option).decode()
+			except TypeError:
+				return fallback(value)
+		return encode
+
+# Import and return the backend name, raise ImportError if its library isn't
+# installed
+def _load(name):
+	if name == "json":
+		return Backend("json")
+	elif name == "orjson":
+		import orjson
+		return _OrjsonBackend(orjson)
+	elif name == "ujson":
+		import ujson
+		return Backend("ujson", ujson.loads)
+	elif name == "simdjson":
+		import simdjson
+		return Backend("simdjson", simdjson.loads)
+	raise ValueError(f"Unknown JSON backend: {name}, expecting one of {', '.join(NAMES)}")
+
+# Return the names of the backends installed, the standard library first
+def available():
+	product = ["json"]
+	for name in AUTO_ORDER:
+		if _get_loaded(name) is not None:
+			product.append(name)
+	return product
+
+# The name of the backend in use
+_name = None
+# name => Backend, or None if its library isn't installed
+_loaded = {}
+
+# Return the backend name, loaded once, or None if it isn't installed
+def _get_loaded(name):
+	try:
+		return _loaded[name]
+	except KeyError:
+		pass
+	try:
+		product = _load(name)
+	except ImportError:
+		product = None
+	_loaded[name] = product
+	return product
+
+# Use the backend name from now on. Raise ValueError if it's unknown, and
+# ImportError if its library isn't installed. "auto" is resolved by get()
+def use(name):
+	global _name
+	if name != "auto" and _get_loaded(name) is None:
+		raise ImportError(f"JSON backend {name} isn't installed")
+	_name = name
+
+# Return the backend to read ARB files with. With "auto", the standard
+# library, which reads them incrementally and so keeps the memory of a big
+# file bounded. Parsing whole files with the others is only done when they
+# are picked by name
+def get_reader():
+	if _name is None:
+		use(os.environ.get(ENV_VAR) or "auto")
+	if _name != "auto":
+		return _loaded[_name]
+	return _get_loaded("json")
+
+# Return the backend to write a file of size bytes with, or to read one that is
+# always parsed whole (e.g. an index), picking it from ENV_VAR the first time.
+# With "auto", a file under AUTO_MIN_SIZE uses the standard library, the others
+# the first of AUTO_ORDER installed. size None is for long running processes,
+# where the import time doesn't matter
+def get(size=None):
+	if _name is None:
+		use(os.environ.get(ENV_VAR) or "auto")
+	if _name != "auto":
+		return _loaded[_name]
+	if size is None or size >= AUTO_MIN_SIZE:
+		for name in AUTO_ORDER:
+			product = _get_loaded(name)
+			if product is not None:
+				return product
+	return _get_loaded("json")
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+import re
+
+# A regex compiled on first use, so that importing a module doesn't pay for
+# the patterns of code paths that never run. Used like re.Pattern
+class Regex:
+	def __init__(self, pattern, flags=0):
+		self.pattern = pattern
+		self.flags = flags
+
+	# Only called until the first use, which copies the methods of the
+	# compiled pattern to this object
+	def __getattr__(self, name):
+		compiled = re.compile(self.pattern, self.flags)
+		for n in ("match", "fullmatch", "search", "finditer", "findall", "sub",
+				"subn", "split", "groups", "groupindex"):
+			setattr(self, n, getattr(compiled, n))
+		return getattr(compiled, name)
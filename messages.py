@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+import sys
+
+# The in-memory model of the messages shared by arb2po and po2arb. Entries
+# are slotted objects instead of dicts, and the strings repeated across
+# entries and locales (keys, placeholder names) are interned, so a large
+# catalog costs a few small objects per entry
+
+_intern = sys.intern
+
+# A message of an ARB file, along with what arb2po uses of its @key
+# attributes. placeholders is a tuple of names, in order. examples is None if
+# no placeholder has an example, otherwise a tuple of the same length with
+# each example as a string or None
+class ArbMessage:
+	__slots__ = ("key", "value", "description", "placeholders", "examples")
+
+	def __init__(self, key, value, description=None, placeholders=(),
+			examples=None):
+		self.key = _intern(key)
+		self.value = value
+		self.description = description
+		self.placeholders = placeholders
+		self.examples = examples
+
+	# Create a message from an ARB entry and its @key attributes (or None).
+	# The attributes are decoded JSON, so their dicts are exactly dict, and most
+	# placeholders have no example: the examples tuple is only built when one
+	# does
+	@classmethod
+	def from_arb(cls, key, value, attributes):
+		if type(attributes) is not dict:
+			return cls(key, value)
+		description = attributes.get("description")
+		placeholders = attributes.get("placeholders")
+		if type(placeholders) is not dict or not placeholders:
+			return cls(key, value, description)
+		names = tuple(map(_intern, placeholders))
+		values = placeholders.values()
+		for v in values:
+			if type(v) is dict and "example" in v:
+				return cls(key, value, description, names, tuple(str(v["example"])
+					if type(v) is dict and "example" in v else None
+					for v in values))
+		return cls(key, value, description, names)
+
+	# Return the arguments recreating the message with ArbMessage(*fields), a
+	# tuple pickles about 4 times faster than the message itself
+	def fields(self):
+		return (self.key, self.value, self.description, self.placeholders,
+			self.examples)
+
+	def __eq__(self, other):
+		return type(self) is type(other) and self.key == other.key \
+			and self.value == other.value \
+			and self.description == other.description \
+			and self.placeholders == other.placeholders \
+			and self.examples == other.examples
+
+	def __repr__(self):
+		return f"ArbMessage({self.key!r}, {self.value!r})"
+
+# An entry of a PO file. msgstr_plural is None for a singular entry,
+# otherwise the tuple of msgstr[0..n]. parameters is a tuple of
+# (number, name) pairs from the "#. Parameter" comments, in order. is_fuzzy
+# is whether it has the fuzzy flag
+class PoEntry:
+	__slots__ = ("msgctxt", "msgid", "msgid_plural", "msgstr", "msgstr_plural",
+		"parameters", "is_fuzzy")
+
+	def __init__(self, msgctxt=None, msgid="", msgid_plural=None, msgstr="",
+			msgstr_plural=None, parameters=(), is_fuzzy=False):
+		self.msgctxt = None if msgctxt is None else _intern(msgctxt)
+		self.msgid = msgid
+		self.msgid_plural = msgid_plural
+		self.msgstr = msgstr
+		self.msgstr_plural = msgstr_plural
+		self.parameters = parameters
+		self.is_fuzzy = is_fuzzy
+
+	# Return msgstr[i], or "" if the entry doesn't have that form
+	def get_plural(self, i):
+		if self.msgstr_plural is None or i >= len(self.msgstr_plural):
+			return ""
+		return self.msgstr_plural[i]
+
+	def __eq__(self, other):
+		return type(self) is type(other) and self.msgctxt == other.msgctxt \
+			and self.msgid == other.msgid \
+			and self.msgid_plural == other.msgid_plural \
+			and self.msgstr == other.msgstr \
+			and self.msgstr_plural == other.msgstr_plural \
+			and self.parameters == other.parameters \
+			and self.is_fuzzy == other.is_fuzzy
+
+	def __repr__(self):
+		return f"PoEntry({self.msgctxt!r}, {self.msgid!r})"
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+import lazy
+
+# The placeholders of a message numbered for the printf style tokens of the PO
+# file: the placeholder numbered n is %n$s. Shared by arb2po, to turn names
+# into tokens, and po2arb, to turn them back. A table is built once per
+# placeholder set and reused by every message and plural form sharing it
+
+_TOKEN_REGEX = lazy.Regex(r"%([0-9]+)\$s")
+
+# Up to this many placeholders, chained str.replace, one per placeholder, is
+# faster than splitting the string on the tokens
+_REPLACE_MAX = 4
+
+class Table:
+	__slots__ = ("pairs", "names", "tokens", "_braces", "_replacements")
+
+	# pairs is a tuple of (number, name), e.g. messages.PoEntry.parameters
+	def __init__(self, pairs):
+		self.pairs = pairs
+		self.names = tuple(name for _, name in pairs)
+		# name => %n$s and str(n) => {name}, the first one wins if a name or
+		# a number is repeated
+		self.tokens = {}
+		self._braces = {}
+		for n, name in pairs:
+			self.tokens.setdefault(name, f"%{n}$s")
+			self._braces.setdefault(str(n), f"{{{name}}}")
+		# (%n$s, {name}) to replace in order, or None to split instead. A name
+		# with a % could form a token with what follows it once replaced
+		self._replacements = None
+		if len(self._braces) <= _REPLACE_MAX \
+				and not any("%" in b for b in self._braces.values()):
+			self._replacements = tuple((f"%{n}$s", b)
+				for n, b in self._braces.items())
+
+	# Number a tuple of names in order from 1, e.g.
+	# messages.ArbMessage.placeholders
+	@classmethod
+	def from_names(cls, names):
+		return cls(tuple((i + 1, name) for i, name in enumerate(names)))
+
+	def __len__(self):
+		return len(self.pairs)
+
+	# Replace the %n$s tokens of s with their {name}, in time linear in the
+	# length of s. Tokens without a placeholder are left alone
+	def to_names(self, s):
+		if not self._braces or "%" not in s:
+			return s
+		if self._replacements is not None:
+			for token, braces in self._replacements:
+				s = s.replace(token, braces)
+			return s
+		# [text, n, text, n, ..., text]
+		parts = _TOKEN_REGEX.split(s)
+		braces = self._braces
+		for i in range(1, len(parts), 2):
+			n = parts[i]
+			parts[i] = braces.get(n) or f"%{n}$s"
+		return "".join(parts)
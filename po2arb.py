@@ -1,115 +1,527 @@
 #!/usr/bin/env python3
-import ast
+import batch
+import codec
+import io
 import json
+import jsonbackend
+import lazy
+import messages
+import ordinals
+import os
 import re
+import sys
+import time
 
-# Read and transform a .po file to something easier to work with
+# Decode the content of a PO string, looked up by the parser at each call so
+# that po2arb_timed can time it
+_unescape_payload = codec.unescape_po
+
+# The lines of a PO file _parse_po needs: fields, their continuations,
+# parameter comments and flags with fuzzy. The others, e.g. the other comments
+# or obsolete entries, are skipped without being decoded. Strings are matched
+# without their quotes, a field that isn't a valid string is matched by the
+# invalid group
+_PO_LINE_REGEX = lazy.Regex(
+	rb"^(?:(?:(msgctxt|msgid_plural|msgid|msgstr)(?:\[([0-9]+)\])?[ \t]+)?"
+	rb"(?:\"(.*)\"[ \t\r]*|(?<=[ \t])(.*)|(\".*))"
+	rb"|#\. Parameter ([0-9]+): ([^ \r\n]+).*"
+	rb"|#,(?:.*,)?[ \t]*(fuzzy)[ \t\r]*(?:,.*)?)$", re.MULTILINE)
+_PO_KEYWORDS = {k.encode(): k for k in ("msgctxt", "msgid", "msgid_plural",
+	"msgstr")}
+# The first bytes of a MO file in either byte order, the same as mo.is_mo
+# without importing mo for every PO file
+_MO_MAGICS = (b"\xde\x12\x04\x95", b"\x95\x04\x12\xde")
+# Files smaller than this are read whole instead of memory mapped, which isn't
+# worth importing mmap for
+_MMAP_MIN_SIZE = 1024 * 1024
+
+# Read a .po file and return its entries as messages.PoEntry. A MO file
+# written by arb2po is read as well
 def _parse_po(path):
-	parameter_regex = re.compile(r"^#\. Parameter ([0-9]+): ([^ \r\n]+).*$")
-	plural_regex = re.compile(r"^msgstr\[[0-9]+\] ")
-	products = []
-	with open(path, "r") as f:
-		while True:
-			entry = {}
+	return list(_iter_po(path))
+
+# Incrementally read a .po file and yield its entries. The file is memory
+# mapped (unless small) and scanned as bytes, only the strings are decoded
+def _iter_po(path):
+	with open(path, "rb") as f:
+		if os.fstat(f.fileno()).st_size < _MMAP_MIN_SIZE:
+			yield from _iter_po_bytes(f.read())
+			return
+		import mmap
+		with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+			yield from _iter_po_bytes(data)
+
+# Same as _parse_po, on the content of a file (bytes or a buffer)
+def _parse_po_bytes(data):
+	return list(_iter_po_bytes(data))
+
+# Same as _iter_po, on the content of a file (bytes or a buffer)
+def _iter_po_bytes(data):
+	if data[:4] in _MO_MAGICS:
+		yield from _iter_mo_bytes(data)
+		return
+	# msgctxt, msgid, msgid_plural and msgstr
+	fields = {}
+	# msgstr[n]
+	plurals = []
+	# the field being read, an int for msgstr[n]
+	key = None
+	parameters = []
+	is_fuzzy = False
+	is_complete = False
+	for m in _PO_LINE_REGEX.finditer(data):
+		keyword, index, string, invalid, invalid_line, number, name, fuzzy = \
+			m.groups()
+		if invalid is not None or invalid_line is not None:
+			raise ValueError(f"Invalid PO string: {m.group()!r}")
+		elif keyword is None and string is not None:
+			# multi-line string
+			if type(key) is int:
+				plurals[key] += _unescape_payload(string)
+			else:
+				fields[key] += _unescape_payload(string)
+			continue
+		elif index is not None and keyword == b"msgstr":
+			key = int(index)
+			if key >= len(plurals):
+				plurals.extend([""] * (key + 1 - len(plurals)))
+			plurals[key] = _unescape_payload(string)
+			is_complete = True
+			continue
+		elif is_complete:
+			# the next entry
+			yield _make_po_entry(fields, plurals, parameters, is_fuzzy)
+			fields = {}
+			plurals = []
 			key = None
-			parameters = {}
+			parameters = []
+			is_fuzzy = False
 			is_complete = False
-			for l in f:
-				if l.startswith("\""):
-					# multi-line string
-					entry[key] += ast.literal_eval(l.strip())
-				elif plural_regex.match(l):
-					key = l[:9]
-					entry[key] = ast.literal_eval(l[10:].strip())
-					is_complete = True
-				elif is_complete:
-					break
-				elif l.startswith("msgctxt "):
-					key = "msgctxt"
-					entry[key] = ast.literal_eval(l[7:].strip())
-				elif l.startswith("msgid "):
-					key = "msgid"
-					entry[key] = ast.literal_eval(l[5:].strip())
-				elif l.startswith("msgid_plural "):
-					key = "msgid_plural"
-					entry[key] = ast.literal_eval(l[12:].strip())
-				elif l.startswith("msgstr "):
-					key = "msgstr"
-					entry[key] = ast.literal_eval(l[6:].strip())
-					is_complete = True
-				elif l.startswith("#"):
-					parameter_m = parameter_regex.match(l)
-					if parameter_m:
-						# parameter line
-						parameters[parameter_m.group(1)] = parameter_m.group(2)
-
-			if not entry:
-				return products
-			if parameters:
-				entry["parameters"] = parameters
-			products += [entry]
-	return products
+		if fuzzy is not None:
+			is_fuzzy = True
+		elif keyword is None:
+			# parameter line
+			parameters.append((int(number), sys.intern(name.decode())))
+		elif index is None:
+			key = _PO_KEYWORDS[keyword]
+			fields[key] = _unescape_payload(string)
+			is_complete = key == "msgstr"
+	if fields or plurals:
+		yield _make_po_entry(fields, plurals, parameters, is_fuzzy)
+
+# Same as _iter_po_bytes, on the content of a MO file. The parameters of each
+# entry are read from the header, in place of the comments of a PO file
+def _iter_mo_bytes(data):
+	import mo
+	catalog = mo.MoFile(data)
+	names = json.loads(catalog.header().get(mo.PLACEHOLDERS_FIELD) or "{}")
+	for msgctxt, msgid, msgid_plural, msgstrs in catalog:
+		parameters = tuple((i, sys.intern(n)) for i, n
+			in enumerate(names.get(msgctxt, ()), 1))
+		if msgid_plural is None:
+			yield messages.PoEntry(msgctxt, msgid, msgstr=msgstrs[0],
+				parameters=parameters)
+		else:
+			yield messages.PoEntry(msgctxt, msgid, msgid_plural,
+				msgstr_plural=msgstrs, parameters=parameters)
+
+def _make_po_entry(fields, plurals, parameters, is_fuzzy):
+	return messages.PoEntry(msgstr_plural=tuple(plurals) if plurals else None,
+		parameters=tuple(parameters), is_fuzzy=is_fuzzy, **fields)
+
+# Raised by _Po2Arb.iter_pairs on a key found twice
+class _DuplicateKeyError(ValueError):
+	pass
 
 class _Po2Arb:
+	def __init__(self):
+		# parameters => ordinals.Table
+		self._tables = {}
+
 	def __call__(self, po):
 		arb = {}
 		for entry in po:
-			if not entry["msgid"]:
-				# header entry, ignore
-				continue
-			if "msgstr" in entry:
-				string = entry["msgstr"]
-				if "parameters" in entry:
-					for key, value in entry["parameters"].items():
-						string = string.replace(f"%{key}$s", f"{{{value}}}")
-			elif "msgstr[0]" in entry:
-				# plural
-				var = next(iter(entry["parameters"].values()))
-				pattern_str = ""
-				for i in range(4):
-					item = entry[f"msgstr[{i}]"]
-					if item:
-						# escape ' and sharp
-						item = item.replace("'", "''")
-						item = item.replace("#", "'#'")
-						for p_i, (key, value) in enumerate(
-								entry["parameters"].items()):
-							# somehow flutter doesn't support #. oops
-							# item = item.replace(f"%{key}$s",
-							# 	f"{{{value}}}" if p_i > 0 else "#")
-							item = item.replace(f"%{key}$s", f"{{{value}}}")
-						if i == 3:
-							category = "other"
-						else:
-							category = f"={i}"
-						pattern_str += f"{category} {{{item}}} "
-				if pattern_str:
-					string = f"{{{var}, plural, {pattern_str.strip()}}}"
-				else:
-					# untranslated
-					string = ""
-
-			if string:
-				#translated entry
-				arb[entry["msgctxt"]] = string
-				if "parameters" in entry:
-					arb["@" + entry["msgctxt"]] = {
-						"placeholders": {key: {} for key
-							in entry["parameters"].values()}
-					}
+			arb.update(self._convert_entry(entry))
 		return arb
 
+	# Yield the (key, value) pairs of the ARB file one entry at a time. Unlike
+	# __call__, which keeps the last value of a duplicate key at the position
+	# of the first, raise _DuplicateKeyError on duplicates
+	def iter_pairs(self, po):
+		keys = set()
+		for entry in po:
+			for key, value in self._convert_entry(entry):
+				if key in keys:
+					raise _DuplicateKeyError(f"Duplicate key: {key}")
+				keys.add(key)
+				yield key, value
+
+	# Return the (key, value) pairs of the ARB file converted from one entry.
+	# A fuzzy entry is left out like an untranslated one, as msgfmt does
+	def _convert_entry(self, entry):
+		if not entry.msgid or entry.is_fuzzy:
+			# header or fuzzy entry, ignore
+			return []
+		string = ""
+		table = self._get_table(entry.parameters)
+		if entry.msgstr_plural is None:
+			string = table.to_names(entry.msgstr)
+		else:
+			# plural
+			var = entry.parameters[0][1]
+			pattern_str = ""
+			for i in range(4):
+				item = entry.get_plural(i)
+				if item:
+					# escape ' and sharp
+					item = codec.quote_icu(item)
+					# somehow flutter doesn't support # for the first
+					# parameter. oops
+					item = table.to_names(item)
+					if i == 3:
+						category = "other"
+					else:
+						category = f"={i}"
+					pattern_str += f"{category} {{{item}}} "
+			if pattern_str:
+				string = f"{{{var}, plural, {pattern_str.strip()}}}"
+
+		if not string:
+			# untranslated
+			return []
+		product = [(entry.msgctxt, string)]
+		if entry.parameters:
+			product.append(("@" + entry.msgctxt, {
+				"placeholders": {name: {} for name in table.names}
+			}))
+		return product
+
+	# Return the table of a tuple of parameters. Entries sharing the same
+	# parameters share one table
+	def _get_table(self, parameters):
+		try:
+			return self._tables[parameters]
+		except KeyError:
+			product = ordinals.Table(parameters)
+			self._tables[parameters] = product
+			return product
+
 def po2arb(file, json_indent=2):
 	po = _parse_po(file)
-	return json.dumps(_Po2Arb()(po), indent=json_indent, ensure_ascii=False)
+	encode = jsonbackend.get(os.path.getsize(file)).encoder(json_indent)
+	return encode(_Po2Arb()(po))
 
-if __name__ == "__main__":
+# Write the pairs to a file object as a JSON object, the same as
+# json.dumps(dict(pairs), indent=indent, ensure_ascii=False). Parts are
+# collected and written about buffer_size characters at a time. Values are
+# encoded with backend (a jsonbackend.Backend, by default the one in use)
+def _write_json_object(pairs, out, indent=2,
+		buffer_size=io.DEFAULT_BUFFER_SIZE, backend=None):
+	if indent is None:
+		newline = ""
+		separator = ", "
+	else:
+		pad = " " * indent if isinstance(indent, int) else indent
+		newline = "\n" + pad
+		separator = ","
+	encode = (backend or jsonbackend.get()).encoder(indent)
+	buffer = ["{"]
+	size = 1
+	is_empty = True
+	for key, value in pairs:
+		value = encode(value)
+		if newline:
+			# strings can't contain a raw newline, only the indentation does
+			value = value.replace("\n", newline)
+		part = (f"{'' if is_empty else separator}{newline}"
+			f"{encode(key)}: {value}")
+		is_empty = False
+		buffer.append(part)
+		size += len(part)
+		if size >= buffer_size:
+			out.write("".join(buffer))
+			buffer = []
+			size = 0
+	if newline and not is_empty:
+		buffer.append("\n")
+	buffer.append("}")
+	out.write("".join(buffer))
+
+# Same as po2arb but stream the ARB file to out instead of returning it, the
+# PO file is never fully in memory. Unlike po2arb, the output ends with a
+# newline
+def po2arb_write(file, out, json_indent=2, buffer_size=io.DEFAULT_BUFFER_SIZE):
+	_write_arb(lambda: _iter_po(file), out, json_indent, buffer_size,
+		jsonbackend.get(os.path.getsize(file)))
+
+# Write the ARB file of the PO entries returned by get_entries() to out, one
+# entry at a time, followed by a newline. A duplicate key is only found once
+# the entries before it are written, out is then rewound and written again as
+# po2arb does it, with the last value at the position of the first. If out
+# isn't seekable, ValueError is raised instead
+def _write_arb(get_entries, out, json_indent=2,
+		buffer_size=io.DEFAULT_BUFFER_SIZE, backend=None):
+	begin = out.tell() if out.seekable() else None
+	try:
+		_write_json_object(_Po2Arb().iter_pairs(get_entries()), out,
+			json_indent, buffer_size, backend)
+	except _DuplicateKeyError:
+		if begin is None:
+			raise
+		out.seek(begin)
+		out.truncate()
+		encode = (backend or jsonbackend.get()).encoder(json_indent)
+		out.write(encode(_Po2Arb()(get_entries())))
+	out.write("\n")
+
+# Same as po2arb, but write the ARB file to out and time each phase of the
+# conversion separately in phases (a timings.Timings)
+def po2arb_timed(file, out, phases, json_indent=2):
+	with phases.phase("read"):
+		with open(file, "rb") as f:
+			data = f.read()
+	with phases.phase("parse"), phases.patch(sys.modules[__name__],
+			"_unescape_payload", "parse/unescape"):
+		po = _parse_po_bytes(data)
+	with phases.phase("transform"):
+		arb = _Po2Arb()(po)
+	with phases.phase("serialize"):
+		encode = jsonbackend.get(len(data)).encoder(json_indent)
+		text = encode(arb) + "\n"
+	with phases.phase("write"):
+		out.write(text)
+		out.flush()
+
+# Keep the converted entries of a PO file in memory. update() rereads the file
+# and only reconverts the entries that differ
+class _Po2ArbSession:
+	def __init__(self, file):
+		self._file = file
+		self._po2arb = _Po2Arb()
+		# msgctxt => (entry, ARB pairs)
+		self._entries = {}
+		self.update()
+
+	def __len__(self):
+		return len(self._entries)
+
+	# Reread the PO file and return the number of entries reconverted
+	def update(self):
+		entries = {}
+		count = 0
+		for entry in _parse_po(self._file):
+			key = entry.msgctxt
+			prev = self._entries.get(key)
+			if prev is not None and prev[0] == entry:
+				entries[key] = prev
+			else:
+				entries[key] = (entry, self._po2arb._convert_entry(entry))
+				count += 1
+		self._entries = entries
+		return count
+
+	def arb(self):
+		arb = {}
+		for _, pairs in self._entries.values():
+			arb.update(pairs)
+		return arb
+
+# Convert the PO file to output, then keep watching it and update output
+# whenever it changes, until interrupted
+def po2arb_watch(file, output, json_indent=2, interval=0.5):
+	import watch
+	encode = jsonbackend.get().encoder(json_indent)
+
+	def write():
+		watch.write_file(output, encode(session.arb()) + "\n")
+
+	begin = time.perf_counter()
+	session = _Po2ArbSession(file)
+	write()
+	watch.log(output, len(session), begin)
+
+	def on_change(paths):
+		begin = time.perf_counter()
+		try:
+			count = session.update()
+		except (ValueError, KeyError) as e:
+			# probably saved halfway, wait for the next change
+			print(e, file=sys.stderr)
+			return
+		if count:
+			write()
+		watch.log(output, count, begin)
+
+	watch.watch([file], on_change, interval)
+
+# Return the ARB file name of a PO file, e.g. es.po => app_es.arb
+def _get_arb_name(path):
+	return f"app_{os.path.splitext(os.path.basename(path))[0]}.arb"
+
+# Convert a PO file to output through a temporary file, output is left as it
+# was if the conversion fails
+def _run_batch(file, output):
+	tmp = f"{output}.tmp"
+	try:
+		with open(tmp, "w") as f:
+			po2arb_write(file, f)
+		os.replace(tmp, output)
+	except BaseException:
+		try:
+			os.remove(tmp)
+		except FileNotFoundError:
+			pass
+		raise
+
+# Convert a PO file to stdout, which is left as it was if the conversion
+# fails. Unless stdout is a file positioned at its end, which can be rewound,
+# the output is built in memory first, e.g. for a pipe. A file opened for
+# appending is positioned at 0 until written to
+def _run_stdout(file):
+	out = sys.stdout
+	if out.seekable() and out.tell() == os.fstat(out.fileno()).st_size:
+		begin = out.tell()
+		try:
+			po2arb_write(file, out)
+		except BaseException:
+			out.seek(begin)
+			out.truncate()
+			raise
+		return
+	buffer = io.StringIO()
+	po2arb_write(file, buffer)
+	out.write(buffer.getvalue())
+
+# Convert each PO file to an ARB file, written to out_dir as app_LOCALE.arb.
+# With jobs > 1, the files are converted concurrently in a process pool.
+# Return the paths of the ARB files. Raise batch.BatchError if any of the files
+# failed, the others are still converted
+def po2arb_batch(files, out_dir, jobs=1):
+	outputs = [os.path.join(out_dir, _get_arb_name(p)) for p in files]
+	if len(set(outputs)) != len(outputs):
+		raise ValueError(f"PO files sharing the same locale: {files}")
+	batch.run(_run_batch, list(zip(files, outputs)), jobs=jobs)
+	return outputs
+
+# Return the parser of the command line
+def _get_parser():
 	import argparse
 	parser = argparse.ArgumentParser(
+		formatter_class=batch.help_formatter,
 		description="Convert a gettext PO file back to ARB file. Notice that this only works if the PO file was originally converted by us from an ARB file",
 	)
 	parser.add_argument(
 		"po",
+		nargs="+",
+		help="Multiple files, glob patterns or directories (of *.po) require --output-dir"
+	)
+	parser.add_argument(
+		"-o", "--output",
+		help="Write the ARB file here instead of stdout"
+	)
+	parser.add_argument(
+		"-w", "--watch",
+		action="store_true",
+		help="Keep watching the PO file and update OUTPUT whenever it changes, requires --output"
+	)
+	parser.add_argument(
+		"-d", "--output-dir",
+		help="Batch mode, write one app_LOCALE.arb per PO file to this directory"
+	)
+	parser.add_argument(
+		"-j", "--jobs",
+		type=int,
+		default=1,
+		help="Number of files to convert concurrently in batch mode (default: %(default)s)"
 	)
-	_args = parser.parse_args()
-	print(po2arb(_args.po))
+	parser.add_argument(
+		"--json-backend",
+		choices=jsonbackend.NAMES,
+		help=f"JSON library to read and write ARB files with, auto reads with json and picks the fastest installed for the rest (default: ${jsonbackend.ENV_VAR} or auto)"
+	)
+	parser.add_argument(
+		"--timings",
+		action="store_true",
+		help="Report the wall and CPU time of each phase on stderr. Not supported in batch or watch mode"
+	)
+	parser.add_argument(
+		"--profile",
+		metavar="FILE",
+		help="Run under cProfile and dump the stats to FILE"
+	)
+	return parser
+
+# Send the conversion of the command line to the daemon set in ARB2PO_DAEMON,
+# if any and it's a single file conversion, and exit. Return if it should be
+# done locally instead. --json-backend is rejected, the daemon uses its own,
+# and --jobs is only for batch mode
+def _run_daemon(parser, args, pos):
+	if not os.environ.get("ARB2PO_DAEMON") or args.watch or args.output_dir \
+			or args.timings or args.profile or len(pos) != 1:
+		return
+	if args.json_backend:
+		parser.error("--json-backend is not supported with ARB2PO_DAEMON")
+	import daemon
+	if daemon.run_cli({"op": "po2arb", "po": pos[0], "output": args.output}):
+		sys.exit(0)
+
+# Run the command line, through the daemon if it does the conversion
+def main():
+	parser = _get_parser()
+	args = parser.parse_args()
+	pos = batch.expand_paths(args.po, "*.po")
+	_run_daemon(parser, args, pos)
+	if args.json_backend:
+		# inherited by the processes of batch mode
+		os.environ[jsonbackend.ENV_VAR] = args.json_backend
+	try:
+		jsonbackend.use(os.environ.get(jsonbackend.ENV_VAR) or "auto")
+	except (ImportError, ValueError) as e:
+		parser.error(str(e))
+	if args.timings and (args.watch or args.output_dir or len(pos) != 1):
+		parser.error("--timings is only supported when converting a single file")
+
+	def run():
+		if args.timings:
+			import timings
+			phases = timings.Timings()
+			if args.output:
+				with open(args.output, "w") as f:
+					po2arb_timed(pos[0], f, phases)
+			else:
+				po2arb_timed(pos[0], sys.stdout, phases)
+			phases.report()
+		else:
+			run_cli()
+
+	def run_cli():
+		if args.watch:
+			if not args.output or len(pos) != 1:
+				parser.error("--watch requires --output and exactly one PO file")
+			po2arb_watch(pos[0], args.output)
+		elif args.output_dir:
+			try:
+				po2arb_batch(pos, args.output_dir, jobs=args.jobs)
+			except batch.BatchError as e:
+				print(e, file=sys.stderr)
+				sys.exit(1)
+		elif len(pos) != 1:
+			parser.error("multiple PO files require --output-dir")
+		else:
+			try:
+				if args.output:
+					_run_batch(pos[0], args.output)
+				else:
+					_run_stdout(pos[0])
+			except (ValueError, KeyError, OSError) as e:
+				print(f"{pos[0]}: {e}", file=sys.stderr)
+				sys.exit(1)
+
+	if args.profile:
+		import timings
+		timings.profile(args.profile, run)
+	else:
+		run()
+
+if __name__ == "__main__":
+	main()
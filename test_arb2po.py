@@ -1,7 +1,24 @@
 #!/usr/bin/env python3
+import contextlib
+import io
+import json
+import os
 import tempfile
 import unittest
-from arb2po import arb2po
+from arb2po import arb2po, arb2po_batch, arb2po_timed, arb2po_update, \
+	arb2po_write, arb2po_write_mo, \
+	_get_locale, \
+	_iter_arb, _open_cache, _parse_arb, _read_arbs, _Arb2Po, _Arb2PoSession, \
+	_JsonObjectReader, _Substitution
+from batch import BatchError
+from bench import corpus
+from messages import ArbMessage
+from icu import get_plural, parse
+import codec
+import mo
+import ordinals
+import po2arb
+from timings import Timings
 
 _HEADER = r"""
 msgid ""
@@ -957,5 +974,751 @@ msgid "bar"
 msgstr "★"
 """.rstrip())
 
+	def test_plural_comma(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+{
+	"foo": "{param, plural, =1{one, singular} other{many, plural}}",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	}
+}
+""")
+		f.flush()
+		out = arb2po(f.name, None)
+		f.close()
+		self.assertEqual(out.strip(),
+_HEADER + r"""
+
+#. Parameter 1: param
+#, c-format
+msgctxt "foo"
+msgid "one, singular"
+msgid_plural "many, plural"
+msgstr[0] ""
+msgstr[1] ""
+msgstr[2] ""
+msgstr[3] ""
+""".rstrip())
+
+	def test_plural_literal_apostrophe(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+{
+	"foo": "{param, plural, =1{don't} other{'{param}' {param}}}",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	}
+}
+""")
+		f.flush()
+		out = arb2po(f.name, None)
+		f.close()
+		self.assertEqual(out.strip(),
+_HEADER + r"""
+
+#. Parameter 1: param
+#, c-format
+msgctxt "foo"
+msgid "don't"
+msgid_plural "{param} %1$s"
+msgstr[0] ""
+msgstr[1] ""
+msgstr[2] ""
+msgstr[3] ""
+""".rstrip())
+
+	def test_plural_sharp_many(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+{
+	"foo": "{param1, plural, =1{# {param2}} other{# '#' {param2} # '' #}}",
+	"@foo": {
+		"placeholders": {
+			"param1": {},
+			"param2": {}
+		}
+	}
+}
+""")
+		f.flush()
+		out = arb2po(f.name, None)
+		f.close()
+		self.assertEqual(out.strip(),
+_HEADER + r"""
+
+#. Parameter 1: param1
+#. Parameter 2: param2
+#, c-format
+msgctxt "foo"
+msgid "%1$s %2$s"
+msgid_plural "%1$s # %2$s %1$s ' %1$s"
+msgstr[0] ""
+msgstr[1] ""
+msgstr[2] ""
+msgstr[3] ""
+""".rstrip())
+
+	def test_plural_zero_newline(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+{
+	"foo": "{param, plural, =0{no\n\"one\"} other{plural}}",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	}
+}
+""")
+		f.flush()
+		out = arb2po(f.name, None)
+		f.close()
+		self.assertIn(r"""
+#. If zero: "no\n\"one\""
+msgctxt "foo"
+""", out)
+
+	# only the declared placeholders are replaced, ICU quoting, spacing and
+	# inline blocks are kept as written
+	def test_select(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+{
+	"foo": "{a, select, x{X '{' {b}} other{it''s {c}}}",
+	"@foo": {
+		"placeholders": {
+			"a": {},
+			"b": {}
+		}
+	},
+	"bar": "Press { key } now {count,plural,=1{# '#'} other{#}} '{x}'",
+	"@bar": {
+		"placeholders": {
+			"key": {},
+			"count": {}
+		}
+	}
+}
+""")
+		f.flush()
+		out = arb2po(f.name, f.name)
+		f.close()
+		self.assertEqual(out.strip(),
+_HEADER + r"""
+
+#. Parameter 1: a
+#. Parameter 2: b
+#, c-format
+msgctxt "foo"
+msgid "{a, select, x{X '{' %2$s} other{it''s {c}}}"
+msgstr "{a, select, x{X '{' %2$s} other{it''s {c}}}"
+
+#. Parameter 1: key
+#. Parameter 2: count
+#, c-format
+msgctxt "bar"
+msgid "Press %1$s now {count,plural,=1{# '#'} other{#}} '{x}'"
+msgstr "Press %1$s now {count,plural,=1{# '#'} other{#}} '{x}'"
+""".rstrip())
+
+	# an apostrophe ending a branch is kept, on both sides
+	def test_plural_apostrophe(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+{
+	"foo": "{n, plural, one{the user'} other{the users'}}",
+	"@foo": {
+		"placeholders": {
+			"n": {}
+		}
+	}
+}
+""")
+		f.flush()
+		out = arb2po(f.name, f.name)
+		f.close()
+		self.assertEqual(out.strip(),
+_HEADER + r"""
+
+#. Parameter 1: n
+#, c-format
+msgctxt "foo"
+msgid "the user'"
+msgid_plural "the users'"
+msgstr[0] ""
+msgstr[1] "the user'"
+msgstr[2] ""
+msgstr[3] "the users'"
+""".rstrip())
+
+	def test_plural_no_other(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+{
+	"foo": "{n, plural, one{user}}",
+	"@foo": {
+		"placeholders": {
+			"n": {}
+		}
+	}
+}
+""")
+		f.flush()
+		with self.assertRaisesRegex(ValueError, "^foo: "):
+			arb2po(f.name, None)
+		f.close()
+
+	def test_render_simple(self):
+		for names in [(), ("n",), ("n", "x")]:
+			substitution = _Substitution(ordinals.Table.from_names(names))
+			for s in ["{n, plural, other{a '' b's # {n} { x } {y}}}",
+					"{n, plural, one{it'''s} other{#{n}#}}"]:
+				for b in get_plural(parse(s)).options.values():
+					self.assertEqual(substitution.render_simple(b.raw),
+						substitution(b.nodes), s)
+
+	def test_write(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+{
+	"foo": "{param} bar",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	},
+	"bar": "{param, plural, =1{singular} other{plural}}",
+	"@bar": {
+		"placeholders": {
+			"param": {}
+		}
+	}
+}
+""")
+		f.flush()
+		expect = arb2po(f.name, None) + "\n"
+		for buffer_size in [1, 16, io.DEFAULT_BUFFER_SIZE]:
+			out = io.StringIO()
+			arb2po_write(f.name, None, out, buffer_size=buffer_size)
+			self.assertEqual(out.getvalue(), expect)
+		f.close()
+
+	def test_timed(self):
+		d = tempfile.TemporaryDirectory()
+		src = os.path.join(d.name, "app_en.arb")
+		with open(src, "w") as f:
+			f.write(
+r"""
+{
+	"foo": "{param} it's \"bar\"",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	},
+	"bar": "{param, plural, =1{singular} other{plural}}"
+}
+""")
+		es = os.path.join(d.name, "app_es.arb")
+		with open(es, "w") as f:
+			f.write(
+r"""
+{
+	"foo": "{param} baz"
+}
+""")
+		for translated in [None, es]:
+			timings = Timings()
+			out = io.StringIO()
+			memo = arb2po_timed(src, translated, out, timings)
+			self.assertGreater(memo.misses, 0)
+			self.assertEqual(out.getvalue(), arb2po(src, translated) + "\n")
+			self.assertEqual(list(timings), ["read", "parse", "transform",
+				"transform/escape", "serialize", "write"])
+		self.assertIs(_Arb2Po.__dict__["_escape_str"].__func__,
+			codec.escape_po)
+		d.cleanup()
+
+	def test_write_jobs(self):
+		d = tempfile.TemporaryDirectory()
+		src, es, _ = corpus.write_corpus(d.name, 300)
+		for translated in [es, None]:
+			out = io.StringIO()
+			arb2po_write(src, translated, out)
+			parallel_out = io.StringIO()
+			arb2po_write(src, translated, parallel_out, jobs=2)
+			self.assertEqual(parallel_out.getvalue(), out.getvalue())
+		d.cleanup()
+
+	def test_write_mo(self):
+		d = tempfile.TemporaryDirectory()
+		src, es, _ = corpus.write_corpus(d.name, 300)
+		po = os.path.join(d.name, "es2.po")
+		with open(po, "w") as f:
+			arb2po_write(src, es, f)
+		output = os.path.join(d.name, "es.mo")
+		with open(output, "wb") as f:
+			arb2po_write_mo(src, es, f)
+		# the same entries as the PO file, translated ones only
+		with open(output, "rb") as f:
+			catalog = mo.MoFile(f.read())
+		count = 0
+		for entry in po2arb._parse_po(po):
+			msgstrs = entry.msgstr_plural or (entry.msgstr,)
+			if entry.msgid and any(msgstrs):
+				self.assertEqual(catalog.get(entry.msgid, entry.msgctxt), msgstrs)
+				count += 1
+		self.assertEqual(len(catalog), count + 1)
+		self.assertIn("nplurals=4;", catalog.header()["Plural-Forms"])
+		# which po2arb converts back the same
+		self.assertEqual(po2arb.po2arb(output), po2arb.po2arb(po))
+		d.cleanup()
+
+	def test_memo(self):
+		original = [
+			ArbMessage("a", "OK"),
+			ArbMessage("b", "OK"),
+			ArbMessage("c", "{n, plural, =1{one} other{{n} items}}", None,
+				("n",)),
+			ArbMessage("d", "{n, plural, =1{one} other{{n} items}}", None,
+				("n",)),
+			ArbMessage("e", "{n} OK", None, ("n",)),
+		]
+		translated = {
+			"a": ArbMessage("a", "Vale"),
+			"b": ArbMessage("b", "Vale"),
+			"c": ArbMessage("c", "{n, plural, =1{uno} other{{n} cosas}}",
+				None, ("n",)),
+			"d": ArbMessage("d", "{n, plural, =1{uno} other{{n} cosas}}",
+				None, ("n",)),
+		}
+		arb2po_ = _Arb2Po()
+		out = list(arb2po_(original, translated))
+		self.assertEqual(out, list(_Arb2Po(memo_size=0)(original, translated)))
+		info = arb2po_.memo_info()
+		# OK, Vale and both plurals are prepared once
+		self.assertEqual(info.hits, 4)
+		self.assertEqual(info.misses, 6)
+		self.assertEqual(list(arb2po_(original, translated)), out)
+		self.assertEqual(arb2po_.memo_info().misses, 6)
+
+	def test_memo_size(self):
+		original = [ArbMessage(str(i), f"value {i}") for i in range(10)]
+		arb2po_ = _Arb2Po(memo_size=4)
+		list(arb2po_(original, {}))
+		self.assertEqual(arb2po_.memo_info().currsize, 4)
+
+	def test_cache(self):
+		d = tempfile.TemporaryDirectory()
+		src = os.path.join(d.name, "app_en.arb")
+		with open(src, "w") as f:
+			f.write(
+r"""
+{
+	"foo": "{param, plural, =1{singular} other{plural}}",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	},
+	"bar": "bar",
+	"baz": "baz"
+}
+""")
+		es = os.path.join(d.name, "app_es.arb")
+		with open(es, "w") as f:
+			f.write("{\"bar\": \"es\"}")
+		cache_dir = os.path.join(d.name, "cache")
+		for _ in range(2):
+			out = io.StringIO()
+			arb2po_write(src, es, out, cache_dir=cache_dir)
+			self.assertEqual(out.getvalue(), arb2po(src, es) + "\n")
+
+		with open(es, "w") as f:
+			f.write("{\"bar\": \"es\", \"baz\": \"es\"}")
+		entry_cache = _open_cache(cache_dir, src, es)
+		self.assertEqual(len(entry_cache), 3)
+		out = "\n".join(_Arb2Po(entry_cache)(*_read_arbs(src, es)))
+		self.assertEqual(out, arb2po(src, es))
+		self.assertEqual((entry_cache.hits, entry_cache.misses), (2, 1))
+		d.cleanup()
+
+	def test_update(self):
+		d = tempfile.TemporaryDirectory()
+		src = os.path.join(d.name, "app_en.arb")
+		es = os.path.join(d.name, "app_es.arb")
+		po = os.path.join(d.name, "es.po")
+		with open(src, "w") as f:
+			f.write(
+r"""
+{
+	"foo": "{param} bar",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	},
+	"bar": "bar",
+	"baz": "{n, plural, =1{one} other{many}}",
+	"@baz": {
+		"placeholders": {
+			"n": {}
+		}
+	}
+}
+""")
+		with open(es, "w") as f:
+			f.write(
+r"""
+{
+	"bar": "Bar"
+}
+""")
+		self.assertEqual(arb2po_update(src, es, po), (0, 3, 0))
+		with open(po, "r") as f:
+			self.assertEqual(f.read(), arb2po(src, es) + "\n")
+		self.assertEqual(arb2po_update(src, es, po), (0, 0, 0))
+
+		with open(po, "r") as f:
+			text = f.read()
+		text = text.replace("#, c-format\nmsgctxt \"foo\"",
+			"# Note\n#, c-format\nmsgctxt \"foo\"")
+		text = text.replace("msgid \"%1$s bar\"\nmsgstr \"\"",
+			"msgid \"%1$s bar\"\nmsgstr \"%1$s Bar\"")
+		text = text.replace("msgstr[1] \"\"", "msgstr[1] \"uno\"")
+		with open(po, "w") as f:
+			f.write(text.replace("\n", "\r\n"))
+		with open(src, "w") as f:
+			f.write(
+r"""
+{
+	"foo": "{param} bar!",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	},
+	"baz": "{n, plural, =1{one} other{many}}",
+	"@baz": {
+		"placeholders": {
+			"n": {}
+		}
+	},
+	"qux": "qux"
+}
+""")
+		self.assertEqual(arb2po_update(src, es, po), (1, 1, 1))
+		with open(po, "r", newline="") as f:
+			self.assertEqual(f.read(), _HEADER.replace("\n", "\r\n") +
+"""\r
+\r
+# Note\r
+#. Parameter 1: param\r
+#, fuzzy, c-format\r
+msgctxt "foo"\r
+msgid "%1$s bar!"\r
+msgstr "%1$s Bar"\r
+\r
+#~ msgctxt "bar"\r
+#~ msgid "bar"\r
+#~ msgstr "Bar"\r
+\r
+#. Parameter 1: n\r
+#, c-format\r
+msgctxt "baz"\r
+msgid "one"\r
+msgid_plural "many"\r
+msgstr[0] ""\r
+msgstr[1] "uno"\r
+msgstr[2] ""\r
+msgstr[3] ""\r
+\r
+#, no-c-format\r
+msgctxt "qux"\r
+msgid "qux"\r
+msgstr ""\r
+""")
+		# the fuzzy translation of foo isn't exported
+		self.assertEqual(json.loads(po2arb.po2arb(po)), {
+			"baz": "{n, plural, =1 {uno}}",
+			"@baz": {"placeholders": {"n": {}}},
+		})
+
+		# bar is back, with its old translation
+		with open(src, "w") as f:
+			f.write(
+r"""
+{
+	"bar": "bar"
+}
+""")
+		self.assertEqual(arb2po_update(src, es, po), (1, 0, 3))
+		with open(po, "r") as f:
+			self.assertIn("\n#, no-c-format\nmsgctxt \"bar\"\nmsgid \"bar\"\n"
+				"msgstr \"Bar\"\n", f.read())
+		d.cleanup()
+
+	def test_session(self):
+		d = tempfile.TemporaryDirectory()
+		src = os.path.join(d.name, "app_en.arb")
+		with open(src, "w") as f:
+			f.write("{\"foo\": \"foo\", \"bar\": \"bar\", \"baz\": \"baz\"}")
+		es = os.path.join(d.name, "app_es.arb")
+		with open(es, "w") as f:
+			f.write("{\"foo\": \"es\"}")
+		session = _Arb2PoSession(src, es)
+		self.assertEqual(len(session), 3)
+		self.assertEqual("\n".join(session.lines()), arb2po(src, es))
+
+		with open(es, "w") as f:
+			f.write("{\"foo\": \"es\", \"bar\": \"es\"}")
+		self.assertEqual(session.update([es]), 1)
+		self.assertEqual("\n".join(session.lines()), arb2po(src, es))
+
+		with open(src, "w") as f:
+			f.write("{\"qux\": \"qux\", \"foo\": \"foo\", \"bar\": \"bar2\"}")
+		self.assertEqual(session.update([src]), 2)
+		self.assertEqual("\n".join(session.lines()), arb2po(src, es))
+		d.cleanup()
+
+	def test_batch(self):
+		d = tempfile.TemporaryDirectory()
+		src = os.path.join(d.name, "app_en.arb")
+		with open(src, "w") as f:
+			f.write(
+r"""
+{
+	"foo": "{param, plural, =1{singular} other{plural}}",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	},
+	"bar": "bar"
+}
+""")
+		es = os.path.join(d.name, "app_es.arb")
+		with open(es, "w") as f:
+			f.write(
+r"""
+{
+	"foo": "{param, plural, =1{uno} other{otro}}",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	}
+}
+""")
+		zh = os.path.join(d.name, "app_zh_Hant.arb")
+		with open(zh, "w") as f:
+			f.write(
+r"""
+{
+	"bar": "★"
+}
+""")
+		out = arb2po_batch(src, [es, zh], d.name)
+		self.assertEqual(out, [os.path.join(d.name, "es.po"),
+			os.path.join(d.name, "zh_Hant.po")])
+		for translated, po in zip([es, zh], out):
+			with open(po, "r") as f:
+				self.assertEqual(f.read(), arb2po(src, translated) + "\n")
+		out = arb2po_batch(src, [es, zh], d.name, mo=True)
+		self.assertEqual(out, [os.path.join(d.name, "es.mo"),
+			os.path.join(d.name, "zh_Hant.mo")])
+		for translated, output in zip([es, zh], out):
+			expected = io.BytesIO()
+			arb2po_write_mo(src, translated, expected)
+			with open(output, "rb") as f:
+				self.assertEqual(f.read(), expected.getvalue())
+		d.cleanup()
+
+	def test_batch_jobs(self):
+		d = tempfile.TemporaryDirectory()
+		src = os.path.join(d.name, "app_en.arb")
+		with open(src, "w") as f:
+			f.write("{\"foo\": \"bar\"}")
+		translated_files = []
+		for locale in ["de", "es", "fr", "ja"]:
+			translated_files.append(os.path.join(d.name, f"app_{locale}.arb"))
+			with open(translated_files[-1], "w") as f:
+				f.write(f"{{\"foo\": \"{locale}\"}}")
+		broken = os.path.join(d.name, "app_xx.arb")
+		with open(broken, "w") as f:
+			f.write("{\"foo\": ")
+		with self.assertRaises(BatchError) as cm:
+			arb2po_batch(src, translated_files + [broken], d.name, jobs=2)
+		self.assertEqual([p for p, _ in cm.exception.errors], [broken])
+		for translated in translated_files:
+			with open(os.path.join(d.name, f"{_get_locale(translated)}.po"),
+					"r") as f:
+				self.assertEqual(f.read(), arb2po(src, translated) + "\n")
+		d.cleanup()
+
+	def test_batch_same_locale(self):
+		with self.assertRaises(ValueError):
+			arb2po_batch("app_en.arb", ["a/app_es.arb", "b/app_es.arb"], ".")
+
+	def test_get_locale(self):
+		self.assertEqual(_get_locale("l10n/app_es.arb"), "es")
+		self.assertEqual(_get_locale("app_zh_Hant.arb"), "zh_Hant")
+		self.assertEqual(_get_locale("es.arb"), "es")
+
+
+class TestIterArb(unittest.TestCase):
+	# Return the records of an ARB file, and what was printed on stderr if
+	# stderr is a list
+	def _iter(self, content, stderr=None, **kwargs):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(content)
+		f.flush()
+		out = io.StringIO()
+		with contextlib.redirect_stderr(out):
+			product = list(_iter_arb(f.name, **kwargs))
+		f.close()
+		if stderr is None:
+			self.assertEqual(out.getvalue(), "")
+		else:
+			stderr.append(out.getvalue().replace(f.name, "ARB"))
+		return product
+
+	def test_empty(self):
+		self.assertEqual(self._iter("{}"), [])
+
+	def test_attributes_after(self):
+		self.assertEqual(self._iter(
+r"""
+{
+	"@@locale": "en",
+	"foo": "bar",
+	"@foo": {"description": "foo"},
+	"baz": "qux"
+}
+"""), [
+			("foo", "bar", {"description": "foo"}),
+			("baz", "qux", None),
+		])
+
+	def test_attributes_before(self):
+		self.assertEqual(self._iter(
+r"""
+{
+	"@foo": {"description": "foo"},
+	"foo": "bar",
+	"baz": "qux",
+	"@baz": {"description": "baz"}
+}
+"""), [
+			("foo", "bar", {"description": "foo"}),
+			("baz", "qux", {"description": "baz"}),
+		])
+
+	def test_order(self):
+		# foo is still emitted first even though baz completes earlier
+		self.assertEqual(self._iter(
+r"""
+{
+	"foo": "bar",
+	"baz": "qux",
+	"@baz": {},
+	"@foo": {}
+}
+"""), [
+			("foo", "bar", {}),
+			("baz", "qux", {}),
+		])
+
+	def test_window(self):
+		stderr = []
+		self.assertEqual(self._iter(
+r"""
+{
+	"foo": "bar",
+	"baz": "qux",
+	"quux": "corge",
+	"@foo": {}
+}
+""", stderr, window=1), [
+			("foo", "bar", None),
+			("baz", "qux", None),
+			("quux", "corge", None),
+		])
+		self.assertEqual(stderr,
+			["ARB: @foo has no message within 1 members, ignored\n"])
+
+	def test_window_before(self):
+		stderr = []
+		self.assertEqual(self._iter(
+r"""
+{
+	"@foo": {},
+	"@baz": {},
+	"@quux": {},
+	"foo": "bar",
+	"quux": "corge"
+}
+""", stderr, window=1), [
+			("foo", "bar", None),
+			("quux", "corge", {}),
+		])
+		self.assertEqual(stderr, ["ARB: @foo has no message within 1 members, "
+			"ignored\nARB: @baz has no message within 1 members, ignored\n"])
+
+	def test_parse_arb_unbounded(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		json.dump({"foo": "bar", **{f"k{i}": "v" for i in range(3000)},
+			"@foo": {"description": "far"}}, f)
+		f.flush()
+		self.assertEqual(_parse_arb(f.name)["foo"].description, "far")
+		f.close()
+
+	def test_invalid(self):
+		with self.assertRaises(ValueError):
+			self._iter("[]")
+		with self.assertRaises(ValueError):
+			self._iter("{\"foo\": \"bar\"")
+		with self.assertRaises(ValueError):
+			self._iter("{\"foo\" \"bar\"}")
+
+class TestJsonObjectReader(unittest.TestCase):
+	def test_chunks(self):
+		content = json.dumps({
+			"foo": "bar ★ \"baz\"",
+			"@foo": {"placeholders": {"a": {"example": 12345}}},
+			"n": 1234567890,
+			"t": [True, False, None],
+		}, indent="\t", ensure_ascii=False)
+		for chunk_size in [1, 2, 7, 4096]:
+			pairs = list(_JsonObjectReader(io.StringIO(content), chunk_size))
+			self.assertEqual(dict(pairs), json.loads(content))
+
+	# runs of members are only cut between two members, not at a comma in a
+	# string or a nested value
+	def test_runs(self):
+		obj = {}
+		for i in range(300):
+			obj[f"k{i}"] = "a, " * (i % 5) + "\", \"b"
+			obj[f"@k{i}"] = {"description": "d, \"", "placeholders": {
+				"x": {}, "y": {"example": [1, 2, {"z": ", \""}]}}}
+		for indent in [None, "\t", 2]:
+			content = json.dumps(obj, indent=indent)
+			for chunk_size in [7, 100, 1000, 65536]:
+				pairs = list(_JsonObjectReader(io.StringIO(content), chunk_size))
+				self.assertEqual(pairs, list(obj.items()))
+
 if __name__ == "__main__":
     unittest.main()
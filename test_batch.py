@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import tempfile
+import unittest
+import itertools
+from batch import BatchError, expand_paths, help_formatter, map_chunks, run
+
+def _fail_odd(n, product):
+	if n % 2:
+		raise ValueError(f"odd: {n}")
+	product.append(n)
+
+def _sum_chunk(chunk):
+	if -1 in chunk:
+		raise ValueError("negative")
+	return (len(chunk), sum(chunk))
+
+class TestBatch(unittest.TestCase):
+	def test_expand_paths(self):
+		d = tempfile.TemporaryDirectory()
+		for name in ["app_en.arb", "app_es.arb", "app_de.arb", "es.po"]:
+			open(os.path.join(d.name, name), "w").close()
+		src = os.path.join(d.name, "app_en.arb")
+		self.assertEqual(expand_paths([d.name, "foo.arb"], "app_*.arb",
+			exclude=[src]), [
+				os.path.join(d.name, "app_de.arb"),
+				os.path.join(d.name, "app_es.arb"),
+				"foo.arb",
+			])
+		self.assertEqual(expand_paths([os.path.join(d.name, "*.po")], "*.arb"),
+			[os.path.join(d.name, "es.po")])
+		d.cleanup()
+
+	def test_run(self):
+		product = []
+		with self.assertRaises(BatchError) as cm:
+			run(_fail_odd, [(i, product) for i in range(5)])
+		self.assertEqual(product, [0, 2, 4])
+		self.assertEqual([n for n, _ in cm.exception.errors], [1, 3])
+		self.assertEqual(str(cm.exception), "1: odd: 1\n3: odd: 3")
+
+	def test_run_jobs(self):
+		with self.assertRaises(BatchError) as cm:
+			run(_fail_odd, [(i, []) for i in range(5)], jobs=2)
+		self.assertEqual([n for n, _ in cm.exception.errors], [1, 3])
+
+	def test_map_chunks(self):
+		product = list(map_chunks(_sum_chunk, range(1000), 2, first_size=10))
+		self.assertEqual(sum(n for n, _ in product), 1000)
+		self.assertEqual(sum(s for _, s in product), sum(range(1000)))
+		# in order
+		sizes = list(itertools.accumulate(n for n, _ in product))
+		self.assertEqual([s for _, s in product], [sum(range(a - n, a))
+			for a, (n, _) in zip(sizes, product)])
+		self.assertEqual(product[0][0], 10)
+		# the chunks cost next to nothing, they grow
+		self.assertGreater(max(n for n, _ in product), 10)
+		self.assertEqual(list(map_chunks(_sum_chunk, [], 2)), [])
+
+	def test_map_chunks_error(self):
+		with self.assertRaises(ValueError):
+			list(map_chunks(_sum_chunk, [1, 2, -1, 3], 2, first_size=1))
+
+	def test_help_formatter(self):
+		columns = os.environ.get("COLUMNS")
+		try:
+			for c in ["40", "120", "x"]:
+				os.environ["COLUMNS"] = c
+				helps = []
+				for formatter_class in [argparse.HelpFormatter, help_formatter]:
+					parser = argparse.ArgumentParser(prog="foo",
+						formatter_class=formatter_class,
+						description="Convert the files " * 8)
+					parser.add_argument("file", nargs="+", help="A file " * 10)
+					parser.add_argument("-o", "--output", help="Output " * 10)
+					helps.append(parser.format_help())
+				self.assertEqual(helps[1], helps[0], c)
+		finally:
+			if columns is None:
+				del os.environ["COLUMNS"]
+			else:
+				os.environ["COLUMNS"] = columns
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import json
+import os
+import tempfile
+import unittest
+from arb2po import arb2po
+from bench import cache as cache_bench
+from bench import corpus
+
+class TestCorpus(unittest.TestCase):
+	def test_write_corpus(self):
+		d = tempfile.TemporaryDirectory()
+		src, es, po = corpus.write_corpus(d.name, 200)
+		with open(src, "r") as f:
+			src_arb = json.load(f)
+		with open(es, "r") as f:
+			es_arb = json.load(f)
+		keys = [k for k in src_arb if not k.startswith("@")]
+		self.assertEqual(len(keys), 200)
+		self.assertEqual(keys, [k for k in es_arb if not k.startswith("@")])
+		for kind in corpus.DEFAULT_MIX:
+			self.assertTrue(any(k.startswith(kind) for k in keys))
+		for k in keys:
+			self.assertEqual(
+				src_arb.get(f"@{k}", {}).get("placeholders"),
+				es_arb.get(f"@{k}", {}).get("placeholders"))
+		with open(po, "r") as f:
+			self.assertEqual(f.read(), arb2po(src, es) + "\n")
+		d.cleanup()
+
+	def test_mix(self):
+		d = tempfile.TemporaryDirectory()
+		path = os.path.join(d.name, "app_en.arb")
+		corpus.write_arb(path, 50, corpus.parse_mix("plural=1"))
+		with open(path, "r") as f:
+			self.assertTrue(all(k.startswith("plural") or k.startswith("@plural")
+				for k in json.load(f)))
+		d.cleanup()
+
+	def test_cache(self):
+		self.assertTrue(cache_bench.run(200, repeat=1)[3])
+
+	def test_parse_mix_invalid(self):
+		with self.assertRaises(ValueError):
+			corpus.parse_mix("foo=1")
+
+if __name__ == "__main__":
+	unittest.main()
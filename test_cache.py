@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+from cache import EntryCache
+
+class TestEntryCache(unittest.TestCase):
+	def setUp(self):
+		self._dir = tempfile.TemporaryDirectory()
+		self._path = os.path.join(self._dir.name, "cache", "entries.json")
+
+	def tearDown(self):
+		self._dir.cleanup()
+
+	def test_missing(self):
+		c = EntryCache(self._path)
+		self.assertEqual(len(c), 0)
+		self.assertIsNone(c.get("foo"))
+		self.assertEqual((c.hits, c.misses), (0, 1))
+
+	def test_save(self):
+		c = EntryCache(self._path, salt="1")
+		c.put("foo", ["a", "b"])
+		c.save()
+		c = EntryCache(self._path, salt="1")
+		self.assertEqual(c.get("foo"), ["a", "b"])
+		self.assertEqual((c.hits, c.misses), (1, 0))
+
+	def test_salt(self):
+		c = EntryCache(self._path, salt="1")
+		c.put("foo", ["a"])
+		c.save()
+		self.assertEqual(len(EntryCache(self._path, salt="2")), 0)
+
+	def test_corrupt(self):
+		os.makedirs(os.path.dirname(self._path))
+		with open(self._path, "w") as f:
+			f.write("{\"salt\": ")
+		self.assertEqual(len(EntryCache(self._path)), 0)
+
+	def test_evict(self):
+		c = EntryCache(self._path, max_size=2)
+		c.put("foo", ["a"])
+		c.put("bar", ["b"])
+		c.get("foo")
+		c.put("baz", ["c"])
+		c.save()
+		c = EntryCache(self._path, max_size=2)
+		self.assertEqual(len(c), 2)
+		self.assertIsNone(c.get("bar"))
+		self.assertEqual(c.get("foo"), ["a"])
+		self.assertEqual(c.get("baz"), ["c"])
+
+	def test_prune(self):
+		dir = os.path.dirname(self._path)
+		paths = [os.path.join(dir, f"{i:032x}.json") for i in range(4)]
+		for i, p in enumerate(paths[:3]):
+			c = EntryCache(p)
+			c.put("foo", ["a" * 100])
+			c.save()
+			os.utime(p, ns=(i, i))
+		other = os.path.join(dir, "other.json")
+		with open(other, "w") as f:
+			f.write("a" * 1000)
+		# loading paths[0] makes paths[1] the least recently used
+		EntryCache(paths[0])
+		c = EntryCache(paths[3], max_dir_size=os.path.getsize(paths[0]) * 3)
+		c.put("foo", ["b"])
+		c.save()
+		self.assertEqual([os.path.exists(p) for p in paths],
+			[True, False, True, True])
+		self.assertTrue(os.path.exists(other))
+
+	def test_digest(self):
+		self.assertEqual(EntryCache.digest("a", {"b": 1}),
+			EntryCache.digest("a", {"b": 1}))
+		# placeholder order matters
+		self.assertNotEqual(EntryCache.digest({"a": {}, "b": {}}),
+			EntryCache.digest({"b": {}, "a": {}}))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import unittest
+import catalog
+from catalog import Catalog, Index, open_index, query
+from messages import ArbMessage, PoEntry
+
+_PO = r"""msgid ""
+msgstr ""
+"Plural-Forms: nplurals=4; plural=n == 0 ? 0 : n == 1 ? 1 : n == 2 ? 2 : 3;"
+
+#. Parameter 1: count
+#, c-format
+msgctxt "foo"
+msgid "%1$s item"
+msgid_plural "%1$s items"
+msgstr[0] ""
+msgstr[1] "%1$s elemento"
+msgstr[2] ""
+msgstr[3] "%1$s elementos"
+
+#, no-c-format
+msgctxt "b\"ar ★"
+msgid "bar"
+msgstr "b\"ar ★"
+
+msgctxt ""
+"multi"
+"line"
+msgid "baz"
+msgstr "baz"
+
+#~ msgctxt "old"
+#~ msgid "old"
+#~ msgstr "viejo"
+"""
+
+_ARB = r"""{
+	"@@locale": "es",
+	"foo": "{count, plural, =1{un elemento} other{{count} elementos}}",
+	"@foo": {
+		"placeholders": {
+			"count": {"example": "2"}
+		}
+	},
+	"★": "estrella ★",
+	"bar" : "bar"
+}
+"""
+
+class TestCatalog(unittest.TestCase):
+	def setUp(self):
+		self._dir = tempfile.TemporaryDirectory()
+
+	def tearDown(self):
+		self._dir.cleanup()
+
+	def _write(self, name, text):
+		path = os.path.join(self._dir.name, name)
+		with open(path, "w", encoding="utf-8") as f:
+			f.write(text)
+		return path
+
+	def test_po(self):
+		path = self._write("es.po", _PO)
+		with Catalog(path) as c:
+			self.assertEqual(set(c.index.entries), {"foo", "b\"ar ★",
+				"multiline"})
+			self.assertEqual(c.get("foo"), PoEntry("foo", "%1$s item",
+				"%1$s items", msgstr_plural=("", "%1$s elemento", "",
+					"%1$s elementos"), parameters=((1, "count"),)))
+			self.assertEqual(c.get("b\"ar ★"), PoEntry("b\"ar ★", "bar",
+				msgstr="b\"ar ★"))
+			self.assertEqual(c.get("multiline").msgstr, "baz")
+			self.assertIsNone(c.get("old"))
+			self.assertIsNone(c.get("missing"))
+			self.assertTrue(c.get_raw("b\"ar ★").startswith(b"#, no-c-format\n"))
+
+	def test_arb(self):
+		path = self._write("app_es.arb", _ARB)
+		with Catalog(path) as c:
+			self.assertEqual(c.get("foo"), ArbMessage("foo",
+				"{count, plural, =1{un elemento} other{{count} elementos}}", None,
+				("count",), ("2",)))
+			# offsets in bytes, after non-ASCII characters
+			self.assertEqual(c.get("★"), ArbMessage("★", "estrella ★"))
+			self.assertEqual(c.get("bar"), ArbMessage("bar", "bar"))
+			self.assertIsNone(c.get("missing"))
+			self.assertEqual(c.get_raw("bar"), b"\"bar\" : \"bar\"")
+			self.assertTrue(c.get_raw("foo").endswith(b"\n\t\t}\n\t}"))
+
+	def test_empty_arb(self):
+		path = self._write("app_es.arb", " { } ")
+		self.assertEqual(len(Index.build(path)), 0)
+
+	def test_saved(self):
+		path = self._write("es.po", _PO)
+		open_index(path)
+		self.assertTrue(os.path.exists(path + catalog.INDEX_SUFFIX))
+		index = Index.load(path)
+		self.assertEqual(index.entries, Index.build(path).entries)
+		with Catalog(path) as c:
+			self.assertEqual(c.get("foo").msgid, "%1$s item")
+
+	def test_no_save(self):
+		path = self._write("es.po", _PO)
+		with Catalog(path, save_index=False) as c:
+			self.assertIsNotNone(c.get("foo"))
+		self.assertFalse(os.path.exists(path + catalog.INDEX_SUFFIX))
+
+	def test_stale(self):
+		path = self._write("es.po", _PO)
+		with Catalog(path) as c:
+			self._write("es.po", "msgctxt \"new\"\nmsgid \"new\"\nmsgstr \"nuevo\"\n")
+			os.utime(path, ns=(0, 0))
+			self.assertIsNone(Index.load(path))
+			self.assertIsNone(c.get("foo"))
+			self.assertEqual(c.get("new").msgstr, "nuevo")
+		self.assertEqual(set(Index.load(path).entries), {"new"})
+
+	# changed without its mtime and size changing, caught by the key check
+	def test_stale_same_stat(self):
+		path = self._write("es.po", _PO)
+		stat = os.stat(path)
+		with Catalog(path) as c:
+			self._write("es.po", _PO.replace("msgctxt \"foo\"", "msgctxt \"oof\""))
+			os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+			self.assertIsNone(c.get("foo"))
+			self.assertEqual(c.get("oof").msgid, "%1$s item")
+
+	def test_corrupt(self):
+		path = self._write("es.po", _PO)
+		self._write("es.po" + catalog.INDEX_SUFFIX, "{\"version\": ")
+		self.assertIsNone(Index.load(path))
+		with Catalog(path) as c:
+			self.assertIsNotNone(c.get("foo"))
+
+class TestQuery(unittest.TestCase):
+	def setUp(self):
+		self._dir = tempfile.TemporaryDirectory()
+		self._po = os.path.join(self._dir.name, "es.po")
+		with open(self._po, "w", encoding="utf-8") as f:
+			f.write(_PO + "\nmsgctxt \"food\"\nmsgid \"food\"\nmsgstr \"\"\n")
+		self._arb = os.path.join(self._dir.name, "app_es.arb")
+		with open(self._arb, "w", encoding="utf-8") as f:
+			f.write(_ARB.replace("\"bar\" : \"bar\"",
+				"\"@food\": {\"description\": \"d\"}, \"food\": \"comida\""))
+
+	def tearDown(self):
+		self._dir.cleanup()
+
+	def _query(self, key, prefix=False):
+		return query([self._po, self._arb], key, prefix)
+
+	def test_key(self):
+		expected = {}
+		for path in [self._po, self._arb]:
+			with Catalog(path, save_index=False) as c:
+				expected[path] = {"foo": c.get("foo")}
+		for _ in range(2):
+			self.assertEqual(self._query("foo"), expected)
+			self.assertEqual(self._query("b\"ar ★")[self._po]["b\"ar ★"].msgstr,
+				"b\"ar ★")
+			self.assertEqual(self._query("missing"), {self._po: {}, self._arb: {}})
+			# with an index
+			open_index(self._po)
+			open_index(self._arb)
+
+	def test_prefix(self):
+		for _ in range(2):
+			product = self._query("foo", prefix=True)
+			self.assertEqual(list(product[self._po]), ["foo", "food"])
+			self.assertEqual(product[self._arb]["food"],
+				ArbMessage("food", "comida", "d"))
+			self.assertEqual(list(product[self._arb]), ["foo", "food"])
+			self.assertEqual(self._query("@", prefix=True)[self._arb], {})
+			open_index(self._po)
+			open_index(self._arb)
+
+	# attributes before their message are kept, the ones too far after it
+	# aren't waited for, as arb2po does
+	def test_arb_window(self):
+		with open(self._arb, "w") as f:
+			f.write("{\"@a\": {\"description\": \"a\"}, \"a\": \"A\", \"b\": \"B\", "
+				"\"c\": \"C\", \"@b\": {\"description\": \"b\"}}")
+		with open(self._arb, "r") as f:
+			self.assertEqual(catalog._query_arb(f, "a"),
+				{"a": ArbMessage("a", "A", "a")})
+		for window, description in [(1, None), (2, "b")]:
+			with open(self._arb, "r") as f:
+				self.assertEqual(catalog._query_arb(f, "b", window=window),
+					{"b": ArbMessage("b", "B", description)})
+
+	def test_arb_value(self):
+		product = self._query("foo", prefix=True)
+		self.assertEqual(catalog._get_arb_value(product[self._po]["foo"]),
+			"{count, plural, =1 {{count} elemento} other {{count} elementos}}")
+		self.assertIsNone(catalog._get_arb_value(product[self._po]["food"]))
+		self.assertEqual(catalog._get_arb_value(product[self._arb]["food"]),
+			"comida")
+
+	def test_empty(self):
+		path = os.path.join(self._dir.name, "empty.po")
+		open(path, "w").close()
+		self.assertEqual(query([path], "foo"), {path: {}})
+
+if __name__ == "__main__":
+	unittest.main()
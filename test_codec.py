@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+import ast
+import random
+import unittest
+import icu
+from codec import escape_po, quote_icu, unescape_po, unescape_po_string, \
+	unquote_icu
+
+# A random string of up to max_length characters of alphabet
+def _random_str(rand, alphabet, max_length=20):
+	return "".join(rand.choice(alphabet)
+		for _ in range(rand.randrange(max_length)))
+
+class TestEscapePo(unittest.TestCase):
+	def test_basic(self):
+		self.assertEqual(escape_po("a \"b\"\n\\c"), "a \\\"b\\\"\\n\\\\c")
+		self.assertEqual(escape_po("it's #1\t★"), "it's #1\t★")
+
+	def test_no_escape(self):
+		s = "".join(["fo", "o"])
+		self.assertIs(escape_po(s), s)
+
+	def test_fuzz_round_trip(self):
+		rand = random.Random(0)
+		for _ in range(2000):
+			s = _random_str(rand, "ab \\\"'\n\t\r#%${}★é")
+			escaped = escape_po(s)
+			self.assertNotIn("\n", escaped)
+			self.assertEqual(unescape_po(escaped), s)
+			self.assertEqual(unescape_po(escaped.encode()), s)
+			line = f"\"{escaped}\""
+			self.assertEqual(unescape_po_string(line), s)
+
+class TestUnescapePo(unittest.TestCase):
+	_ESCAPES = ["\\\\", "\\\"", "\\'", "\\a", "\\b", "\\f", "\\n",
+		"\\r", "\\t", "\\v", "\\0", "\\101", "\\7", "\\x41", "\\x7f"]
+
+	def test_basic(self):
+		self.assertEqual(unescape_po_string("\"bar\""), "bar")
+		self.assertEqual(unescape_po_string(" \"bar\\nbar\"\n"), "bar\nbar")
+		self.assertEqual(unescape_po("bar\\tbar"), "bar\tbar")
+
+	def test_bytes(self):
+		self.assertEqual(unescape_po_string("\"★\\n\"".encode()), "★\n")
+		# octal escapes are bytes, not code points
+		self.assertEqual(unescape_po_string(b"\"\\342\\230\\205\""), "★")
+
+	def test_c_escapes(self):
+		self.assertEqual(unescape_po_string("\"\\? \\q\""), "? \\q")
+
+	def test_invalid(self):
+		for s in ["", "\"", "bar", "\"bar", "\"bar\\\""]:
+			with self.assertRaises(ValueError):
+				unescape_po_string(s)
+		with self.assertRaises(ValueError):
+			unescape_po("bar\\")
+
+	def test_fuzz_literal_eval(self):
+		rand = random.Random(0)
+		for _ in range(2000):
+			line = "\"" + "".join(
+				rand.choice(self._ESCAPES) if rand.random() < 0.5
+					else rand.choice("ab #%{}")
+				for _ in range(rand.randrange(20))) + "\""
+			self.assertEqual(unescape_po_string(line), ast.literal_eval(line))
+			self.assertEqual(unescape_po_string(line.encode()),
+				ast.literal_eval("b" + line).decode())
+
+class TestQuoteIcu(unittest.TestCase):
+	def test_basic(self):
+		self.assertEqual(quote_icu("it's #1"), "it''s '#'1")
+		self.assertEqual(quote_icu("{n} items"), "{n} items")
+		self.assertEqual(quote_icu("#'# '#"), "'#''#' '''#'")
+
+	def test_unquote(self):
+		self.assertEqual(unquote_icu("it''s '#'1"), "it's #1")
+		self.assertEqual(unquote_icu("'{a}' '#''s' it's"), "{a} #'s it's")
+		self.assertEqual(unquote_icu("'#"), "#")
+		self.assertEqual(unquote_icu("no quote"), "no quote")
+
+	def test_fuzz_round_trip(self):
+		rand = random.Random(0)
+		for _ in range(2000):
+			s = _random_str(rand, "ab '#★")
+			self.assertEqual(unquote_icu(quote_icu(s)), s)
+
+	def test_fuzz_quote_icu_parse(self):
+		rand = random.Random(0)
+		for _ in range(2000):
+			s = _random_str(rand, "ab '#★")
+			nodes = icu.parse(f"{{n, plural, other{{{quote_icu(s)}}}}}")
+			self.assertEqual("".join(n.text for n
+				in nodes[0].options["other"].nodes), s)
+
+	# unquote_icu reads the text of a branch the same as icu.parse
+	def test_fuzz_icu_parse(self):
+		rand = random.Random(0)
+		count = 0
+		for _ in range(2000):
+			s = _random_str(rand, "ab '#{}★")
+			try:
+				nodes = icu.parse(f"{{n, plural, other{{{s}}}}}")
+			except ValueError:
+				# unbalanced brackets
+				continue
+			if len(nodes) != 1 or type(nodes[0]) is not icu.Block:
+				continue
+			branch = nodes[0].options["other"]
+			if not all(type(n) in (icu.Literal, icu.Quoted, icu.Pound)
+					for n in branch.nodes):
+				continue
+			self.assertEqual(unquote_icu(branch.raw), "".join(
+				"#" if type(n) is icu.Pound else n.text for n in branch.nodes),
+				s)
+			count += 1
+		self.assertGreater(count, 200)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import io
+import json
+import os
+import tempfile
+import threading
+import unittest
+import daemon
+from arb2po import arb2po
+from daemon import CatalogCache, Server
+from po2arb import po2arb
+
+class TestCatalogCache(unittest.TestCase):
+	def setUp(self):
+		self._dir = tempfile.TemporaryDirectory()
+		self._loads = []
+
+	def tearDown(self):
+		self._dir.cleanup()
+
+	def _write(self, name, text):
+		path = os.path.join(self._dir.name, name)
+		with open(path, "w") as f:
+			f.write(text)
+		return path
+
+	def _load(self, path):
+		self._loads.append(path)
+		with open(path, "r") as f:
+			return f.read().split()
+
+	def test_hit(self):
+		c = CatalogCache()
+		path = self._write("a", "1 2")
+		self.assertEqual(c.get("k", path, self._load), ["1", "2"])
+		self.assertEqual(c.get("k", path, self._load), ["1", "2"])
+		self.assertEqual(self._loads, [path])
+		self.assertEqual((c.hits, c.misses), (1, 1))
+
+	def test_kind(self):
+		c = CatalogCache()
+		path = self._write("a", "1 2")
+		c.get("k", path, self._load)
+		c.get("l", path, self._load)
+		self.assertEqual(len(c), 2)
+
+	def test_changed(self):
+		c = CatalogCache()
+		path = self._write("a", "1 2")
+		c.get("k", path, self._load)
+		self._write("a", "1 2 3")
+		self.assertEqual(c.get("k", path, self._load), ["1", "2", "3"])
+		self.assertEqual(len(c), 1)
+
+	def test_evict(self):
+		c = CatalogCache(max_entries=3)
+		a = self._write("a", "1 2")
+		b = self._write("b", "1 2")
+		c.get("k", a, self._load)
+		c.get("k", b, self._load)
+		self.assertEqual(len(c), 1)
+		c.get("k", b, self._load)
+		self.assertEqual(self._loads, [a, b])
+
+class TestServer(unittest.TestCase):
+	def setUp(self):
+		self._dir = tempfile.TemporaryDirectory()
+		self._src = os.path.join(self._dir.name, "app_en.arb")
+		with open(self._src, "w") as f:
+			f.write(
+r"""
+{
+	"foo": "{param} bar",
+	"@foo": {
+		"placeholders": {
+			"param": {}
+		}
+	},
+	"bar": "{n, plural, =1{one} other{many}}",
+	"@bar": {
+		"placeholders": {
+			"n": {}
+		}
+	}
+}
+""")
+		self._es = os.path.join(self._dir.name, "app_es.arb")
+		with open(self._es, "w") as f:
+			f.write(
+r"""
+{
+	"foo": "{param} baz"
+}
+""")
+		self._po = os.path.join(self._dir.name, "es.po")
+		with open(self._po, "w") as f:
+			f.write(arb2po(self._src, self._es))
+
+	def tearDown(self):
+		self._dir.cleanup()
+
+	def test_arb2po(self):
+		server = Server()
+		for _ in range(2):
+			response = server.handle({"id": 1, "op": "arb2po",
+				"src": self._src, "translated": self._es})
+			self.assertEqual(response, {"id": 1, "ok": True,
+				"text": arb2po(self._src, self._es) + "\n"})
+		self.assertEqual(server.catalogs.hits, 2)
+
+	def test_arb2po_output(self):
+		output = os.path.join(self._dir.name, "es.po.out")
+		for buffer_size in [None, 1, 8192]:
+			response = Server().handle({"op": "arb2po", "src": self._src,
+				"translated": self._es, "output": output,
+				"buffer_size": buffer_size})
+			self.assertEqual(response, {"id": None, "ok": True})
+			with open(output, "r") as f:
+				self.assertEqual(f.read(), arb2po(self._src, self._es) + "\n")
+
+	def test_po2arb_output(self):
+		output = os.path.join(self._dir.name, "app_es.arb.out")
+		response = Server().handle({"op": "po2arb", "po": self._po,
+			"output": output})
+		self.assertEqual(response, {"id": None, "ok": True})
+		with open(output, "r") as f:
+			self.assertEqual(f.read(), po2arb(self._po) + "\n")
+
+	def test_error(self):
+		server = Server()
+		response = server.handle({"id": 1, "op": "po2arb",
+			"po": os.path.join(self._dir.name, "missing.po")})
+		self.assertFalse(response["ok"])
+		self.assertIn("FileNotFoundError", response["error"])
+		self.assertFalse(server.handle({"op": "foo"})["ok"])
+
+	def test_serve(self):
+		rfile = io.BytesIO(b"{\"id\": 1, \"op\": \"ping\"}\n\n[]\nfoo\n")
+		wfile = io.BytesIO()
+		Server().serve(rfile, wfile)
+		responses = [json.loads(l) for l in wfile.getvalue().splitlines()]
+		self.assertEqual(responses[0], {"id": 1, "ok": True})
+		self.assertEqual(len(responses), 3)
+		self.assertFalse(responses[1]["ok"])
+		self.assertFalse(responses[2]["ok"])
+
+	def test_socket(self):
+		path = os.path.join(self._dir.name, "daemon.sock")
+		with daemon._UnixServer(path, Server()) as unix_server:
+			thread = threading.Thread(target=unix_server.serve_forever)
+			thread.start()
+			try:
+				response = daemon.call(path, {"id": "a", "op": "po2arb",
+					"po": self._po})
+			finally:
+				unix_server.shutdown()
+				thread.join()
+		self.assertEqual(response, {"id": "a", "ok": True,
+			"text": po2arb(self._po) + "\n"})
+
+	def test_call_unreachable(self):
+		with self.assertRaises(OSError):
+			daemon.call(os.path.join(self._dir.name, "missing.sock"),
+				{"op": "ping"})
+
+if __name__ == "__main__":
+	unittest.main()
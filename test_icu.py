@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+import unittest
+import random
+from icu import parse, get_plural, get_simple_plural, find_placeholders, \
+	iter_placeholders, \
+	Block, Branch, Literal, Placeholder, Pound, Quoted
+
+class TestIcu(unittest.TestCase):
+	def test_empty(self):
+		self.assertEqual(parse(""), [])
+
+	def test_literal(self):
+		self.assertEqual(parse("foo bar"), [Literal("foo bar")])
+
+	def test_placeholder(self):
+		self.assertEqual(parse("{param} bar"),
+			[Placeholder("param"), Literal(" bar")])
+
+	def test_placeholder_space(self):
+		self.assertEqual(parse("{ param }"), [Placeholder("param")])
+
+	def test_top_level_apostrophe_sharp(self):
+		# not special outside of a plural block
+		self.assertEqual(parse("'{param}' #"),
+			[Literal("'"), Placeholder("param"), Literal("' #")])
+
+	def test_top_level_unbalanced(self):
+		self.assertEqual(parse("{ bar } {param"),
+			[Placeholder("bar"), Literal(" {param")])
+
+	def test_top_level_stray_bracket(self):
+		self.assertEqual(parse("a } b {}"), [Literal("a } b {}")])
+
+	def test_formatted_argument(self):
+		self.assertEqual(parse("{n, number} bar"),
+			[Literal("{n, number}"), Literal(" bar")])
+
+	def test_plural(self):
+		self.assertEqual(parse("{n, plural, =1{one} other{# many}}"), [
+			Block("n", "plural", {
+				"=1": Branch([Literal("one")]),
+				"other": Branch([Pound(), Literal(" many")]),
+			})
+		])
+
+	def test_plural_no_space(self):
+		self.assertEqual(parse("{n,plural,=1{one}other{many}}"), [
+			Block("n", "plural", {
+				"=1": Branch([Literal("one")]),
+				"other": Branch([Literal("many")]),
+			})
+		])
+
+	def test_plural_offset(self):
+		self.assertEqual(parse("{n, plural, offset:1 other{many}}"), [
+			Block("n", "plural", {"other": Branch([Literal("many")])})
+		])
+
+	def test_plural_raw(self):
+		block = parse("{n, plural, =0{ none {n} } other{many}}")[0]
+		self.assertEqual(block.options["=0"].raw, " none {n} ")
+
+	def test_plural_comma(self):
+		self.assertEqual(parse("{n, plural, other{a, b}}"), [
+			Block("n", "plural", {"other": Branch([Literal("a, b")])})
+		])
+
+	def test_plural_placeholder(self):
+		self.assertEqual(parse("{n, plural, other{{n} {other}}}"), [
+			Block("n", "plural", {
+				"other": Branch([Placeholder("n"), Literal(" "),
+					Placeholder("other")]),
+			})
+		])
+
+	def test_quoted_sharp(self):
+		self.assertEqual(parse("{n, plural, other{'#' #}}"), [
+			Block("n", "plural", {
+				"other": Branch([Quoted("#"), Literal(" "), Pound()]),
+			})
+		])
+
+	def test_quoted_bracket(self):
+		self.assertEqual(parse("{n, plural, other{'{n}' {n}}}"), [
+			Block("n", "plural", {
+				"other": Branch([Quoted("{n}"), Literal(" "),
+					Placeholder("n")]),
+			})
+		])
+
+	def test_quoted_escaped_apostrophe(self):
+		self.assertEqual(parse("{n, plural, other{'{it''s}'}}"), [
+			Block("n", "plural", {"other": Branch([Quoted("{it's}")])})
+		])
+
+	def test_escaped_apostrophe(self):
+		self.assertEqual(parse("{n, plural, other{'' #}}"), [
+			Block("n", "plural", {
+				"other": Branch([Literal("' "), Pound()]),
+			})
+		])
+
+	def test_literal_apostrophe(self):
+		self.assertEqual(parse("{n, plural, other{don't}}"), [
+			Block("n", "plural", {"other": Branch([Literal("don't")])})
+		])
+
+	# a quote opened before the closing bracket of a branch would swallow the
+	# next ones, the apostrophe is literal instead
+	def test_apostrophe_before_close(self):
+		self.assertEqual(parse("{n, plural, one{the user'} other{the users'}}"), [
+			Block("n", "plural", {
+				"one": Branch([Literal("the user'")]),
+				"other": Branch([Literal("the users'")]),
+			})
+		])
+		self.assertEqual(parse("{n, plural, one{user'} other{users}}"), [
+			Block("n", "plural", {
+				"one": Branch([Literal("user'")]),
+				"other": Branch([Literal("users")]),
+			})
+		])
+		# still a quoted bracket when the block is whole with it
+		self.assertEqual(parse("{n, plural, other{a'}'}}"), [
+			Block("n", "plural", {"other": Branch([Literal("a"), Quoted("}")])})
+		])
+
+	def test_select_sharp(self):
+		self.assertEqual(parse("{g, select, other{#}}"), [
+			Block("g", "select", {"other": Branch([Literal("#")])})
+		])
+
+	def test_nested(self):
+		self.assertEqual(
+			parse("{n, plural, other{{g, select, male{# he} other{#}}}}"), [
+				Block("n", "plural", {
+					"other": Branch([
+						Block("g", "select", {
+							"male": Branch([Pound(), Literal(" he")]),
+							"other": Branch([Pound()]),
+						}),
+					]),
+				})
+			])
+
+	def test_unbalanced(self):
+		# kept as text at the top level
+		self.assertEqual(parse("{n, plural, other{many}"),
+			[Literal("{n, plural, other"), Placeholder("many")])
+
+	def test_iter_placeholders(self):
+		s = "{a} { b } {g, select, x{'{c}' {d}} other{{e, plural, other{{f}}}}}"
+		self.assertEqual([(p.name, s[p.span[0]:p.span[1]])
+			for p in iter_placeholders(parse(s))],
+			[("a", "{a}"), ("b", "{ b }"), ("d", "{d}"), ("f", "{f}")])
+
+	def test_find_placeholders(self):
+		rng = random.Random(0)
+		for s in ["", "{a} '{b}' { c } {d", "a {b,c} {} {b {c}}",
+				"{n, plural, other{'{a}' {b}}} {c}"] + [
+				"".join(rng.choice(["{", "}", "a", "b", " ", ",", "'", "#",
+					"plural", "select", "other"]) for _ in range(rng.randrange(20)))
+				for _ in range(2000)]:
+			self.assertEqual(list(find_placeholders(s)),
+				[(p.name, p.span) for p in iter_placeholders(parse(s))], s)
+
+	def test_get_plural(self):
+		nodes = parse("{n, plural, other{many}}")
+		self.assertIs(get_plural(nodes), nodes[0])
+
+	def test_get_plural_inline(self):
+		self.assertIsNone(get_plural(parse("a {n, plural, other{many}}")))
+
+	def test_get_plural_select(self):
+		self.assertIsNone(get_plural(parse("{g, select, other{many}}")))
+
+	def test_get_simple_plural(self):
+		self.assertEqual(get_simple_plural(
+			"{ n ,plural, =1 {one {n}} other{it''s #}}"),
+			{"=1": "one {n}", "other": "it''s #"})
+		for s in ["{n, plural, other{'#'}}", "{n, plural, other{the users'}}",
+				"{n, plural, offset:1 other{#}}", "{n, select, other{a}}",
+				"{n, plural, other{{m, plural, other{a}}}}", "a {n, plural, other{a}}"]:
+			self.assertIsNone(get_simple_plural(s), s)
+
+	def test_get_simple_plural_parse(self):
+		rng = random.Random(0)
+		def sub():
+			return "".join(rng.choice(["a", " ", "'", "''", "#", "{n}",
+				"{ x }", "{", "}"]) for _ in range(rng.randrange(6)))
+		for s in ["{n, plural, one{a '' b's} other{# {n} {x}}}"] + [
+				"{n, plural, " + "".join(f"{rng.choice(['one', 'other'])}{{{sub()}}}"
+					for _ in range(rng.randrange(3))) + "}"
+				for _ in range(5000)]:
+			branches = get_simple_plural(s)
+			if branches is not None:
+				self.assertEqual(branches, {k: b.raw
+					for k, b in get_plural(parse(s)).options.items()}, s)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import io
+import json
+import os
+import tempfile
+import unittest
+import arb2po
+import jsonbackend
+import po2arb
+
+_VALUES = [
+	"",
+	"foo",
+	"\"quoted\" \\ back/slash",
+	"control \x00\x01\x1f\x7f \b\f\n\r\t",
+	"unicode ★ é 中文    \U0001f600",
+	{},
+	{"placeholders": {"a": {}, "b": {}}},
+	{"nested": {"deeper": {"deepest": "★"}}},
+]
+
+class TestJsonBackend(unittest.TestCase):
+	def setUp(self):
+		self._name = jsonbackend._name
+
+	def tearDown(self):
+		jsonbackend._name = self._name
+
+	def test_available(self):
+		names = jsonbackend.available()
+		self.assertEqual(names[0], "json")
+		self.assertTrue(set(names) <= set(jsonbackend.NAMES))
+
+	def test_encoder(self):
+		for name in jsonbackend.available():
+			jsonbackend.use(name)
+			for indent in (2, None, 4, "\t"):
+				encode = jsonbackend.get().encoder(indent)
+				for value in _VALUES:
+					self.assertEqual(encode(value), json.dumps(value,
+						indent=indent, ensure_ascii=False), (name, indent, value))
+
+	def test_encoder_fallback(self):
+		for name in jsonbackend.available():
+			jsonbackend.use(name)
+			encode = jsonbackend.get().encoder()
+			for value in (1e16, 1.5e-7, 2 ** 70, [1, "a"], None, True,
+					"\ud800", {1: "a"}):
+				self.assertEqual(encode(value), json.dumps(value, indent=2,
+					ensure_ascii=False), (name, value))
+
+	def test_loads(self):
+		text = json.dumps({str(i): v for i, v in enumerate(_VALUES)},
+			ensure_ascii=False)
+		for name in jsonbackend.available():
+			jsonbackend.use(name)
+			loads = jsonbackend.get().loads
+			if loads is not None:
+				self.assertEqual(loads(text), json.loads(text))
+				self.assertEqual(loads(text.encode()), json.loads(text))
+
+	def test_use_unknown(self):
+		with self.assertRaises(ValueError):
+			jsonbackend.use("foo")
+
+	def test_auto(self):
+		jsonbackend.use("auto")
+		fastest = jsonbackend.available()[1:2] or ["json"]
+		self.assertEqual(jsonbackend.get().name, fastest[0])
+		self.assertEqual(jsonbackend.get(jsonbackend.AUTO_MIN_SIZE).name,
+			fastest[0])
+		self.assertEqual(jsonbackend.get(jsonbackend.AUTO_MIN_SIZE - 1).name,
+			"json")
+		# ARB files are still read incrementally
+		self.assertEqual(jsonbackend.get_reader().name, "json")
+		self.assertIsNone(jsonbackend.get_reader().loads)
+
+	def test_use(self):
+		jsonbackend.use("json")
+		self.assertEqual(jsonbackend.get().name, "json")
+		self.assertEqual(jsonbackend.get(jsonbackend.AUTO_MIN_SIZE).name, "json")
+		for name in jsonbackend.available():
+			jsonbackend.use(name)
+			self.assertEqual(jsonbackend.get_reader().name, name)
+
+	def test_env(self):
+		jsonbackend._name = None
+		os.environ[jsonbackend.ENV_VAR] = "json"
+		try:
+			self.assertEqual(jsonbackend.get(jsonbackend.AUTO_MIN_SIZE).name,
+				"json")
+		finally:
+			del os.environ[jsonbackend.ENV_VAR]
+
+	def test_iter_arb(self):
+		d = tempfile.TemporaryDirectory()
+		path = os.path.join(d.name, "app_en.arb")
+		with open(path, "w") as f:
+			f.write("""{
+				"@@locale": "en",
+				"foo": "{a} ★",
+				"@foo": {"placeholders": {"a": {"example": 1.5}}},
+				"bar": "\\"bar\\""
+			}""")
+		expected = [
+			("foo", "{a} ★", {"placeholders": {"a": {"example": 1.5}}}),
+			("bar", "\"bar\"", None),
+		]
+		for name in jsonbackend.available():
+			jsonbackend.use(name)
+			self.assertEqual(list(arb2po._iter_arb(path)), expected, name)
+			for text in ("[]", "{\"foo\": "):
+				with self.assertRaises(ValueError):
+					list(arb2po._iter_arb_file(io.StringIO(text),
+						backend=jsonbackend.get()))
+		d.cleanup()
+
+	def test_po2arb_write(self):
+		d = tempfile.TemporaryDirectory()
+		path = os.path.join(d.name, "es.po")
+		with open(path, "w") as f:
+			f.write(
+r"""#. Parameter 1: param1
+#, c-format
+msgctxt "foo"
+msgid "%1$s foo"
+msgstr "%1$s ★ \"bar\" \\ \t"
+
+msgctxt "baz"
+msgid "baz"
+msgstr "qux\n"
+""")
+		outputs = []
+		for name in jsonbackend.available():
+			jsonbackend.use(name)
+			out = io.StringIO()
+			po2arb.po2arb_write(path, out)
+			outputs.append(out.getvalue())
+			self.assertEqual(po2arb.po2arb(path) + "\n", out.getvalue())
+		self.assertEqual(len(set(outputs)), 1)
+		self.assertEqual(json.loads(outputs[0])["foo"],
+			"{param1} ★ \"bar\" \\ \t")
+		d.cleanup()
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import unittest
+from messages import ArbMessage, PoEntry
+
+class TestArbMessage(unittest.TestCase):
+	def test_no_attributes(self):
+		m = ArbMessage.from_arb("foo", "bar", None)
+		self.assertEqual(m.key, "foo")
+		self.assertEqual(m.value, "bar")
+		self.assertIsNone(m.description)
+		self.assertEqual(m.placeholders, ())
+		self.assertIsNone(m.examples)
+
+	def test_attributes(self):
+		m = ArbMessage.from_arb("foo", "{a} {b}", {
+			"description": "Foo",
+			"placeholders": {
+				"a": {"example": 1},
+				"b": {},
+			},
+		})
+		self.assertEqual(m.description, "Foo")
+		self.assertEqual(m.placeholders, ("a", "b"))
+		self.assertEqual(m.examples, ("1", None))
+
+	def test_no_examples(self):
+		m = ArbMessage.from_arb("foo", "{a}", {"placeholders": {"a": {}}})
+		self.assertEqual(m.placeholders, ("a",))
+		self.assertIsNone(m.examples)
+
+	def test_invalid_attributes(self):
+		self.assertEqual(ArbMessage.from_arb("foo", "bar", "baz"),
+			ArbMessage("foo", "bar"))
+		self.assertEqual(ArbMessage.from_arb("foo", "bar",
+			{"placeholders": []}), ArbMessage("foo", "bar"))
+
+	def test_interned(self):
+		a = ArbMessage.from_arb("".join(["fo", "o"]), "",
+			{"placeholders": {"".join(["pa", "ram"]): {}}})
+		b = ArbMessage.from_arb("".join(["f", "oo"]), "",
+			{"placeholders": {"".join(["par", "am"]): {}}})
+		self.assertIs(a.key, b.key)
+		self.assertIs(a.placeholders[0], b.placeholders[0])
+
+	def test_eq(self):
+		attributes = {"placeholders": {"a": {}}}
+		self.assertEqual(ArbMessage.from_arb("foo", "{a}", attributes),
+			ArbMessage.from_arb("foo", "{a}", attributes))
+		self.assertNotEqual(ArbMessage.from_arb("foo", "{a}", attributes),
+			ArbMessage.from_arb("foo", "{a}", None))
+		self.assertNotEqual(ArbMessage("foo", "bar"), ArbMessage("foo", "baz"))
+
+	def test_slots(self):
+		with self.assertRaises(AttributeError):
+			ArbMessage("foo", "bar").attributes = {}
+
+class TestPoEntry(unittest.TestCase):
+	def test_get_plural(self):
+		e = PoEntry("foo", "foo", "foos", msgstr_plural=("a", "b"))
+		self.assertEqual(e.get_plural(1), "b")
+		self.assertEqual(e.get_plural(3), "")
+		self.assertEqual(PoEntry("foo", "foo").get_plural(0), "")
+
+	def test_eq(self):
+		self.assertEqual(PoEntry("foo", "foo", msgstr="bar",
+			parameters=((1, "a"),)), PoEntry("foo", "foo", msgstr="bar",
+			parameters=((1, "a"),)))
+		self.assertNotEqual(PoEntry("foo", "foo", msgstr="bar"),
+			PoEntry("foo", "foo", msgstr="baz"))
+		self.assertNotEqual(PoEntry("foo", "foo", msgstr_plural=("a",)),
+			PoEntry("foo", "foo", msgstr_plural=("b",)))
+
+	def test_interned(self):
+		a = PoEntry("".join(["fo", "o"]))
+		b = PoEntry("".join(["f", "oo"]))
+		self.assertIs(a.msgctxt, b.msgctxt)
+
+if __name__ == "__main__":
+	unittest.main()
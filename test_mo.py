@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import gettext
+import io
+import struct
+import unittest
+import mo
+
+_ENTRIES = [
+	(None, "", None, ("Content-Type: text/plain; charset=UTF-8\n"
+		"Plural-Forms: nplurals=2; plural=n != 1;\n",)),
+	("foo", "foo", None, ("bar ★",)),
+	(None, "foo", None, ("no context",)),
+	("baz", "%1$s item", "%1$s items", ("%1$s elemento", "%1$s elementos")),
+	("empty", "a\nb", None, ("",)),
+]
+
+# Return the MO file of some entries
+def _write(entries):
+	out = io.BytesIO()
+	mo.write(entries, out)
+	return out.getvalue()
+
+class TestMo(unittest.TestCase):
+	# computed by gettext's hash-string.c
+	def test_hash_string(self):
+		for s, expected in [(b"", 0), (b"a", 97), (b"hello", 7258927),
+				("greeting\x04Hello, world".encode(), 224457412),
+				("★ unicode é".encode(), 170768105),
+				(b"z" * 40 + b"~" * 27, 89484782),
+				# carries into bit 32
+				(b"\xf0\xf0\xf0\xf0\xf0\xff~~\xef\xef", 486879)]:
+			self.assertEqual(mo.hash_string(s), expected)
+
+	def test_round_trip(self):
+		catalog = mo.MoFile(_write(_ENTRIES))
+		self.assertEqual(len(catalog), len(_ENTRIES))
+		# in the order they were written in, not sorted
+		self.assertEqual(list(catalog), _ENTRIES)
+
+	def test_get(self):
+		catalog = mo.MoFile(_write(_ENTRIES))
+		for msgctxt, msgid, _, msgstrs in _ENTRIES:
+			self.assertEqual(catalog.get(msgid, msgctxt), msgstrs)
+		self.assertIsNone(catalog.get("foo", "bar"))
+		self.assertIsNone(catalog.get("%1$s items", "baz"))
+		self.assertEqual(catalog.header(), {
+			"Content-Type": "text/plain; charset=UTF-8",
+			"Plural-Forms": "nplurals=2; plural=n != 1;",
+		})
+
+	def test_get_many(self):
+		entries = [(f"key{i}", f"message {i}", None, (f"mensaje {i}",))
+			for i in range(2000)]
+		data = _write(entries)
+		self.assertEqual(struct.unpack_from("<I", data, 20)[0], 2671)
+		catalog = mo.MoFile(data)
+		for msgctxt, msgid, _, msgstrs in entries:
+			self.assertEqual(catalog.get(msgid, msgctxt), msgstrs)
+		self.assertIsNone(catalog.get("message 1", "key2"))
+
+	def test_no_hash_table(self):
+		data = bytearray(_write(_ENTRIES))
+		struct.pack_into("<I", data, 20, 0)
+		catalog = mo.MoFile(bytes(data))
+		self.assertEqual(catalog.get("foo", "foo"), ("bar ★",))
+		self.assertIsNone(catalog.get("bar"))
+
+	def test_big_endian(self):
+		data = _write(_ENTRIES)
+		count, hash_size = struct.unpack_from("<I8xI", data, 8)
+		size = (28 + count * 16 + hash_size * 4) // 4
+		data = struct.pack(f">{size}I", *struct.unpack_from(f"<{size}I", data)) \
+			+ data[size * 4:]
+		catalog = mo.MoFile(data)
+		self.assertEqual(list(catalog), _ENTRIES)
+		self.assertEqual(catalog.get("foo"), ("no context",))
+
+	def test_gettext(self):
+		t = gettext.GNUTranslations(io.BytesIO(_write(_ENTRIES)))
+		self.assertEqual(t.pgettext("foo", "foo"), "bar ★")
+		self.assertEqual(t.gettext("foo"), "no context")
+		self.assertEqual(t.npgettext("baz", "%1$s item", "%1$s items", 1),
+			"%1$s elemento")
+		self.assertEqual(t.npgettext("baz", "%1$s item", "%1$s items", 5),
+			"%1$s elementos")
+
+	def test_duplicate(self):
+		with self.assertRaises(ValueError):
+			_write(_ENTRIES + [("foo", "foo", None, ("baz",))])
+
+	def test_invalid(self):
+		for data in [b"", b"not a mo file", _write(_ENTRIES)[:40]]:
+			with self.assertRaises(ValueError):
+				mo.MoFile(data)
+		self.assertFalse(mo.is_mo(b"msgid \"\""))
+
+if __name__ == "__main__":
+	unittest.main()
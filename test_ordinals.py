@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import unittest
+from ordinals import Table
+
+class TestTable(unittest.TestCase):
+	def test_from_names(self):
+		t = Table.from_names(("a", "b"))
+		self.assertEqual(t.pairs, ((1, "a"), (2, "b")))
+		self.assertEqual(t.names, ("a", "b"))
+		self.assertEqual(t.tokens, {"a": "%1$s", "b": "%2$s"})
+		self.assertEqual(len(t), 2)
+		self.assertFalse(Table.from_names(()))
+
+	def test_to_names(self):
+		t = Table(((1, "a"), (2, "b")))
+		self.assertEqual(t.to_names("%2$s %1$s %2$s"), "{b} {a} {b}")
+		self.assertEqual(t.to_names("100% %1$s%%2$s"), "100% {a}%{b}")
+		self.assertEqual(t.to_names("no token"), "no token")
+
+	def test_to_names_unknown(self):
+		t = Table(((1, "a"),))
+		self.assertEqual(t.to_names("%3$s %01$s %1$d %s %1$s"),
+			"%3$s %01$s %1$d %s {a}")
+		self.assertEqual(Table(()).to_names("%1$s"), "%1$s")
+
+	def test_to_names_many(self):
+		t = Table.from_names(tuple(f"p{i}" for i in range(12)))
+		self.assertEqual(t.to_names("%12$s %1$s %13$s %10$s%1$s"),
+			"{p11} {p0} %13$s {p9}{p0}")
+		self.assertEqual(t.to_names("%2$s"), "{p1}")
+		self.assertEqual(t.to_names("100%"), "100%")
+
+	def test_to_names_one_pass(self):
+		# a name looking like a token isn't replaced again
+		t = Table(((1, "%2$s"), (2, "b")))
+		self.assertEqual(t.to_names("%1$s %2$s"), "{%2$s} {b}")
+
+	def test_repeated(self):
+		t = Table(((1, "a"), (1, "b"), (2, "a")))
+		self.assertEqual(t.to_names("%1$s"), "{a}")
+		self.assertEqual(t.tokens, {"a": "%1$s", "b": "%1$s"})
+
+if __name__ == "__main__":
+	unittest.main()
@@ -1,7 +1,17 @@
 #!/usr/bin/env python3
+import io
+import json
+import os
 import tempfile
 import unittest
-from po2arb import po2arb
+from batch import BatchError
+import codec
+import mo
+import po2arb as _po2arb_module
+from messages import PoEntry
+from po2arb import po2arb, po2arb_batch, po2arb_timed, po2arb_write, \
+	_parse_po, _write_json_object, _Po2ArbSession
+from timings import Timings
 
 class TestPo2Arb(unittest.TestCase):
 	def test_empty(self):
@@ -315,6 +325,26 @@ r"""
 }
 """.strip())
 
+	def test_plural_escape_sharp_apostrophe(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+#. Parameter 1: param
+#, c-format
+msgctxt "foo"
+msgid "singular"
+msgid_plural "plural"
+msgstr[0] ""
+msgstr[1] ""
+msgstr[2] ""
+msgstr[3] "#'# %1$s'"
+""")
+		f.flush()
+		out = po2arb(f.name)
+		f.close()
+		self.assertEqual(json.loads(out)["foo"],
+			"{param, plural, other {'#''#' {param}''}}")
+
 	def test_translated_plural_basic_zero(self):
 		f = tempfile.NamedTemporaryFile(mode="w+")
 		f.write(
@@ -421,5 +451,344 @@ r"""
 }
 """.strip())
 
+	def test_escape(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+#, no-c-format
+msgctxt "foo"
+msgid "untranslated"
+msgstr "\"bar\" \\ \t\101\x42"
+"\n"
+""")
+		f.flush()
+		out = po2arb(f.name)
+		f.close()
+		self.assertEqual(out.strip(),
+r"""
+{
+  "foo": "\"bar\" \\ \tAB\n"
+}
+""".strip())
+
+	def test_batch(self):
+		d = tempfile.TemporaryDirectory()
+		files = []
+		for locale in ["de", "es", "zh_Hant"]:
+			files.append(os.path.join(d.name, f"{locale}.po"))
+			with open(files[-1], "w") as f:
+				f.write(f"msgctxt \"foo\"\nmsgid \"bar\"\nmsgstr \"{locale}\"\n")
+		broken = os.path.join(d.name, "xx.po")
+		with open(broken, "w") as f:
+			f.write("msgctxt \"foo\"\nmsgid \"bar\"\nmsgstr \"xx\n")
+		with self.assertRaises(BatchError) as cm:
+			po2arb_batch(files + [broken], d.name, jobs=2)
+		self.assertEqual([p for p, _ in cm.exception.errors], [broken])
+		for locale, po in zip(["de", "es", "zh_Hant"], files):
+			with open(os.path.join(d.name, f"app_{locale}.arb"), "r") as f:
+				self.assertEqual(f.read(), po2arb(po) + "\n")
+		d.cleanup()
+
+	def test_session(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+msgid ""
+msgstr ""
+
+msgctxt "foo"
+msgid "foo"
+msgstr "bar"
+
+#. Parameter 1: param
+msgctxt "bar"
+msgid "%1$s bar"
+msgstr "%1$s baz"
+""")
+		f.flush()
+		session = _Po2ArbSession(f.name)
+		self.assertEqual(len(session), 3)
+		self.assertEqual(json.dumps(session.arb(), indent=2,
+			ensure_ascii=False), po2arb(f.name))
+
+		f.seek(0)
+		f.truncate()
+		f.write(
+r"""
+msgctxt "baz"
+msgid "baz"
+msgstr "qux"
+
+msgctxt "foo"
+msgid "foo"
+msgstr "bar"
+
+#. Parameter 1: param
+msgctxt "bar"
+msgid "%1$s bar"
+msgstr "%1$s bar"
+""")
+		f.flush()
+		self.assertEqual(session.update(), 2)
+		self.assertEqual(json.dumps(session.arb(), indent=2,
+			ensure_ascii=False), po2arb(f.name))
+		f.close()
+
+	def test_parse_po(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+msgid ""
+msgstr ""
+"Plural-Forms: nplurals=4;\n"
+
+#. Parameter 1: count
+#. Parameter 2: name
+#, c-format
+msgctxt "foo"
+msgid "one %2$s"
+msgid_plural "%1$s %2$s"
+msgstr[0] ""
+msgstr[1] "one"
+"line"
+msgstr[3] "%1$s %2$s"
+
+msgctxt "bar"
+msgid "bar"
+msgstr "baz"
+""")
+		f.flush()
+		self.assertEqual(_parse_po(f.name), [
+			PoEntry(msgstr="Plural-Forms: nplurals=4;\n"),
+			PoEntry("foo", "one %2$s", "%1$s %2$s",
+				msgstr_plural=("", "oneline", "", "%1$s %2$s"),
+				parameters=((1, "count"), (2, "name"))),
+			PoEntry("bar", "bar", msgstr="baz"),
+		])
+		f.close()
+
+	def test_parse_mo(self):
+		f = tempfile.NamedTemporaryFile(mode="w+b")
+		mo.write([
+			(None, "", None, ("Plural-Forms: nplurals=4;\n"
+				"X-ARB-Placeholders: {\"foo\": [\"count\", \"name\"]}\n",)),
+			("foo", "one %2$s", "%1$s %2$s", ("", "one", "", "%1$s %2$s")),
+			("bar", "bar", None, ("baz",)),
+		], f)
+		f.flush()
+		entries = _parse_po(f.name)
+		self.assertEqual(entries[1:], [
+			PoEntry("foo", "one %2$s", "%1$s %2$s",
+				msgstr_plural=("", "one", "", "%1$s %2$s"),
+				parameters=((1, "count"), (2, "name"))),
+			PoEntry("bar", "bar", msgstr="baz"),
+		])
+		self.assertEqual(json.loads(po2arb(f.name)), {
+			"foo": "{count, plural, =1 {one} other {{count} {name}}}",
+			"@foo": {"placeholders": {"count": {}, "name": {}}},
+			"bar": "baz",
+		})
+		f.close()
+
+	def test_parse_po_bytes(self):
+		f = tempfile.NamedTemporaryFile(mode="w+b")
+		f.write(
+b"""#: \xff not UTF-8\r
+#. Parameter 1: n\r
+msgctxt "foo"\r
+msgid "foo"\r
+msgid_plural "foos"\r
+msgstr[0] ""\r
+msgstr[10] "ten"\r
+"\\"s\"\r
+#~ msgctxt "bar"\r
+#~ msgid "bar"\r
+#~ msgstr "bar"\r
+""")
+		f.flush()
+		self.assertEqual(_parse_po(f.name), [
+			PoEntry("foo", "foo", "foos",
+				msgstr_plural=("",) + ("",) * 9 + ("ten\"s",),
+				parameters=((1, "n"),)),
+		])
+		f.close()
+
+	def test_fuzzy(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+#, fuzzy, c-format
+msgctxt "foo"
+msgid "foo"
+msgstr "bar"
+
+#, c-format,fuzzy
+msgctxt "baz"
+msgid "baz"
+msgstr "qux"
+
+#, no-c-format
+msgctxt "quux"
+msgid "quux"
+msgstr "corge"
+""")
+		f.flush()
+		self.assertEqual([e.is_fuzzy for e in _parse_po(f.name)],
+			[True, True, False])
+		self.assertEqual(json.loads(po2arb(f.name)), {"quux": "corge"})
+		out = io.StringIO()
+		po2arb_write(f.name, out)
+		self.assertEqual(json.loads(out.getvalue()), {"quux": "corge"})
+		f.close()
+
+	def test_parse_po_mapped(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write("msgctxt \"foo\"\nmsgid \"foo\"\nmsgstr \"bar\"\n")
+		f.flush()
+		min_size = _po2arb_module._MMAP_MIN_SIZE
+		_po2arb_module._MMAP_MIN_SIZE = 0
+		try:
+			self.assertEqual(_parse_po(f.name),
+				[PoEntry("foo", "foo", msgstr="bar")])
+		finally:
+			_po2arb_module._MMAP_MIN_SIZE = min_size
+		f.close()
+
+	def test_mo_magics(self):
+		self.assertEqual(set(_po2arb_module._MO_MAGICS),
+			{mo.MAGIC.to_bytes(4, "little"), mo.MAGIC.to_bytes(4, "big")})
+
+	def test_parse_po_empty(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		self.assertEqual(_parse_po(f.name), [])
+		f.close()
+
+	def test_parse_po_invalid(self):
+		for po in ["msgid \"foo\nmsgstr \"\"\n", "msgid \"foo\\\"\n",
+				"msgid \"\"\n\"foo\n"]:
+			f = tempfile.NamedTemporaryFile(mode="w+")
+			f.write(po)
+			f.flush()
+			with self.assertRaises(ValueError):
+				_parse_po(f.name)
+			f.close()
+
+	def test_write(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+msgid ""
+msgstr ""
+
+msgctxt "foo"
+msgid "foo"
+msgstr "b\"ar ★"
+
+#. Parameter 1: param
+msgctxt "bar"
+msgid "%1$s bar"
+msgstr "%1$s baz"
+""")
+		f.flush()
+		for buffer_size in [1, 16, io.DEFAULT_BUFFER_SIZE]:
+			out = io.StringIO()
+			po2arb_write(f.name, out, buffer_size=buffer_size)
+			self.assertEqual(out.getvalue(), po2arb(f.name) + "\n")
+		f.close()
+
+	# written again with the last value, as po2arb does
+	def test_write_duplicate(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+msgctxt "foo"
+msgid "foo"
+msgstr "bar"
+
+msgctxt "qux"
+msgid "qux"
+msgstr "quux"
+
+msgctxt "foo"
+msgid "other foo"
+msgstr "baz"
+""")
+		f.flush()
+		out = io.StringIO()
+		out.write("before")
+		po2arb_write(f.name, out, buffer_size=1)
+		self.assertEqual(out.getvalue(), "before" + po2arb(f.name) + "\n")
+		self.assertEqual(json.loads(out.getvalue()[6:]),
+			{"foo": "baz", "qux": "quux"})
+		# can't be rewound
+		out = io.StringIO()
+		out.seekable = lambda: False
+		with self.assertRaises(ValueError):
+			po2arb_write(f.name, out, buffer_size=1)
+		f.close()
+
+	# the output is only replaced once complete
+	def test_write_file_invalid(self):
+		d = tempfile.TemporaryDirectory()
+		po = os.path.join(d.name, "es.po")
+		output = os.path.join(d.name, "app_es.arb")
+		with open(po, "w") as f:
+			f.write("msgctxt \"foo\"\nmsgid \"foo\"\nmsgstr \"bar\"\n")
+		_po2arb_module._run_batch(po, output)
+		with open(output, "r") as f:
+			expected = f.read()
+		with open(po, "a") as f:
+			f.write("\nmsgctxt \"baz\"\nmsgid \"baz\"\nmsgstr \"qux\n")
+		with self.assertRaises(ValueError):
+			_po2arb_module._run_batch(po, output)
+		with open(output, "r") as f:
+			self.assertEqual(f.read(), expected)
+		self.assertEqual(sorted(os.listdir(d.name)), ["app_es.arb", "es.po"])
+		d.cleanup()
+
+	def test_timed(self):
+		f = tempfile.NamedTemporaryFile(mode="w+")
+		f.write(
+r"""
+msgid ""
+msgstr ""
+
+msgctxt "foo"
+msgid "foo"
+msgstr "b\"ar"
+
+#. Parameter 1: param
+msgctxt "bar"
+msgid "%1$s bar"
+msgstr "%1$s baz"
+""")
+		f.flush()
+		timings = Timings()
+		out = io.StringIO()
+		po2arb_timed(f.name, out, timings)
+		self.assertEqual(out.getvalue(), po2arb(f.name) + "\n")
+		self.assertEqual(list(timings), ["read", "parse", "parse/unescape",
+			"transform", "serialize", "write"])
+		self.assertIs(_po2arb_module._unescape_payload, codec.unescape_po)
+		f.close()
+
+
+class TestWriteJsonObject(unittest.TestCase):
+	def test_same_as_json_dumps(self):
+		pairs = [
+			("foo", "bar"),
+			("★ \"quoted\"", "line\nbreak \u2028 \x00"),
+			("@foo", {"placeholders": {"a": {}, "b": {"example": [1, "2"]}}}),
+			("baz", {}),
+		]
+		for indent in [None, 0, 2, 4, "\t"]:
+			for buffer_size in [1, 16, io.DEFAULT_BUFFER_SIZE]:
+				for count in range(len(pairs) + 1):
+					out = io.StringIO()
+					_write_json_object(pairs[:count], out, indent, buffer_size)
+					self.assertEqual(out.getvalue(), json.dumps(
+						dict(pairs[:count]), indent=indent, ensure_ascii=False))
+
+
 if __name__ == "__main__":
     unittest.main()
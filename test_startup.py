@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+import lazy
+
+_DIR = os.path.dirname(os.path.abspath(__file__))
+# The imports of the first commit (ec32116) before it converted anything: each
+# CLI imported these and parsed its command line with argparse. A CLI's import
+# time, on top of the interpreter's own startup, is compared with the baseline
+# measured the same way, the best of _RUNS runs each, so the budget follows
+# the speed of the machine
+_BASELINES = {
+	"arb2po.py": "import json, re, argparse\n"
+		"p = argparse.ArgumentParser()\np.add_argument('src_arb')\np.parse_args(['a'])",
+	"po2arb.py": "import ast, json, re, argparse\n"
+		"p = argparse.ArgumentParser()\np.add_argument('po')\np.parse_args(['a'])",
+}
+# How much slower than its baseline a CLI may start
+_TOLERANCE = 1.1
+_RUNS = 10
+# Modules only some code paths need (batch mode with jobs or globs, the
+# daemon, the cache, --timings, --profile, the JSON libraries for big files)
+_LAZY_MODULES = ["concurrent.futures", "socket", "socketserver", "tempfile",
+	"glob", "hashlib", "daemon", "timings", "cProfile", "orjson", "ujson",
+	"simdjson", "watch", "mo", "mmap"]
+
+# Run a CLI with -X importtime and return the time spent importing the
+# modules imported after site, in us, and the names of all the modules. stdout
+# is a pipe, as when the output is piped to another command
+def _import_time(args):
+	result = subprocess.run([sys.executable, "-X", "importtime", *args],
+		cwd=_DIR, check=True, stdout=subprocess.PIPE,
+		stderr=subprocess.PIPE, text=True)
+	total = 0
+	modules = []
+	is_after_site = False
+	for l in result.stderr.splitlines():
+		if not l.startswith("import time:") or "[us]" in l:
+			continue
+		_, cumulative, name = l.split("|")
+		modules.append(name.strip())
+		if is_after_site and not name.startswith("  "):
+			# top level imports, the others are part of their cumulative time
+			total += int(cumulative)
+		elif name.strip() == "site":
+			is_after_site = True
+	return total, modules
+
+class TestStartup(unittest.TestCase):
+	def setUp(self):
+		self._dir = tempfile.TemporaryDirectory()
+		self._arb = os.path.join(self._dir.name, "app_en.arb")
+		with open(self._arb, "w") as f:
+			f.write("{\"foo\": \"{param} bar\", \"@foo\": {\"placeholders\": {\"param\": {}}}}")
+		self._po = os.path.join(self._dir.name, "es.po")
+		with open(self._po, "w") as f:
+			f.write("msgctxt \"foo\"\nmsgid \"foo\"\nmsgstr \"bar\"\n")
+
+	def tearDown(self):
+		self._dir.cleanup()
+
+	# The runs of the CLI and of its baseline alternate, so that both see the
+	# same load
+	def _check(self, args):
+		times = []
+		baseline_times = []
+		for _ in range(_RUNS):
+			total, modules = _import_time(args)
+			times.append(total)
+			for m in _LAZY_MODULES:
+				self.assertNotIn(m, modules)
+			baseline_times.append(
+				_import_time(["-c", _BASELINES[args[0]]])[0])
+		self.assertLess(min(times), min(baseline_times) * _TOLERANCE,
+			f"{args}: {min(times)}us, baseline {min(baseline_times)}us")
+
+	def test_arb2po(self):
+		self._check(["arb2po.py", self._arb])
+
+	def test_arb2po_no_cache(self):
+		self._check(["arb2po.py", "--no-cache", self._arb])
+
+	def test_po2arb(self):
+		self._check(["po2arb.py", self._po])
+
+class TestLazyRegex(unittest.TestCase):
+	def test_regex(self):
+		r = lazy.Regex(r"a(?P<b>b)?")
+		self.assertEqual(r.pattern, r"a(?P<b>b)?")
+		self.assertEqual(r.fullmatch("ab")["b"], "b")
+		self.assertEqual(r.sub("c", "abxa"), "cxc")
+		self.assertEqual(r.groupindex, {"b": 1})
+
+if __name__ == "__main__":
+	unittest.main()
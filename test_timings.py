@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+import io
+import os
+import pstats
+import tempfile
+import unittest
+import timings
+from timings import Timings
+
+class _Patched:
+	@staticmethod
+	def double(x):
+		return x * 2
+
+	def triple(self, x):
+		return x * 3
+
+class TestTimings(unittest.TestCase):
+	def test_phase(self):
+		t = Timings()
+		with t.phase("a"):
+			pass
+		with t.phase("a"):
+			pass
+		with t.phase("b"):
+			pass
+		self.assertEqual(list(t), ["a", "b"])
+		wall, cpu, calls = t["a"]
+		self.assertGreaterEqual(wall, 0)
+		self.assertGreaterEqual(cpu, 0)
+		self.assertEqual(calls, 2)
+
+	def test_phase_exception(self):
+		t = Timings()
+		with self.assertRaises(ValueError):
+			with t.phase("a"):
+				raise ValueError()
+		self.assertEqual(t["a"][2], 1)
+
+	def test_wrap(self):
+		t = Timings()
+		f = t.wrap("f", lambda x: x + 1)
+		self.assertEqual(f(1), 2)
+		self.assertEqual(f(2), 3)
+		self.assertEqual(t["f"][2], 2)
+
+	def test_patch(self):
+		t = Timings()
+		original = _Patched.__dict__["double"]
+		with t.patch(_Patched, "double", "double"), \
+				t.patch(_Patched, "triple", "triple"):
+			self.assertEqual(_Patched().double(2), 4)
+			self.assertEqual(_Patched.double(3), 6)
+			self.assertEqual(_Patched().triple(2), 6)
+		self.assertIs(_Patched.__dict__["double"], original)
+		self.assertEqual(_Patched().double(2), 4)
+		self.assertEqual(t["double"][2], 2)
+		self.assertEqual(t["triple"][2], 1)
+
+	def test_report(self):
+		t = Timings()
+		with t.phase("parse"):
+			pass
+		out = io.StringIO()
+		t.report(out)
+		lines = out.getvalue().splitlines()
+		self.assertEqual(len(lines), 2)
+		self.assertTrue(lines[1].startswith("parse "))
+
+	def test_profile(self):
+		d = tempfile.TemporaryDirectory()
+		path = os.path.join(d.name, "out.prof")
+		self.assertEqual(timings.profile(path, sum, [1, 2]), 3)
+		pstats.Stats(path)
+		d.cleanup()
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import threading
+import unittest
+from watch import watch, write_file
+
+class TestWatch(unittest.TestCase):
+	def test_watch(self):
+		d = tempfile.TemporaryDirectory()
+		foo = os.path.join(d.name, "foo")
+		bar = os.path.join(d.name, "bar")
+		write_file(foo, "foo")
+		write_file(bar, "bar")
+		changes = []
+
+		def on_change(paths):
+			changes.append(paths)
+			raise KeyboardInterrupt()
+
+		timer = threading.Timer(0.05, lambda: write_file(bar, "bar2"))
+		timer.start()
+		watch([foo, bar], on_change, interval=0.01)
+		timer.join()
+		self.assertEqual(changes, [[bar]])
+		d.cleanup()
+
+	def test_write_file(self):
+		d = tempfile.TemporaryDirectory()
+		foo = os.path.join(d.name, "foo")
+		write_file(foo, "foo ★")
+		with open(foo, "r") as f:
+			self.assertEqual(f.read(), "foo ★")
+		self.assertEqual(os.listdir(d.name), ["foo"])
+		d.cleanup()
+
+if __name__ == "__main__":
+	unittest.main()
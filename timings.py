@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+import contextlib
+import functools
+import sys
+import time
+
+# Accumulate the wall and CPU time spent in named phases
+class Timings:
+	def __init__(self):
+		# name => [wall, cpu, calls]
+		self._phases = {}
+
+	@contextlib.contextmanager
+	def phase(self, name):
+		self._phases.setdefault(name, [0.0, 0.0, 0])
+		begin = time.perf_counter()
+		begin_cpu = time.process_time()
+		try:
+			yield
+		finally:
+			self._add(name, time.perf_counter() - begin,
+				time.process_time() - begin_cpu)
+
+	# Return func with every call timed as the named phase
+	def wrap(self, name, func):
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs):
+			self._phases.setdefault(name, [0.0, 0.0, 0])
+			begin = time.perf_counter()
+			begin_cpu = time.process_time()
+			try:
+				return func(*args, **kwargs)
+			finally:
+				self._add(name, time.perf_counter() - begin,
+					time.process_time() - begin_cpu)
+		return wrapper
+
+	# Time every call of obj.name as the named phase while in the block
+	@contextlib.contextmanager
+	def patch(self, obj, name, phase):
+		original = obj.__dict__[name]
+		if isinstance(original, staticmethod):
+			setattr(obj, name, staticmethod(self.wrap(phase,
+				original.__func__)))
+		else:
+			setattr(obj, name, self.wrap(phase, original))
+		try:
+			yield
+		finally:
+			setattr(obj, name, original)
+
+	def _add(self, name, wall, cpu):
+		phase = self._phases[name]
+		phase[0] += wall
+		phase[1] += cpu
+		phase[2] += 1
+
+	def __getitem__(self, name):
+		return tuple(self._phases[name])
+
+	def __iter__(self):
+		return iter(self._phases)
+
+	# Print a table of the phases, in the order they first started
+	def report(self, out=sys.stderr):
+		print(f"{'phase':<24} {'wall':>10} {'cpu':>10} {'calls':>10}", file=out)
+		for name, (wall, cpu, calls) in self._phases.items():
+			print(f"{name:<24} {wall * 1000:8.1f}ms {cpu * 1000:8.1f}ms "
+				f"{calls:>10}", file=out)
+
+# Run func(*args) under cProfile and dump the stats to path, for pstats or
+# snakeviz
+def profile(path, func, *args):
+	import cProfile
+	profiler = cProfile.Profile()
+	try:
+		return profiler.runcall(func, *args)
+	finally:
+		profiler.dump_stats(path)
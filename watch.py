@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+
+def _stat(path):
+	try:
+		s = os.stat(path)
+		return s.st_mtime_ns, s.st_size
+	except FileNotFoundError:
+		return None
+
+# Poll the files every interval seconds and call on_change(paths) with the
+# changed ones, until interrupted. Files that are missing (e.g. while an
+# editor is replacing them) are only reported once they are back
+def watch(paths, on_change, interval=0.5):
+	stats = {p: _stat(p) for p in paths}
+	try:
+		while True:
+			time.sleep(interval)
+			changed = []
+			for p in paths:
+				s = _stat(p)
+				if s is not None and s != stats[p]:
+					stats[p] = s
+					changed.append(p)
+			if changed:
+				on_change(changed)
+	except KeyboardInterrupt:
+		pass
+
+# Write text to path through a temporary file, so readers never see a half
+# written file
+def write_file(path, text):
+	tmp = f"{path}.tmp"
+	with open(tmp, "w") as f:
+		f.write(text)
+	os.replace(tmp, path)
+
+# Report an update on stderr
+def log(path, count, begin):
+	print(f"{path}: {count} entries updated in "
+		f"{(time.perf_counter() - begin) * 1000:.1f}ms", file=sys.stderr)